@@ -0,0 +1,149 @@
+"""
+Lazy, versioned registry of the prompt modules.
+
+Prompt modules (files under essential/ defining a `*_PROMPT` or `*_TEMPLATE`
+constant) are discovered by file name (`guest_extraction`,
+`title_suggestions`, ...) without importing anything; a module is imported
+the first time its prompt is used. On load, its templates (`*_TEMPLATE`
+constants) are parsed once so a broken placeholder fails at load rather than
+mid-episode, and a version is computed from a hash of its prompt text
+(`SYSTEM_PROMPT`, `*_PROMPT` and `*_TEMPLATE` constants). Caches and
+checkpoints key on the version so they are invalidated when the prompt changes.
+
+Usage:
+    from prompts.registry import get_prompt
+    messages = get_prompt("guest_extraction").create_messages(intro_text)
+    get_prompt("guest_extraction").version   # e.g. "3f9a1c0b2d4e"
+"""
+
+import hashlib
+import importlib
+import re
+import string
+import threading
+from pathlib import Path
+
+VERSION_LENGTH = 12
+
+PROMPT_CONSTANT = re.compile(r"^[A-Z_]+_(?:PROMPT|TEMPLATE)\s*=", re.MULTILINE)
+
+def is_prompt_constant(name, value):
+    return isinstance(value, str) and name.isupper() and (
+        name.endswith("_PROMPT") or name.endswith("_TEMPLATE")
+    )
+
+class PromptTemplate:
+    """A template parsed once into literal text and placeholders"""
+    def __init__(self, name, text):
+        self.name = name
+        self.text = text
+        self.parts = list(string.Formatter().parse(text))
+        self.fields = sorted({field for _, field, _, _ in self.parts if field})
+
+    def render(self, **values):
+        missing = [field for field in self.fields if field not in values]
+        if missing:
+            raise KeyError(f"{self.name} is missing values for {', '.join(missing)}")
+        return self.text.format(**values)
+
+class Prompt:
+    """One prompt module, imported on first attribute access"""
+    def __init__(self, name, module_name):
+        self.name = name
+        self.module_name = module_name
+        self._module = None
+        self._templates = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    @property
+    def module(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    module = importlib.import_module(self.module_name)
+                    self._templates = {
+                        name: PromptTemplate(name, value)
+                        for name, value in vars(module).items()
+                        if is_prompt_constant(name, value) and name.endswith("_TEMPLATE")
+                    }
+                    self._version = prompt_hash(module)
+                    self._module = module
+        return self._module
+
+    @property
+    def templates(self):
+        self.module
+        return self._templates
+
+    @property
+    def version(self):
+        self.module
+        return self._version
+
+    def render(self, template_name, **values):
+        return self.templates[template_name].render(**values)
+
+    def __getattr__(self, attribute):
+        # create_messages, constants and helpers come straight from the module
+        if attribute.startswith("_"):
+            raise AttributeError(attribute)
+        return getattr(self.module, attribute)
+
+    def __repr__(self):
+        state = f"version {self._version}" if self._module else "not loaded"
+        return f"<Prompt {self.name} ({state})>"
+
+def prompt_hash(module):
+    """Hash of a module's prompt text, stable across unrelated code changes"""
+    digest = hashlib.sha256()
+    for name, value in sorted(vars(module).items()):
+        if is_prompt_constant(name, value):
+            digest.update(name.encode("utf-8") + b"\0" + value.encode("utf-8") + b"\0")
+    return digest.hexdigest()[:VERSION_LENGTH]
+
+class PromptRegistry:
+    def __init__(self, package="prompts.registry.essential", root=None):
+        self.package = package
+        self.root = Path(root) if root else Path(__file__).parent / "essential"
+        self._prompts = None
+        self._lock = threading.Lock()
+
+    def _discover(self):
+        prompts = {}
+        for path in sorted(self.root.rglob("*.py")):
+            if path.stem == "__init__" or not PROMPT_CONSTANT.search(path.read_text(encoding="utf-8")):
+                continue
+            relative = path.relative_to(self.root).with_suffix("")
+            module_name = ".".join([self.package, *relative.parts])
+            prompts[path.stem] = Prompt(path.stem, module_name)
+        return prompts
+
+    @property
+    def prompts(self):
+        if self._prompts is None:
+            with self._lock:
+                if self._prompts is None:
+                    self._prompts = self._discover()
+        return self._prompts
+
+    def names(self):
+        return sorted(self.prompts)
+
+    def get(self, name):
+        try:
+            return self.prompts[name]
+        except KeyError:
+            raise KeyError(f"Unknown prompt {name!r}; known prompts: {', '.join(self.names())}") from None
+
+    def versions(self, names=None):
+        """Prompt name -> version, loading the prompts asked for (all by default)"""
+        return {name: self.get(name).version for name in (names or self.names())}
+
+registry = PromptRegistry()
+
+def get_prompt(name):
+    return registry.get(name)
+
+def prompt_versions(names=None):
+    return registry.versions(names)
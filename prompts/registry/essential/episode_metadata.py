@@ -0,0 +1,151 @@
+"""
+Single structured call for episode metadata.
+
+Replaces the separate guest, topic, keyword and title calls with one request
+that returns a JSON object holding all four fields. The request uses
+structured outputs (`response_format` with the strict SCHEMA), so the reply
+always has the expected shape; `schema_errors` checks it again locally, for
+clients that don't enforce the schema. Fields that fail validation are
+re-requested on their own with `create_retry_messages`.
+"""
+
+import json
+
+from .show_notes.title_suggestions import SYSTEM_PROMPT as TITLE_GUIDE
+
+FIELDS = ["guest", "topic", "keywords", "titles"]
+KEYWORD_COUNT = 20
+TITLE_COUNT = 10
+
+# Shape of the expected response, also shown to the model
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "guest": {"type": ["string", "null"], "description": "Guest's full name, or null if there is no guest"},
+        "topic": {"type": "string", "description": "Core topic in 2-5 words"},
+        "keywords": {"type": "array", "items": {"type": "string"},
+                     "description": f"{KEYWORD_COUNT} key technical terms or concepts"},
+        "titles": {"type": "array", "items": {"type": "string"},
+                   "description": f"{TITLE_COUNT} episode title options"}
+    },
+    "required": FIELDS,
+    "additionalProperties": False
+}
+
+JSON_TYPES = {"string": str, "array": list, "object": dict, "null": type(None)}
+
+SYSTEM_PROMPT = f"""You extract metadata from Crazy Wisdom podcast transcripts and return it as a single JSON object.
+
+- guest: the guest's full name as the host introduces them (usually in the first few lines), never the host Stewart Alsop; null if there is no guest
+- topic: the core topic of the episode in 2-5 words, not a subtopic
+- keywords: {KEYWORD_COUNT} key technical terms, concepts or themes central to the conversation
+- titles: {TITLE_COUNT} title options following the style guide below
+
+Title style guide:
+{TITLE_GUIDE}
+
+Respond with JSON only, matching this schema:
+{json.dumps(SCHEMA)}"""
+
+USER_PROMPT_TEMPLATE = """Transcript opening:
+{transcript_text}
+{candidates_section}
+Return the JSON object."""
+
+CANDIDATES_SECTION_TEMPLATE = """
+Candidate keywords (most distinctive across the whole transcript first): {candidates}
+Use the candidates as the main source for keywords; fix spelling and capitalization and drop filler.
+"""
+
+RETRY_PROMPT_TEMPLATE = """These fields were invalid and must be produced again: {fields}
+Problems: {problems}
+
+Already known:
+{known}
+{transcript_section}
+Return a JSON object with only these fields: {fields}"""
+
+def response_format(fields=None):
+    """Strict structured-output format for the given fields (all of them by default)"""
+    fields = fields or FIELDS
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "episode_metadata",
+            "strict": True,
+            "schema": {
+                **SCHEMA,
+                "properties": {field: SCHEMA["properties"][field] for field in fields},
+                "required": list(fields)
+            }
+        }
+    }
+
+def schema_errors(metadata, fields=None):
+    """
+    Check a response against SCHEMA
+    Returns a dict of field -> error message for the fields that are missing or of the wrong type
+    """
+    errors = {}
+    for field in fields or FIELDS:
+        if field not in metadata:
+            errors[field] = "missing"
+            continue
+        spec = SCHEMA["properties"][field]
+        types = spec["type"] if isinstance(spec["type"], list) else [spec["type"]]
+        value = metadata[field]
+        if not isinstance(value, tuple(JSON_TYPES[name] for name in types)):
+            errors[field] = f"must be {' or '.join(types)}"
+        elif isinstance(value, list) and not all(isinstance(item, str) for item in value):
+            errors[field] = "must be a list of strings"
+    return errors
+
+def candidates_section(candidates):
+    if not candidates:
+        return ""
+    return CANDIDATES_SECTION_TEMPLATE.format(candidates=", ".join(candidates))
+
+def create_messages(transcript_text, candidates=None):
+    """Create messages for the combined metadata call"""
+    return [
+        {
+            "role": "system",
+            "content": SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": USER_PROMPT_TEMPLATE.format(
+                transcript_text=transcript_text,
+                candidates_section=candidates_section(candidates)
+            )
+        }
+    ]
+
+def create_retry_messages(fields, problems, known, transcript_text=None, candidates=None):
+    """
+    Create messages re-requesting only the fields that failed validation
+    Args:
+        fields: Names of the fields to produce again
+        problems: Dict of field -> validation error
+        known: Dict of fields that already validated (used as context)
+        transcript_text: Transcript opening; only needed when guest, topic or keywords are retried
+        candidates: Optional locally ranked keyword candidates
+    """
+    transcript_section = ""
+    if transcript_text:
+        transcript_section = f"\nTranscript opening:\n{transcript_text}\n{candidates_section(candidates)}"
+    return [
+        {
+            "role": "system",
+            "content": SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": RETRY_PROMPT_TEMPLATE.format(
+                fields=", ".join(fields),
+                problems="; ".join(f"{field}: {error}" for field, error in problems.items()),
+                known=json.dumps(known) if known else "(nothing yet)",
+                transcript_section=transcript_section
+            )
+        }
+    ]
@@ -1,4 +1,7 @@
+from api_client import stage_client
 from . import chunker
+from .projection import project_transcript
+from .streaming import stream_completion
 
 SYSTEM_PROMPT = """You are a podcast show notes creator for the Crazy Wisdom AI podcast. Your task is to analyze podcast transcripts and create structured content for the podcast companion."""
 
@@ -24,6 +27,9 @@ Use these extracted insights from the full episode:
 
 {all_insights}"""
 
+# Section headings of the companion, in output order
+COMPANION_SECTIONS = ["Name", "Description", "Instructions", "Conversation Starters"]
+
 def create_final_messages(all_insights):
     """Create messages for final show notes compilation"""
     return [
@@ -37,19 +43,33 @@ def create_final_messages(all_insights):
         }
     ]
 
-def extract_gpt_content(client, transcript_text, timestamps=None):
-    """Extract GPT content using OpenAI API with chunking"""
+def extract_gpt_content(client, transcript_text, timestamps=None, stream=False, staging_path=None, sections=None,
+                        max_chunks=None):
+    """
+    Extract GPT content using OpenAI API with chunking
+    Args:
+        client: OpenAI client instance
+        transcript_text: Full transcript text
+        timestamps: Optional timeline section appended to the show notes
+        stream: Stream the final compile, writing it to staging_path as it arrives
+        staging_path: File the streamed compile is written to progressively
+        sections: Optional SectionEvents notified as each COMPANION_SECTIONS heading finishes
+        max_chunks: Optional cap on chunk insight calls; chunks are sampled evenly
+    """
     try:
-        # Process chunks using the chunker
+        # Process chunks of the compact projection (no cue numbers or SRT timing lines)
         chunk_insights = chunker.process_chunks(
-            client,
-            transcript_text,
+            stage_client(client, "chunk"),
+            project_transcript(transcript_text).text,
             SYSTEM_PROMPT,
-            CHUNK_PROMPT_TEMPLATE
+            CHUNK_PROMPT_TEMPLATE,
+            max_chunks
         )
         
         if not chunk_insights:
             print("No insights were extracted from any chunks")
+            if sections is not None:
+                sections.finish()
             return None
             
         # Combine insights into final show notes
@@ -57,11 +77,20 @@ def extract_gpt_content(client, transcript_text, timestamps=None):
         
         # Generate final show notes
         print("Generating final show notes...")
-        show_notes = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=create_final_messages(all_insights),
-            temperature=0.7
-        ).choices[0].message.content
+        client = stage_client(client, "compile")
+        if stream:
+            show_notes = stream_completion(
+                client, "Show notes", staging_path, sections, COMPANION_SECTIONS,
+                model="gpt-3.5-turbo",
+                messages=create_final_messages(all_insights),
+                temperature=0.7
+            )
+        else:
+            show_notes = client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=create_final_messages(all_insights),
+                temperature=0.7
+            ).choices[0].message.content
         
         # Add timestamps if available
         if timestamps:
@@ -71,4 +100,6 @@ def extract_gpt_content(client, transcript_text, timestamps=None):
         
     except Exception as e:
         print(f"Error extracting GPT content: {e}")
+        if sections is not None:
+            sections.finish()
         return None
\ No newline at end of file
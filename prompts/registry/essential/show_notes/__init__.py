@@ -1,4 +1,14 @@
-from .compiler import generate_show_notes
-from .timestamps import extract_timestamps
+import importlib
 
-__all__ = ['generate_show_notes', 'extract_timestamps']
\ No newline at end of file
+# Loaded on first use, so importing one prompt module doesn't pull in the compiler (and the OpenAI SDK)
+_EXPORTS = {
+    'generate_show_notes': '.compiler',
+    'extract_timestamps': '.timestamps',
+}
+
+__all__ = ['generate_show_notes', 'extract_timestamps']
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
@@ -1,5 +1,5 @@
 import re
-from typing import List, Dict
+from typing import List, Dict, Optional
 from dataclasses import dataclass
 
 @dataclass
@@ -70,18 +70,42 @@ def process_chunk(client, chunk: str, chunk_index: int, total_chunks: int,
         print(f"Error processing chunk {chunk_index + 1}: {e}")
         return None
 
+def sample_indexes(count: int, limit: Optional[int]) -> List[int]:
+    """Up to `limit` indexes spread evenly over range(count), always keeping the first and last"""
+    if limit is None or count <= limit:
+        return list(range(count))
+    if limit <= 1:
+        return [0]
+    return sorted({round(i * (count - 1) / (limit - 1)) for i in range(limit)})
+
 def process_chunks(client, transcript_text: str, system_prompt: str, 
-                  chunk_prompt_template: str) -> List[str]:
-    """Process all chunks of a transcript"""
+                  chunk_prompt_template: str, max_chunks: Optional[int] = None) -> List[str]:
+    """
+    Process all chunks of a transcript
+    With max_chunks, only that many chunks spread evenly over the episode are
+    processed (the budget governor's sampling); each keeps its real position.
+    """
     chunks = split_into_chunks(transcript_text)
     print(f"Split transcript into {len(chunks)} chunks")
+    selected = sample_indexes(len(chunks), max_chunks)
+    if len(selected) < len(chunks):
+        print(f"Sampling {len(selected)} of {len(chunks)} chunks to stay within budget")
     
-    chunk_results = []
-    for i, chunk in enumerate(chunks):
+    results = {}
+    for i in selected:
+        chunk = chunks[i]
         print(f"Processing chunk {i + 1}/{len(chunks)}...")
-        result = process_chunk(client, chunk, i, len(chunks), 
-                             system_prompt, chunk_prompt_template)
-        if result:
-            chunk_results.append(result)
-            
-    return chunk_results
\ No newline at end of file
+        results[i] = process_chunk(client, chunk, i, len(chunks), 
+                                   system_prompt, chunk_prompt_template)
+
+    # Give failed chunks a second pass instead of dropping their insights
+    failed = [i for i, result in results.items() if not result]
+    for i in failed:
+        print(f"Retrying chunk {i + 1}/{len(chunks)}...")
+        results[i] = process_chunk(client, chunks[i], i, len(chunks),
+                                   system_prompt, chunk_prompt_template)
+
+    missing = [i + 1 for i, result in results.items() if not result]
+    if missing:
+        print(f"Warning: no insights for chunk(s) {', '.join(map(str, missing))} of {len(chunks)}")
+    return [results[i] for i in sorted(results) if results[i]]
\ No newline at end of file
@@ -1,27 +1,53 @@
 import os
+import tempfile
 from pathlib import Path
-from openai import OpenAI
-from dotenv import load_dotenv
 from .GPT_creator import extract_gpt_content
 from .timestamps import extract_timestamps
 
+# Streamed compiles without an artifact writer are scratch-written here, outside the synced episode folders
+PARTIAL_DIR = Path(__file__).resolve().parents[4] / "temp"
+
 class ShowNotesCompiler:
-    def __init__(self):
-        load_dotenv()
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    def __init__(self, client=None):
+        if client is None:
+            from openai import OpenAI
+            from dotenv import load_dotenv
+            load_dotenv()
+            client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.client = client
     
-    def compile_show_notes(self, transcript_path, timestamps=None):
+    def compile_show_notes(self, transcript_path, timestamps=None, writer=None, stream=False, sections=None,
+                           max_chunks=None):
         """
         Compile show notes from transcript
         Args:
             transcript_path: Path to the transcript file
             timestamps: Optional pre-generated timestamps
+            writer: Optional artifact writer to stage show_notes.md on instead of writing it
+            stream: Stream the final compile into a partial file as it is generated
+            sections: Optional SectionEvents notified as companion sections finish
+            max_chunks: Optional cap on chunk insight calls (chunks are sampled evenly)
         """
         # Read transcript
         transcript = Path(transcript_path).read_text(encoding='utf-8')
         
+        # Streamed output goes to a scratch file until the full show notes are written
+        partial_path = None
+        if stream:
+            if writer:
+                partial_path = writer.partial_path("show_notes.md")
+            else:
+                PARTIAL_DIR.mkdir(parents=True, exist_ok=True)
+                fd, partial_path = tempfile.mkstemp(prefix="show_notes_", suffix=".md.partial", dir=PARTIAL_DIR)
+                os.close(fd)
+
         # Generate GPT content with timestamps if provided
-        gpt_content = extract_gpt_content(self.client, transcript, timestamps)
+        try:
+            gpt_content = extract_gpt_content(self.client, transcript, timestamps, stream, partial_path, sections,
+                                              max_chunks)
+        finally:
+            if partial_path and not writer and os.path.exists(partial_path):
+                os.remove(partial_path)
         
         if not gpt_content:
             print("Failed to generate GPT content")
@@ -30,6 +56,11 @@ class ShowNotesCompiler:
         # Set full content
         full_content = gpt_content
             
+        if writer:
+            show_notes_path = writer.write("show_notes.md", gpt_content)
+            print(f"Show notes staged for: {show_notes_path}")
+            return show_notes_path
+
         # Create show notes file path
         output_dir = Path(transcript_path).parent
         show_notes_path = output_dir / "show_notes.md"
@@ -40,12 +71,18 @@ class ShowNotesCompiler:
         print(f"Show notes generated at: {show_notes_path}")
         return str(show_notes_path)
 
-def generate_show_notes(transcript_path, timestamps=None):
+def generate_show_notes(transcript_path, timestamps=None, client=None, writer=None, stream=False, sections=None,
+                        max_chunks=None):
     """
     Convenience function to generate show notes
     Args:
         transcript_path: Path to the transcript file
         timestamps: Optional pre-generated timestamps
+        client: Optional OpenAI client to reuse instead of creating one
+        writer: Optional artifact writer to stage show_notes.md on
+        stream: Stream the final compile with live progress
+        sections: Optional SectionEvents notified as companion sections finish
+        max_chunks: Optional cap on chunk insight calls (chunks are sampled evenly)
     """
-    compiler = ShowNotesCompiler()
-    return compiler.compile_show_notes(transcript_path, timestamps)
\ No newline at end of file
+    compiler = ShowNotesCompiler(client)
+    return compiler.compile_show_notes(transcript_path, timestamps, writer, stream, sections, max_chunks)
\ No newline at end of file
@@ -6,6 +6,8 @@ Integrates with guest extraction and maintains consistent formatting and style.
 import re
 from typing import Optional, Tuple, List
 
+from .streaming import stream_completion
+
 SYSTEM_PROMPT = """You are an expert at writing natural introductions for the Crazy Wisdom Podcast in Stewart Alsop's voice. You craft engaging, flowing introductions that maintain his conversational style.
 
 Follow these key principles:
@@ -122,7 +124,8 @@ def create_messages(guest_name: str, topics: str, contact_info: str) -> List[dic
         }
     ]
 
-def generate_intro_paragraph(client, transcript_text: str, guest_name: str) -> Tuple[Optional[str], Optional[str]]:
+def generate_intro_paragraph(client, transcript_text: str, guest_name: str, stream: bool = False,
+                             staging_path: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
     """
     Generate an introduction paragraph for a Crazy Wisdom podcast episode.
     
@@ -130,6 +133,8 @@ def generate_intro_paragraph(client, transcript_text: str, guest_name: str) -> T
         client: OpenAI client instance
         transcript_text (str): Full episode transcript
         guest_name (str): Guest's name from guest_extraction
+        stream (bool): Stream the completion with live progress
+        staging_path (str): Optional file the streamed paragraph is written to as it arrives
         
     Returns:
         Tuple[Optional[str], Optional[str]]: (intro_paragraph, error_message)
@@ -147,14 +152,22 @@ def generate_intro_paragraph(client, transcript_text: str, guest_name: str) -> T
         # Generate the introduction using our prompts
         messages = create_messages(guest_name, topics, contact_info)
         
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=messages,
-            temperature=0.7,
-            max_tokens=500
-        )
-        
-        intro_paragraph = response.choices[0].message.content.strip()
+        if stream:
+            intro_paragraph = stream_completion(
+                client, "Intro paragraph", staging_path,
+                model="gpt-3.5-turbo",
+                messages=messages,
+                temperature=0.7,
+                max_tokens=500
+            ).strip()
+        else:
+            response = client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=messages,
+                temperature=0.7,
+                max_tokens=500
+            )
+            intro_paragraph = response.choices[0].message.content.strip()
         
         # Validate the generated intro
         if not intro_paragraph.startswith("On this episode"):
@@ -12,8 +12,37 @@ Transcript excerpt: {transcript_text}
 
 Return only a comma-separated list of 20 key terms/concepts."""
 
-def create_messages(transcript_text, guest_name, topic):
-    """Create messages for the OpenAI chat completion"""
+CANDIDATE_PROMPT_TEMPLATE = """Extract the most important technical terms and concepts from this conversation.
+
+Guest: {guest_name}
+Main Topic: {topic}
+Candidate terms (most distinctive across the whole transcript first): {candidates}
+Transcript opening: {transcript_text}
+
+Using the candidates as your main source, fix spelling and capitalization, merge duplicates and drop filler.
+Return only a comma-separated list of 20 key terms/concepts."""
+
+def create_messages(transcript_text, guest_name, topic, candidates=None):
+    """
+    Create messages for the OpenAI chat completion
+    If candidates (locally ranked terms) are given, they are sent instead of a long excerpt
+    """
+    if candidates:
+        return [
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": CANDIDATE_PROMPT_TEMPLATE.format(
+                    guest_name=guest_name,
+                    topic=topic,
+                    candidates=", ".join(candidates),
+                    transcript_text=transcript_text
+                )
+            }
+        ]
     return [
         {
             "role": "system",
@@ -0,0 +1,105 @@
+"""
+Compact projection of SRT transcripts for prompts.
+
+Raw SRT spends a large share of every prompt on cue numbers and
+`00:12:03,120 --> 00:12:05,400` lines. The projection drops them and merges
+consecutive cues into paragraphs. No stage needs times inside its prompt:
+timeline segments carry their start time alongside the text, so the
+projection keeps no time anchors.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict
+
+from .chunker import split_into_chunks
+from .timestamps import parse_srt_transcript, parse_srt_timestamp
+
+PARAGRAPH_GAP_SECONDS = 2.0   # Silence between cues that suggests a new paragraph
+MAX_PARAGRAPH_CHARS = 1200    # Break long monologues at the next sentence end
+KEYWORD_EXCERPT_CHARS = 3000  # Raw transcript span sent to keyword extraction
+
+SENTENCE_END = re.compile(r'[.!?]["\')\]]?$')
+
+@dataclass
+class CompactTranscript:
+    text: str
+
+def project_transcript(transcript_text: str) -> CompactTranscript:
+    """
+    Project an SRT transcript into compact paragraphs
+
+    Args:
+        transcript_text: Raw transcript (SRT, optionally with a markdown heading)
+
+    Returns:
+        CompactTranscript; non-SRT input is returned unchanged
+    """
+    entries = [entry for entry in parse_srt_transcript(transcript_text) if entry.start_time and entry.text]
+    if not entries:
+        return CompactTranscript(text=transcript_text)
+
+    parts = []
+    paragraph_chars = 0
+    previous_end = None
+
+    for entry in entries:
+        start = parse_srt_timestamp(entry.start_time).total_seconds()
+        if previous_end is None:
+            separator = ""
+        else:
+            gap = start - previous_end
+            ends_sentence = bool(SENTENCE_END.search(parts[-1]))
+            new_paragraph = (
+                (gap >= PARAGRAPH_GAP_SECONDS and ends_sentence) or
+                (paragraph_chars >= MAX_PARAGRAPH_CHARS and ends_sentence) or
+                paragraph_chars >= MAX_PARAGRAPH_CHARS * 2
+            )
+            separator = "\n\n" if new_paragraph else " "
+
+        if separator != " ":
+            paragraph_chars = 0
+
+        parts.append(separator)
+        parts.append(entry.text)
+        paragraph_chars += len(entry.text)
+        try:
+            previous_end = parse_srt_timestamp(entry.end_time).total_seconds()
+        except ValueError:
+            previous_end = start
+
+    return CompactTranscript(text="".join(parts))
+
+def compact_excerpt(transcript_text: str, max_chars: int) -> str:
+    """Compact projection of the first max_chars of a raw transcript"""
+    return project_transcript(transcript_text[:max_chars]).text
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (about four characters per token for English)"""
+    return (len(text) + 3) // 4
+
+def projection_report(transcript_text: str) -> Dict[str, Dict[str, int]]:
+    """
+    Estimate transcript tokens each stage sends with raw SRT vs the compact projection
+
+    Returns:
+        {stage: {"raw": tokens, "compact": tokens, "calls_raw": n, "calls_compact": n}}
+    """
+    compact = project_transcript(transcript_text).text
+    raw_chunks = split_into_chunks(transcript_text)
+    compact_chunks = split_into_chunks(compact)
+
+    return {
+        "keywords": {
+            "raw": estimate_tokens(transcript_text[:KEYWORD_EXCERPT_CHARS]),
+            "compact": estimate_tokens(compact_excerpt(transcript_text, KEYWORD_EXCERPT_CHARS)),
+            "calls_raw": 1,
+            "calls_compact": 1
+        },
+        "chunk_insights": {
+            "raw": sum(estimate_tokens(chunk) for chunk in raw_chunks),
+            "compact": sum(estimate_tokens(chunk) for chunk in compact_chunks),
+            "calls_raw": len(raw_chunks),
+            "calls_compact": len(compact_chunks)
+        }
+    }
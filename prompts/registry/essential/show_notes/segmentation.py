@@ -0,0 +1,187 @@
+"""
+Local topic segmentation for the episode timeline.
+
+A TextTiling-style lexical-cohesion segmenter: cues are pooled into short
+blocks, every gap between blocks is scored by the cosine similarity of the
+words on either side, and gaps sitting in deep similarity valleys become
+topic boundaries. Neighbouring segments that are still lexically similar are
+then merged. Segments are kept between MIN_SEGMENT_MINUTES and
+MAX_SEGMENT_MINUTES, so stretches of the same conversation collapse into one
+timeline entry instead of one per fixed window.
+"""
+
+import re
+from typing import List, Tuple
+
+import numpy as np
+
+from .timestamps import SRTEntry, parse_srt_timestamp
+
+BLOCK_SECONDS = 30         # Cues are pooled into blocks of roughly this length
+WINDOW_BLOCKS = 6          # Blocks compared on each side of a gap
+MIN_SEGMENT_MINUTES = 3
+MAX_SEGMENT_MINUTES = 15
+MERGE_SIMILARITY = 0.5     # Adjacent segments at least this similar are the same conversation
+
+WORD_PATTERN = re.compile(r"[a-z][a-z']+")
+STOPWORDS = frozenset("""
+about after again all also and any are because been before being but can could did does doing don't
+down for from get going gonna got had has have having her here him his how i'm into it's its just know
+like lot mean more most much not now off one only other our out over really right said say see she
+should some something so that that's the their them then there these they thing things think this those
+through very want was way well were what when where which while who will with would yeah yes you your
+""".split())
+
+def format_segment_time(seconds: float) -> str:
+    """MM:SS (minutes may exceed 59, like the fixed-interval timestamps)"""
+    seconds = int(seconds)
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+def build_blocks(entries: List[SRTEntry]) -> Tuple[List[List[SRTEntry]], List[float]]:
+    """Pool consecutive cues into blocks of about BLOCK_SECONDS; returns blocks and their start times"""
+    blocks = []
+    starts = []
+    for entry in entries:
+        start = parse_srt_timestamp(entry.start_time).total_seconds()
+        if not blocks or start - starts[-1] >= BLOCK_SECONDS:
+            blocks.append([])
+            starts.append(start)
+        blocks[-1].append(entry)
+    return blocks, starts
+
+def block_term_matrix(blocks: List[List[SRTEntry]]) -> np.ndarray:
+    """Dense block x term count matrix over content words"""
+    vocab = {}
+    rows = []
+    for block in blocks:
+        ids = []
+        for entry in block:
+            for word in WORD_PATTERN.findall(entry.text.lower()):
+                if word in STOPWORDS:
+                    continue
+                ids.append(vocab.setdefault(word, len(vocab)))
+        rows.append(ids)
+
+    matrix = np.zeros((len(blocks), max(len(vocab), 1)), dtype=np.float32)
+    for row, ids in enumerate(rows):
+        if ids:
+            np.add.at(matrix[row], np.asarray(ids), 1.0)
+    return matrix
+
+def gap_similarities(matrix: np.ndarray, window: int = WINDOW_BLOCKS) -> np.ndarray:
+    """
+    Cosine similarity across each gap between blocks
+    Entry i scores the gap before block i + 1, comparing up to `window`
+    blocks on either side.
+    """
+    n_blocks = len(matrix)
+    cumulative = np.vstack([np.zeros((1, matrix.shape[1]), dtype=np.float32), np.cumsum(matrix, axis=0)])
+    gaps = np.arange(1, n_blocks)
+    left = cumulative[gaps] - cumulative[np.maximum(gaps - window, 0)]
+    right = cumulative[np.minimum(gaps + window, n_blocks)] - cumulative[gaps]
+    norms = np.linalg.norm(left, axis=1) * np.linalg.norm(right, axis=1)
+    dots = np.einsum('ij,ij->i', left, right)
+    return np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+
+def depth_scores(similarities: np.ndarray) -> np.ndarray:
+    """How far each gap sits below the peaks on either side"""
+    depths = np.zeros_like(similarities)
+    for i, score in enumerate(similarities):
+        left = i
+        while left > 0 and similarities[left - 1] >= similarities[left]:
+            left -= 1
+        right = i
+        while right < len(similarities) - 1 and similarities[right + 1] >= similarities[right]:
+            right += 1
+        depths[i] = (similarities[left] - score) + (similarities[right] - score)
+    return depths
+
+def choose_boundaries(depths: np.ndarray, starts: List[float]) -> List[int]:
+    """
+    Pick block indices that start a new segment
+    Deepest valleys above the TextTiling cutoff win, subject to the minimum
+    segment length; overlong segments are then split at their deepest gap.
+    """
+    if not len(depths):
+        return []
+    min_seconds = MIN_SEGMENT_MINUTES * 60
+    cutoff = depths.mean() - depths.std() / 2
+
+    boundaries = []
+    for gap in np.argsort(-depths, kind='stable'):
+        if depths[gap] <= cutoff or depths[gap] <= 0:
+            break
+        block = int(gap) + 1
+        edges = [0] + sorted(boundaries) + [len(starts)]
+        position = np.searchsorted(edges, block)
+        previous_start = starts[edges[position - 1]]
+        next_start = starts[edges[position]] if edges[position] < len(starts) else starts[-1] + BLOCK_SECONDS
+        if starts[block] - previous_start >= min_seconds and next_start - starts[block] >= min_seconds:
+            boundaries.append(block)
+    boundaries.sort()
+
+    # Split segments that run longer than the maximum at their deepest gap
+    max_seconds = MAX_SEGMENT_MINUTES * 60
+    result = []
+    edges = [0] + boundaries + [len(starts)]
+    for first, last in zip(edges, edges[1:]):
+        pending = [(first, last)]
+        while pending:
+            seg_first, seg_last = pending.pop()
+            end_time = starts[seg_last] if seg_last < len(starts) else starts[-1] + BLOCK_SECONDS
+            if end_time - starts[seg_first] <= max_seconds or seg_last - seg_first < 2:
+                if seg_first != 0:
+                    result.append(seg_first)
+                continue
+            inner = np.arange(seg_first, seg_last - 1)
+            split = int(inner[np.argmax(depths[inner])]) + 1
+            pending.extend([(split, seg_last), (seg_first, split)])
+    return sorted(set(result))
+
+def cosine(first: np.ndarray, second: np.ndarray) -> float:
+    norm = np.linalg.norm(first) * np.linalg.norm(second)
+    return float(first @ second / norm) if norm else 0.0
+
+def merge_similar(boundaries: List[int], matrix: np.ndarray, starts: List[float]) -> List[int]:
+    """
+    Drop boundaries between adjacent segments that don't add anything new
+    Repeatedly merges the most similar neighbouring pair while the merged
+    segment stays under the maximum length.
+    """
+    max_seconds = MAX_SEGMENT_MINUTES * 60
+    boundaries = list(boundaries)
+    while boundaries:
+        edges = [0] + boundaries + [len(starts)]
+        vectors = [matrix[first:last].sum(axis=0) for first, last in zip(edges, edges[1:])]
+        best, best_similarity = None, MERGE_SIMILARITY
+        for i in range(len(boundaries)):
+            end_time = starts[edges[i + 2]] if edges[i + 2] < len(starts) else starts[-1] + BLOCK_SECONDS
+            if end_time - starts[edges[i]] > max_seconds:
+                continue
+            similarity = cosine(vectors[i], vectors[i + 1])
+            if similarity >= best_similarity:
+                best, best_similarity = i, similarity
+        if best is None:
+            break
+        del boundaries[best]
+    return boundaries
+
+def segment_by_topic(entries: List[SRTEntry]) -> List[Tuple[str, str]]:
+    """
+    Split transcript entries into variable-length topic segments
+    Returns (MM:SS start time, segment text) pairs, like group_by_time_interval
+    """
+    entries = [entry for entry in entries if entry.start_time]
+    if not entries:
+        return []
+    blocks, starts = build_blocks(entries)
+    matrix = block_term_matrix(blocks)
+    boundaries = choose_boundaries(depth_scores(gap_similarities(matrix)), starts)
+    boundaries = merge_similar(boundaries, matrix, starts)
+
+    segments = []
+    edges = [0] + boundaries + [len(blocks)]
+    for first, last in zip(edges, edges[1:]):
+        text = ' '.join(entry.text for block in blocks[first:last] for entry in block)
+        segments.append((format_segment_time(starts[first]), text))
+    return segments
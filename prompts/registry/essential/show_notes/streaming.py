@@ -0,0 +1,152 @@
+"""
+Streaming completions for long-output stages.
+
+`stream_completion` consumes token deltas as they arrive, appends them to a
+staging file, prints live progress, and reports each named section of the
+output as soon as the next one starts. Other threads can block on a section
+with `SectionEvents.wait` instead of waiting for the whole completion.
+"""
+
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROGRESS_INTERVAL = 0.5  # Seconds between progress line updates
+
+def section_pattern(section_names: List[str]):
+    """Matches a line that opens one of the named sections ("Name:", "## Name", "1. **Name**:" ...)"""
+    names = "|".join(re.escape(name) for name in section_names)
+    return re.compile(rf"^\s*(?:#+\s*|\d+\.\s*)?(?:\*\*)?({names})\b(?:\*\*)?\s*:?(?:\*\*)?\s*(.*)$", re.IGNORECASE)
+
+class SectionEvents:
+    """Sections of a streamed completion, published as they finish"""
+    def __init__(self):
+        self.sections: Dict[str, str] = {}
+        self.started = False
+        self.finished = False
+        self.condition = threading.Condition()
+
+    def section_finished(self, name, text):
+        with self.condition:
+            self.sections[name] = text
+            self.condition.notify_all()
+
+    def start(self):
+        """The streamed request is being made; sections can be expected from now on"""
+        with self.condition:
+            self.started = True
+            self.condition.notify_all()
+
+    def finish(self):
+        """The stream ended (or failed); wakes anyone still waiting"""
+        with self.condition:
+            self.finished = True
+            self.condition.notify_all()
+
+    def wait(self, name, timeout=None) -> Optional[str]:
+        """Block until the section is finished; None if the stream ended without it or timed out"""
+        with self.condition:
+            self.condition.wait_for(lambda: name in self.sections or self.finished, timeout)
+            return self.sections.get(name)
+
+    def wait_if_started(self, name, timeout=None) -> Optional[str]:
+        """Like wait, but None right away if the stream hasn't started (e.g. it is still behind other work)"""
+        with self.condition:
+            if not self.started and not self.finished:
+                return self.sections.get(name)
+        return self.wait(name, timeout)
+
+class SectionTracker:
+    """Splits streamed text into named sections, line by line"""
+    def __init__(self, section_names, events):
+        self.pattern = section_pattern(section_names)
+        self.canonical = {name.lower(): name for name in section_names}
+        self.events = events
+        self.current = None
+        self.lines = []
+        self.buffer = ""
+
+    def feed(self, text):
+        self.buffer += text
+        *complete, self.buffer = self.buffer.split("\n")
+        for line in complete:
+            self._line(line)
+
+    def close(self):
+        if self.buffer:
+            self._line(self.buffer)
+            self.buffer = ""
+        self._publish()
+
+    def _line(self, line):
+        match = self.pattern.match(line)
+        if match:
+            self._publish()
+            self.current = self.canonical[match.group(1).lower()]
+            self.lines = [match.group(2)] if match.group(2) else []
+        elif self.current:
+            self.lines.append(line)
+
+    def _publish(self):
+        if self.current:
+            self.events.section_finished(self.current, "\n".join(self.lines).strip())
+        self.current = None
+        self.lines = []
+
+def stream_completion(client, label, staging_path=None, sections=None, section_names=None, **create_kwargs):
+    """
+    Run a chat completion with stream=True and return the full text
+    Args:
+        client: OpenAI client (or wrapper)
+        label: Stage name shown in the progress line
+        staging_path: Optional file the text is appended to as it arrives
+        sections: Optional SectionEvents notified as named sections finish
+        section_names: Section headings to look for when sections is given
+        create_kwargs: Arguments for chat.completions.create (model, messages, ...)
+    """
+    tracker = SectionTracker(section_names or [], sections) if sections is not None else None
+    staging_file = None
+    parts = []
+    deltas = 0
+    started = last_progress = time.monotonic()
+    try:
+        if staging_path:
+            Path(staging_path).parent.mkdir(parents=True, exist_ok=True)
+            staging_file = open(staging_path, "w", encoding="utf-8")
+        if sections is not None:
+            sections.start()
+
+        for chunk in client.chat.completions.create(stream=True, **create_kwargs):
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if not text:
+                continue
+            parts.append(text)
+            deltas += 1
+            if staging_file:
+                staging_file.write(text)
+                staging_file.flush()
+            if tracker:
+                tracker.feed(text)
+
+            now = time.monotonic()
+            if now - last_progress >= PROGRESS_INTERVAL:
+                last_progress = now
+                chars = sum(len(part) for part in parts)
+                sys.stdout.write(f"\r{label}: {chars} chars, {deltas / (now - started):.0f} tokens/s")
+                sys.stdout.flush()
+
+        if tracker:
+            tracker.close()
+        content = "".join(parts)
+        print(f"\r{label}: {len(content)} chars in {time.monotonic() - started:.1f}s")
+        return content
+    finally:
+        if staging_file:
+            staging_file.close()
+        if sections is not None:
+            sections.finish()
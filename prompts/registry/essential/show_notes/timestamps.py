@@ -1,5 +1,5 @@
 import re
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 
@@ -8,6 +8,9 @@ class TimestampEntry:
     time: str  # In MM:SS format
     topic: str
 
+# "topic" segments at real topic shifts; "fixed" uses regular time intervals
+DEFAULT_SEGMENTATION = "topic"
+
 @dataclass
 class SRTEntry:
     index: int
@@ -16,8 +19,8 @@ class SRTEntry:
     text: str
 
 SYSTEM_PROMPT = """You are an expert at creating podcast timestamps and summarizing discussion topics.
-Your task is to identify key discussion points at regular 5-minute intervals from podcast transcripts.
-For each interval, provide a concise (1-2 sentence) summary of the main topics discussed."""
+Your task is to identify key discussion points in segments of podcast transcripts.
+For each segment, provide a concise (1-2 sentence) summary of the main topics discussed."""
 
 CHUNK_PROMPT_TEMPLATE = """Analyze this segment of a podcast transcript and identify the main topics 
 discussed in each 5-minute interval. This is chunk {current_chunk} of {total_chunks}.
@@ -114,33 +117,60 @@ def group_by_time_interval(entries: List[SRTEntry], interval_minutes: int = 5) -
     
     return interval_segments
 
-def process_timestamps(client, transcript_text: str) -> List[TimestampEntry]:
+def split_segments(entries: List[SRTEntry], segmentation: str = DEFAULT_SEGMENTATION,
+                   interval_minutes: int = 5) -> List[Tuple[str, str]]:
+    """Split entries into timeline segments, by topic or by fixed interval"""
+    if segmentation == "topic":
+        from .segmentation import segment_by_topic
+        return segment_by_topic(entries)
+    return group_by_time_interval(entries, interval_minutes)
+
+def create_interval_messages(segment_text: str) -> List[Dict[str, str]]:
+    """Create messages for summarizing a single interval"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"Summarize the main topics discussed in this segment:\n{segment_text}"}
+    ]
+
+def summarize_interval(client, timestamp: str, segment_text: str) -> Optional[str]:
+    """Topic summary of one timeline segment, or None if the call failed"""
+    try:
+        response = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=create_interval_messages(segment_text),
+            temperature=0.7
+        )
+        return response.choices[0].message.content.strip()
+    except Exception as e:
+        print(f"Error processing segment at {timestamp}: {e}")
+        return None
+
+def process_timestamps(client, transcript_text: str, segmentation: str = DEFAULT_SEGMENTATION,
+                       interval_minutes: int = 5) -> List[TimestampEntry]:
     """Process transcript to generate timestamped topic summaries"""
     # Parse SRT transcript
     entries = parse_srt_transcript(transcript_text)
     
-    # Group into 5-minute intervals
-    interval_segments = group_by_time_interval(entries)
+    # Group into topic segments (or fixed intervals)
+    interval_segments = split_segments(entries, segmentation, interval_minutes)
     
     # Process each interval with GPT to summarize topics
-    timestamp_entries = []
-    for timestamp, segment_text in interval_segments:
-        try:
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": f"Summarize the main topics discussed in this segment:\n{segment_text}"}
-                ],
-                temperature=0.7
-            )
-            summary = response.choices[0].message.content.strip()
-            timestamp_entries.append(TimestampEntry(time=timestamp, topic=summary))
-        except Exception as e:
-            print(f"Error processing segment at {timestamp}: {e}")
-            continue
-    
-    return timestamp_entries
+    summaries = [summarize_interval(client, timestamp, segment_text) for timestamp, segment_text in interval_segments]
+
+    # Give failed intervals a second pass instead of dropping them from the timeline
+    for i, (timestamp, segment_text) in enumerate(interval_segments):
+        if summaries[i] is None:
+            print(f"Retrying segment at {timestamp}...")
+            summaries[i] = summarize_interval(client, timestamp, segment_text)
+
+    missing = [timestamp for (timestamp, _), summary in zip(interval_segments, summaries) if summary is None]
+    if missing:
+        print(f"Warning: no summary for segment(s) at {', '.join(missing)}")
+    return [
+        TimestampEntry(time=timestamp, topic=summary)
+        for (timestamp, _), summary in zip(interval_segments, summaries)
+        if summary is not None
+    ]
 
 def format_timestamp_section(entries: List[TimestampEntry]) -> str:
     """Format timestamp entries into markdown"""
@@ -153,11 +183,12 @@ def format_timestamp_section(entries: List[TimestampEntry]) -> str:
     
     return markdown
 
-def extract_timestamps(client, transcript_text: str) -> str:
+def extract_timestamps(client, transcript_text: str, segmentation: str = DEFAULT_SEGMENTATION,
+                       interval_minutes: int = 5) -> str:
     """Main function to extract and format timestamps"""
     try:
         # Process transcript into timestamp entries
-        entries = process_timestamps(client, transcript_text)
+        entries = process_timestamps(client, transcript_text, segmentation, interval_minutes)
         
         # Format into markdown
         return format_timestamp_section(entries)
@@ -20,11 +20,14 @@ USER_PROMPT_TEMPLATE = """Generate 10 title options for a Crazy Wisdom podcast e
 Guest: {guest_name}
 Main Topic: {topic}
 Key Concepts: {keywords}
-
+{summary_line}
 Return only the numbered list."""
 
-def create_messages(guest_name, topic, keywords):
-    """Create messages for the OpenAI chat completion"""
+def create_messages(guest_name, topic, keywords, summary=None):
+    """
+    Create messages for the OpenAI chat completion
+    An optional episode summary (the companion description) is added as extra context
+    """
     return [
         {
             "role": "system",
@@ -35,7 +38,8 @@ def create_messages(guest_name, topic, keywords):
             "content": USER_PROMPT_TEMPLATE.format(
                 guest_name=guest_name,
                 topic=topic,
-                keywords=keywords
+                keywords=keywords,
+                summary_line=f"Episode Summary: {summary}\n" if summary else ""
             )
         }
     ]
\ No newline at end of file
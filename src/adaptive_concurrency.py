@@ -0,0 +1,228 @@
+"""
+Adaptive (AIMD) concurrency control around API calls.
+
+Instead of a fixed number of in-flight requests, AdaptiveLimiter grows the
+limit additively while responses come back at their usual latency and halves
+it when the API pushes back (429, 5xx, timeouts). Overloaded calls are
+retried after the server's retry-after hint (or an exponential backoff), so
+work is delayed rather than dropped. A circuit breaker stops all calls for a
+while after repeated consecutive failures, then lets a single trial call
+through before reopening the floodgates.
+
+"Usual latency" is tracked per model and prompt-size bucket, since a short
+guest extraction and a long chunk insight have very different normal times.
+"""
+
+import functools
+import math
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from api_client import ClientWrapper
+
+INITIAL_LIMIT = 4
+MIN_LIMIT = 1
+MAX_LIMIT = 64
+LATENCY_TOLERANCE = 2.0     # Slower than this multiple of the usual latency counts as congestion
+BACKOFF_FACTOR = 0.5        # Limit multiplier on overload
+SLOWDOWN_FACTOR = 0.9       # Limit multiplier on latency inflation
+DECREASE_COOLDOWN = 2.0     # Seconds between decreases, so one burst of 429s halves the limit once
+MAX_ATTEMPTS = 8
+ATTEMPTS_KWARG = "_adaptive_attempts"   # Per-call attempt cap, set by callers that fail over themselves
+BASE_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60.0
+FAILURE_THRESHOLD = 5       # Consecutive failures that open the circuit
+CIRCUIT_RESET_SECONDS = 30.0
+
+@functools.lru_cache(maxsize=None)
+def overload_errors():
+    """SDK errors that mean the API is overloaded (the SDK is imported on first use)"""
+    import openai
+    return (openai.RateLimitError, openai.InternalServerError,
+            openai.APITimeoutError, openai.APIConnectionError)
+
+def retry_after_seconds(error):
+    """Server-suggested wait from retry-after(-ms) headers, or None"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max((parsedate_to_datetime(value).timestamp() - time.time()), 0.0)
+        except (TypeError, ValueError):
+            return None
+
+def backoff_seconds(attempt):
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2 ** attempt))
+
+def latency_key(kwargs):
+    """Model plus prompt-size bucket, the unit normal latency is tracked in"""
+    size = len(str(kwargs.get("messages", ""))) or 1
+    return kwargs.get("model"), int(math.log2(size))
+
+class AdaptiveLimiter:
+    """AIMD limit on in-flight requests"""
+    def __init__(self, initial=INITIAL_LIMIT, min_limit=MIN_LIMIT, max_limit=MAX_LIMIT):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.in_flight = 0
+        self.usual_latency = {}
+        self.last_decrease = 0.0
+        self.peak_limit = self.limit
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self, key=None, seconds=None, overloaded=False):
+        with self.condition:
+            self.in_flight -= 1
+            if overloaded:
+                self._decrease(BACKOFF_FACTOR)
+            elif seconds is not None:
+                usual = self.usual_latency.get(key)
+                if usual is not None and seconds > usual * LATENCY_TOLERANCE:
+                    self._decrease(SLOWDOWN_FACTOR)
+                else:
+                    # Additive increase: about +1 per full window of healthy responses
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                    self.peak_limit = max(self.peak_limit, self.limit)
+                # Slow-moving average, so a congested period doesn't become the new normal at once
+                self.usual_latency[key] = seconds if usual is None else usual * 0.9 + seconds * 0.1
+            self.condition.notify_all()
+
+    def _decrease(self, factor):
+        now = time.monotonic()
+        if now - self.last_decrease < DECREASE_COOLDOWN:
+            return
+        self.last_decrease = now
+        self.limit = max(self.min_limit, self.limit * factor)
+
+class CircuitBreaker:
+    """Stops calls after repeated consecutive failures; lets one trial through after a cooldown"""
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_seconds=CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.trial_running = False
+        self.times_opened = 0
+        self.lock = threading.Lock()
+
+    def wait_until_allowed(self):
+        """Block while the circuit is open (or another thread is running the trial call)"""
+        while True:
+            with self.lock:
+                if self.state == "closed":
+                    return
+                remaining = self.opened_at + self.reset_seconds - time.monotonic()
+                if self.state == "open" and remaining <= 0:
+                    self.state = "half-open"
+                if self.state == "half-open" and not self.trial_running:
+                    self.trial_running = True
+                    return
+            time.sleep(min(max(remaining, 0.1), 1.0))
+
+    def success(self):
+        with self.lock:
+            if self.state != "closed":
+                print("Circuit closed: API calls resumed")
+            self.failures = 0
+            self.state = "closed"
+            self.trial_running = False
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == "half-open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self.times_opened += 1
+                print(f"Circuit open after {self.failures} consecutive failures; pausing API calls for {self.reset_seconds:.0f}s")
+            self.trial_running = False
+
+class AdaptiveClient(ClientWrapper):
+    """
+    Client wrapper running every call under an AdaptiveLimiter and CircuitBreaker
+    Overloaded calls are retried up to MAX_ATTEMPTS times (or the call's ATTEMPTS_KWARG,
+    which the model router sets so it can move to another model sooner); other
+    errors pass straight through.
+    """
+    def __init__(self, client, limiter=None, breaker=None, max_attempts=MAX_ATTEMPTS):
+        super().__init__(client)
+        self.limiter = limiter or AdaptiveLimiter()
+        self.breaker = breaker or CircuitBreaker()
+        self.max_attempts = max_attempts
+        self.retries = 0
+        self.overloads = 0
+
+    def _create_completion(self, **kwargs):
+        return self._call(super()._create_completion, kwargs)
+
+    def _create_transcription(self, **kwargs):
+        return self._call(super()._create_transcription, kwargs)
+
+    def _call(self, create, kwargs):
+        kwargs = dict(kwargs)
+        max_attempts = kwargs.pop(ATTEMPTS_KWARG, self.max_attempts)
+        key = latency_key(kwargs)
+        for attempt in range(max_attempts):
+            self.breaker.wait_until_allowed()
+            self.limiter.acquire()
+            started = time.monotonic()
+            try:
+                response = create(**kwargs)
+            except overload_errors() as e:
+                self.limiter.release(key, overloaded=True)
+                self.breaker.failure()
+                self.overloads += 1
+                if attempt == max_attempts - 1:
+                    raise
+                wait = retry_after_seconds(e)
+                wait = backoff_seconds(attempt) if wait is None else wait
+                print(f"API overloaded ({type(e).__name__}); retrying in {wait:.1f}s "
+                      f"(concurrency limit now {int(self.limiter.limit)})")
+                self.retries += 1
+                time.sleep(wait)
+                continue
+            except Exception:
+                self.limiter.release(key)
+                self.breaker.success()
+                raise
+            self.limiter.release(key, time.monotonic() - started)
+            self.breaker.success()
+            return response
+
+    def report(self):
+        return {
+            "concurrency_limit": int(self.limiter.limit),
+            "peak_limit": int(self.limiter.peak_limit),
+            "overloads": self.overloads,
+            "retries": self.retries,
+            "circuit_opened": self.breaker.times_opened
+        }
+
+    def print_report(self):
+        report = self.report()
+        print(f"  Concurrency limit {report['concurrency_limit']} (peak {report['peak_limit']}), "
+              f"{report['overloads']} overloads, {report['retries']} retries, "
+              f"circuit opened {report['circuit_opened']} times")
@@ -0,0 +1,163 @@
+"""
+Per-episode record of the analysis responses, for cheap re-analysis after edits.
+
+Every chat completion the analysis makes for an episode is stored under a hash
+of its request (stage, messages, temperature...; not the model the router
+happened to pick). The record is saved as `.analysis_cache.json` in the episode
+folder together with a fingerprint of the transcript it was made from.
+
+When a transcript is edited by hand, the analysis is run again through a
+client that answers every request it has seen before from the record. Only
+the cue-level pieces whose text changed (their chunk insights, interval
+summaries) and the reduces that consume them miss, so a one-word fix costs a
+few calls instead of the whole episode.
+"""
+
+import difflib
+import hashlib
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add project root to Python path so the prompts package resolves when run from src/
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from api_client import ClientWrapper, stage_client
+from prompts.registry.essential.show_notes.timestamps import parse_srt_transcript
+
+ANALYSIS_CACHE_FILE = ".analysis_cache.json"
+KEEP_RUNS = 2   # Responses unused for this many runs are dropped
+
+# Request fields that don't change the answer we want back
+UNKEYED_FIELDS = {"model", "timeout", "stream", "stream_options"}
+
+def request_key(stage, kwargs):
+    """Hash of a chat completion request; the same prompt on any model maps to the same key"""
+    keyed = {name: value for name, value in kwargs.items() if name not in UNKEYED_FIELDS}
+    payload = json.dumps({"stage": stage, "request": keyed}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+def transcript_fingerprint(transcript_text):
+    """sha256 of the transcript and a short hash of every cue's text, in order"""
+    cues = [
+        hashlib.sha1(entry.text.encode('utf-8')).hexdigest()[:12]
+        for entry in parse_srt_transcript(transcript_text)
+    ]
+    return hashlib.sha256(transcript_text.encode('utf-8')).hexdigest(), cues
+
+def changed_cues(old_cues, new_cues):
+    """Indexes (in the new transcript) of cues edited or inserted, plus the number removed"""
+    changed = []
+    removed = 0
+    matcher = difflib.SequenceMatcher(None, old_cues, new_cues, autojunk=False)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        changed.extend(range(new_start, new_end))
+        removed += max((old_end - old_start) - (new_end - new_start), 0)
+    return changed, removed
+
+class AnalysisCache:
+    """Responses of one episode's analysis, keyed by request_key"""
+    def __init__(self, entries=None, transcript_sha=None, cues=None, streaming=True):
+        self.entries = entries or {}    # key -> {"content": ..., "idle": runs since last used}
+        self.transcript_sha = transcript_sha
+        self.cues = cues or []
+        # Streaming analyses make different requests (titles read the streamed description),
+        # so a re-analysis runs in the mode the record was made in
+        self.streaming = streaming
+        self.used = set()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, episode_folder):
+        """The episode's saved record; empty if there is none"""
+        path = Path(episode_folder) / ANALYSIS_CACHE_FILE
+        try:
+            data = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return cls()
+        return cls(data.get("entries"), data.get("transcript_sha"), data.get("cues"), data.get("streaming", True))
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.used.add(key)
+            return entry["content"]
+
+    def put(self, key, content):
+        with self.lock:
+            self.entries[key] = {"content": content, "idle": 0}
+            self.used.add(key)
+
+    def dumps(self, transcript_text):
+        """The record for this run: responses used now, plus recently used ones kept a little longer"""
+        transcript_sha, cues = transcript_fingerprint(transcript_text)
+        with self.lock:
+            entries = {}
+            for key, entry in self.entries.items():
+                idle = 0 if key in self.used else entry.get("idle", 0) + 1
+                if idle < KEEP_RUNS:
+                    entries[key] = {"content": entry["content"], "idle": idle}
+        return json.dumps({"transcript_sha": transcript_sha, "cues": cues, "streaming": self.streaming,
+                           "entries": entries})
+
+def cached_response(content):
+    """Just the parts of a chat completion the pipeline reads"""
+    message = SimpleNamespace(role="assistant", content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")], usage=None)
+
+def cached_stream(content):
+    """A recorded response replayed as a one-chunk stream"""
+    delta = SimpleNamespace(role="assistant", content=content)
+    yield SimpleNamespace(choices=[SimpleNamespace(index=0, delta=delta, finish_reason="stop")])
+
+class CachingClient(ClientWrapper):
+    """
+    Client wrapper that records chat completions in an AnalysisCache
+    With reuse, requests already in the cache are answered from it without
+    calling the API; otherwise every response is only recorded. Streams are
+    recorded once they have been read to the end.
+    """
+    def __init__(self, client, cache, reuse=False, stage=None):
+        super().__init__(client)
+        self.cache = cache
+        self.reuse = reuse
+        self.stage = stage
+
+    def for_stage(self, stage):
+        return CachingClient(stage_client(self._client, stage), self.cache, self.reuse, stage)
+
+    def _create_completion(self, **kwargs):
+        key = request_key(self.stage, kwargs)
+        if self.reuse:
+            content = self.cache.get(key)
+            if content is not None:
+                return cached_stream(content) if kwargs.get("stream") else cached_response(content)
+        response = super()._create_completion(**kwargs)
+        if kwargs.get("stream"):
+            return self._record_stream(key, response)
+        content = response.choices[0].message.content
+        if content:
+            self.cache.put(key, content)
+        return response
+
+    def _record_stream(self, key, stream):
+        parts = []
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+            yield chunk
+        if parts:
+            self.cache.put(key, "".join(parts))
@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+def create_client(**options):
+    """
+    Create an OpenAI client using the API key from the environment
+    Extra options (e.g. max_retries) are passed to the OpenAI constructor.
+    """
+    # Imported here: the SDK is the slowest import in the pipeline, and only needed once a client is made
+    from openai import OpenAI
+    from dotenv import load_dotenv
+    load_dotenv()
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"), **options)
+
+def stage_client(client, stage):
+    """Bind a routing client (see model_router.py) to a pipeline stage; other clients are returned as is"""
+    for_stage = getattr(client, "for_stage", None)
+    return for_stage(stage) if for_stage else client
+
+class ClientWrapper:
+    """
+    Stand-in for an OpenAI client that intercepts API calls.
+
+    Exposes the same `chat.completions.create` and `audio.transcriptions.create`
+    entry points the pipeline already uses, so a wrapped client can be passed
+    anywhere a plain client is accepted. Subclasses override the `_create_*`
+    methods; everything else is forwarded to the wrapped client.
+    """
+    def __init__(self, client):
+        self._client = client
+        self.chat = SimpleNamespace(
+            completions=SimpleNamespace(create=self._create_completion)
+        )
+        self.audio = SimpleNamespace(
+            transcriptions=SimpleNamespace(create=self._create_transcription)
+        )
+
+    def _create_completion(self, **kwargs):
+        return self._client.chat.completions.create(**kwargs)
+
+    def _create_transcription(self, **kwargs):
+        return self._client.audio.transcriptions.create(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+class RateLimiter:
+    """Thread-safe token bucket limiting requests per minute"""
+    def __init__(self, requests_per_minute, burst=None):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = burst or max(1, int(requests_per_minute // 10))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request slot is available"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class RateLimitedClient(ClientWrapper):
+    """Client wrapper that makes every API call wait on a shared RateLimiter"""
+    def __init__(self, client, limiter):
+        super().__init__(client)
+        self.limiter = limiter
+
+    def _create_completion(self, **kwargs):
+        self.limiter.acquire()
+        return super()._create_completion(**kwargs)
+
+    def _create_transcription(self, **kwargs):
+        self.limiter.acquire()
+        return super()._create_transcription(**kwargs)
+
+
+class UsageTrackingClient(ClientWrapper):
+    """Client wrapper that counts calls, tokens and time spent in chat completions"""
+    def __init__(self, client):
+        super().__init__(client)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "seconds": 0.0}
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.usage)
+
+    def _create_completion(self, **kwargs):
+        started = time.perf_counter()
+        response = super()._create_completion(**kwargs)
+        elapsed = time.perf_counter() - started
+        usage = getattr(response, "usage", None)
+        with self.lock:
+            self.usage["calls"] += 1
+            self.usage["seconds"] += elapsed
+            self.usage["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+            self.usage["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+        return response
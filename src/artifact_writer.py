@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+STAGING_PREFIX = ".episode-staging-"
+INCOMING_PREFIX = ".incoming-"      # Copy of a staged file that is being moved across filesystems
+DEFAULT_STAGING_ROOT = Path(__file__).resolve().parent.parent / "temp"
+
+def same_filesystem(first, second):
+    try:
+        return os.stat(first).st_dev == os.stat(second).st_dev
+    except OSError:
+        return False
+
+class EpisodeArtifactWriter:
+    """
+    Stages all of an episode's output files and commits them in one step.
+
+    Files are written to a staging directory under `staging_root` (the
+    project temp dir by default), which is outside the synced folders;
+    writing the same name twice just replaces the staged copy. `commit` moves
+    every staged file into the episode folder with atomic renames and then
+    (optionally) renames the folder, so each file is synced once and readers
+    never see a half-written episode.
+
+    When the staging directory is on another filesystem than the episode
+    folder, a file is first copied to a hidden name in the episode folder and
+    then renamed into place.
+    """
+    def __init__(self, episode_folder, staging_root=DEFAULT_STAGING_ROOT):
+        self.episode_folder = Path(episode_folder)
+        self.episode_folder.mkdir(parents=True, exist_ok=True)
+        root = Path(staging_root or DEFAULT_STAGING_ROOT)
+        root.mkdir(parents=True, exist_ok=True)
+        self.staging_dir = Path(tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=root))
+        self.same_filesystem = same_filesystem(self.staging_dir, self.episode_folder)
+        self.staged = {}
+
+    def write(self, name, content):
+        """Stage a text artifact; returns the path it will have once committed"""
+        staged_path = self.staging_dir / name
+        staged_path.write_text(content, encoding='utf-8')
+        self.staged[name] = staged_path
+        return str(self.episode_folder / name)
+
+    def write_bytes(self, name, content):
+        """Stage a binary artifact; returns the path it will have once committed"""
+        staged_path = self.staging_dir / name
+        staged_path.write_bytes(content)
+        self.staged[name] = staged_path
+        return str(self.episode_folder / name)
+
+    def path(self, name):
+        """Where to read an artifact from right now (staged copy first)"""
+        if name in self.staged:
+            return str(self.staged[name])
+        return str(self.episode_folder / name)
+
+    def partial_path(self, name):
+        """Scratch file for writing an artifact progressively; never committed"""
+        return str(self.staging_dir / f"{name}.partial")
+
+    def read(self, name):
+        path = Path(self.path(name))
+        return path.read_text(encoding='utf-8') if path.exists() else None
+
+    def commit(self, rename=None):
+        """
+        Move staged files into the episode folder, then optionally rename it
+        Args:
+            rename: Optional callable taking the episode folder and returning the
+                renamed folder path (or None if it was not renamed), e.g.
+                PodcastFolderManager.rename_folder
+        Returns the final episode folder path
+        """
+        for name, staged_path in self.staged.items():
+            self._move_in(staged_path, name)
+        committed = len(self.staged)
+        self.staged = {}
+        self.abort()
+
+        final_folder = self.episode_folder
+        if rename:
+            new_folder = rename(str(self.episode_folder))
+            if new_folder:
+                final_folder = Path(new_folder)
+        print(f"Committed {committed} episode files to {final_folder}")
+        return str(final_folder)
+
+    def _move_in(self, staged_path, name):
+        target = self.episode_folder / name
+        if self.same_filesystem:
+            os.replace(staged_path, target)
+            return
+        incoming = self.episode_folder / f"{INCOMING_PREFIX}{name}"
+        try:
+            shutil.copyfile(staged_path, incoming)
+            os.replace(incoming, target)
+        except OSError:
+            incoming.unlink(missing_ok=True)
+            raise
+
+    def abort(self):
+        """Discard anything still staged"""
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
@@ -0,0 +1,431 @@
+"""
+Acoustic fingerprinting to skip duplicate and redundant audio tracks.
+
+Zoom leaves several .m4a files per meeting (the mixed track plus one
+"Audio Record" file per participant), and sessions are sometimes exported
+again under a new name. Before transcribing, every track is fingerprinted
+locally: the audio is decoded to 8 kHz mono PCM, spectral peaks are picked
+from its spectrogram, and pairs of nearby peaks are hashed (landmark
+hashing). Two tracks share a conversation when many of their hashes match at
+one consistent time offset.
+
+- Within a meeting folder, the track that covers the most of the others (the
+  mixed track) is the one transcribed; the rest are recorded as redundant.
+- Against the ledger of tracks already transcribed, a track that matches an
+  earlier one over most of its length is recorded as a duplicate and skipped.
+
+The ledger (ledger.json plus one .npz of hashes per track) lives in a hidden
+folder at the watched root, so Whisper is never paid twice for the same
+conversation.
+
+Usage:
+    python src/audio_fingerprint.py scan ROOT [ROOT ...]            # report duplicate groups
+    python src/audio_fingerprint.py scan ROOT --record              # and add them to the ledger
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+SAMPLE_RATE = 8000
+FRAME_SIZE = 1024           # 128ms window
+HOP_SIZE = 256              # 32ms between frames
+PEAK_FREQ_RADIUS = 12       # A peak is the loudest bin within this many bins...
+PEAK_TIME_RADIUS = 8        # ...and this many frames around it
+PEAK_MIN_DB = 10.0          # ...and this far above the block's median level
+PEAKS_PER_SECOND = 10       # Strongest peaks kept per second of audio
+FAN_OUT = 5                 # Peaks each anchor is paired with
+MAX_PAIR_FRAMES = 63        # How far ahead paired peaks may be (about 2s)
+BLOCK_FRAMES = 4096         # Frames per spectrogram block, to bound memory on long recordings
+GAP_TOLERANCE = 2           # Frame gaps this close still match
+GAP_MASK = 0x3F             # Low bits of a hash hold the frame gap
+MAX_HASH_REPEATS = 50       # Hashes repeated more often than this in a track are ignored when matching
+
+CONTAINS_SCORE = 0.05       # Share of a track's hashes aligned in another that means it is contained
+DUPLICATE_SCORE = 0.3       # Aligned share (both ways) that makes two recordings the same session
+PARTICIPANT_FOLDER = "Audio Record"
+LEDGER_DIR_NAME = ".podcast_fingerprints"
+
+@dataclass
+class Fingerprint:
+    hashes: np.ndarray      # uint32 landmark hashes
+    times: np.ndarray       # int32 anchor frame of each hash
+    duration: float
+
+    @property
+    def size(self):
+        return len(self.hashes)
+
+def decode_pcm(path, sample_rate=SAMPLE_RATE):
+    """Decode any audio file to mono float32 PCM with ffmpeg"""
+    command = [
+        'ffmpeg', '-hide_banner', '-nostats', '-loglevel', 'error',
+        '-i', str(path), '-ac', '1', '-ar', str(sample_rate), '-f', 's16le', '-'
+    ]
+    result = subprocess.run(command, check=True, capture_output=True)
+    return np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32) / 32768
+
+def sliding_max(values, radius, axis):
+    """Maximum over a window of ±radius along an axis (separable max filter)"""
+    result = values.copy()
+    length = values.shape[axis]
+    for shift in range(1, radius + 1):
+        if shift >= length:
+            break
+        ahead = [slice(None)] * values.ndim
+        behind = [slice(None)] * values.ndim
+        ahead[axis], behind[axis] = slice(shift, None), slice(None, -shift)
+        np.maximum(result[tuple(behind)], values[tuple(ahead)], out=result[tuple(behind)])
+        np.maximum(result[tuple(ahead)], values[tuple(behind)], out=result[tuple(ahead)])
+    return result
+
+def spectral_peaks(samples):
+    """(frame, bin) of each spectrogram peak, computed block by block"""
+    if len(samples) < FRAME_SIZE:
+        return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+    window = np.hanning(FRAME_SIZE).astype(np.float32)
+    frame_count = 1 + (len(samples) - FRAME_SIZE) // HOP_SIZE
+    frames_all, bins_all = [], []
+    # Blocks overlap by the peak radius so peaks on block edges are judged with full context
+    for block_start in range(0, frame_count, BLOCK_FRAMES):
+        start = max(block_start - PEAK_TIME_RADIUS, 0)
+        stop = min(block_start + BLOCK_FRAMES + PEAK_TIME_RADIUS, frame_count)
+        frames = np.lib.stride_tricks.sliding_window_view(
+            samples[start * HOP_SIZE:(stop - 1) * HOP_SIZE + FRAME_SIZE], FRAME_SIZE
+        )[::HOP_SIZE]
+        spectrum = 20 * np.log10(np.abs(np.fft.rfft(frames * window, axis=1)) + 1e-6)
+        local_max = sliding_max(sliding_max(spectrum, PEAK_FREQ_RADIUS, 1), PEAK_TIME_RADIUS, 0)
+        is_peak = (spectrum == local_max) & (spectrum > np.median(spectrum) + PEAK_MIN_DB)
+        # Only the strongest peaks of each stretch survive, so background noise adds few hashes
+        frame_index, bin_index = np.nonzero(is_peak)
+        values = spectrum[frame_index, bin_index]
+        limit = int(PEAKS_PER_SECOND * len(spectrum) * HOP_SIZE / SAMPLE_RATE)
+        if len(values) > limit:
+            strongest = np.sort(np.argpartition(values, -limit)[-limit:])
+            frame_index, bin_index = frame_index[strongest], bin_index[strongest]
+        frame_index += start
+        keep = (frame_index >= block_start) & (frame_index < block_start + BLOCK_FRAMES)
+        frames_all.append(frame_index[keep])
+        bins_all.append(bin_index[keep])
+    return np.concatenate(frames_all).astype(np.int32), np.concatenate(bins_all).astype(np.int32)
+
+def landmark_hashes(peak_frames, peak_bins):
+    """Hash each peak with its next FAN_OUT peaks: anchor bin, target bin and frame gap"""
+    order = np.lexsort((peak_bins, peak_frames))
+    peak_frames, peak_bins = peak_frames[order], peak_bins[order]
+    hashes, times = [], []
+    for step in range(1, FAN_OUT + 1):
+        anchor_frames, target_frames = peak_frames[:-step], peak_frames[step:]
+        gap = target_frames - anchor_frames
+        valid = (gap > 0) & (gap <= MAX_PAIR_FRAMES)
+        anchor_bins, target_bins = peak_bins[:-step][valid], peak_bins[step:][valid]
+        hashes.append((anchor_bins.astype(np.uint32) << 16) | (target_bins.astype(np.uint32) << 6)
+                      | gap[valid].astype(np.uint32))
+        times.append(anchor_frames[valid])
+    if not hashes:
+        return np.zeros(0, dtype=np.uint32), np.zeros(0, dtype=np.int32)
+    return np.concatenate(hashes), np.concatenate(times).astype(np.int32)
+
+def fingerprint_samples(samples, sample_rate=SAMPLE_RATE):
+    hashes, times = landmark_hashes(*spectral_peaks(samples))
+    order = np.argsort(hashes, kind='stable')
+    return Fingerprint(hashes[order], times[order], len(samples) / sample_rate)
+
+def fingerprint_file(path):
+    return fingerprint_samples(decode_pcm(path))
+
+def matching_pairs(a, b, gap_shift=0):
+    """Index pairs (into a, into b) of equal hashes, a's frame gaps shifted by gap_shift"""
+    gaps = (a.hashes & GAP_MASK).astype(np.int64) + gap_shift
+    valid = (gaps >= 1) & (gaps <= MAX_PAIR_FRAMES)
+    a_positions = np.nonzero(valid)[0]
+    query = (a.hashes[valid] & ~np.uint32(GAP_MASK)) | gaps[valid].astype(np.uint32)
+    left = np.searchsorted(b.hashes, query, side='left')
+    counts = np.searchsorted(b.hashes, query, side='right') - left
+    counts[counts > MAX_HASH_REPEATS] = 0  # Hashes this common (hum, tones) say nothing about alignment
+    total = int(counts.sum())
+    # Every (a, b) pair sharing a hash, without a Python loop
+    a_index = np.repeat(a_positions, counts)
+    group_starts = np.repeat(np.cumsum(counts) - counts, counts)
+    b_index = np.repeat(left, counts) + (np.arange(total) - group_starts)
+    return a_index, b_index
+
+def aligned_matches(a, b):
+    """
+    Hashes of `a` found in `b` at the single most common time offset
+    Peaks can land one frame apart in two encodings of the same audio, so frame
+    gaps within GAP_TOLERANCE also match.
+    Returns (matches, offset in seconds of b relative to a)
+    """
+    if not a.size or not b.size:
+        return 0, 0.0
+    pairs = [matching_pairs(a, b, shift) for shift in range(-GAP_TOLERANCE, GAP_TOLERANCE + 1)]
+    a_index = np.concatenate([a_part for a_part, _ in pairs])
+    b_index = np.concatenate([b_part for _, b_part in pairs])
+    if not len(a_index):
+        return 0, 0.0
+    offsets = b.times[b_index].astype(np.int64) - a.times[a_index]
+    lowest = int(offsets.min())
+    histogram = np.bincount(offsets - lowest)
+    best = int(histogram.argmax())
+    # Neighbouring offsets belong to the same alignment (frame boundaries drift by one)
+    aligned = np.abs(offsets - lowest - best) <= 1
+    matches = len(np.unique(a_index[aligned]))
+    return matches, (best + lowest) * HOP_SIZE / SAMPLE_RATE
+
+def coverage(a, b):
+    """Share of a's hashes that line up in b"""
+    matches, _ = aligned_matches(a, b)
+    return matches / a.size if a.size else 0.0
+
+def is_duplicate(a, b):
+    """Same session: each recording is mostly found in the other"""
+    return coverage(a, b) >= DUPLICATE_SCORE and coverage(b, a) >= DUPLICATE_SCORE
+
+def is_participant_track(path):
+    return any(part.startswith(PARTICIPANT_FOLDER) for part in Path(path).parts)
+
+def choose_best_track(fingerprints):
+    """
+    The track to transcribe from a meeting's tracks: the one covering the most of
+    the others (the mixed track contains every participant), then the longest
+    Args:
+        fingerprints: dict of path -> Fingerprint
+    Returns (best path, dict of redundant path -> coverage by the best track)
+    """
+    paths = list(fingerprints)
+    if len(paths) == 1:
+        return paths[0], {}
+    scores = {
+        path: sum(coverage(fingerprints[other], fingerprints[path]) for other in paths if other != path)
+        for path in paths
+    }
+    best = max(paths, key=lambda path: (scores[path], not is_participant_track(path),
+                                        fingerprints[path].duration))
+    redundant = {
+        path: round(coverage(fingerprints[path], fingerprints[best]), 3)
+        for path in paths if path != best
+    }
+    return best, redundant
+
+def file_identity(path, sample_bytes=1 << 20):
+    """Cheap content id (size plus first and last MB), stable across renames"""
+    path = Path(path)
+    size = path.stat().st_size
+    digest = hashlib.sha1(str(size).encode())
+    with open(path, "rb") as f:
+        digest.update(f.read(sample_bytes))
+        if size > sample_bytes:
+            f.seek(max(size - sample_bytes, sample_bytes))
+            digest.update(f.read(sample_bytes))
+    return digest.hexdigest()[:20]
+
+class FingerprintLedger:
+    """
+    Tracks fingerprinted and what became of them
+    Entries are keyed by file identity: path, duration, status
+    ("transcribed", "redundant" or "duplicate") and, for skipped tracks, the
+    track they are covered by.
+    """
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path = self.directory / "ledger.json"
+        self.lock = threading.Lock()
+        self.entries = json.loads(self.path.read_text(encoding='utf-8')) if self.path.exists() else {}
+        self._cache = {}
+
+    def _save(self):
+        temp_path = self.path.with_suffix(".json.tmp")
+        temp_path.write_text(json.dumps(self.entries, indent=2), encoding='utf-8')
+        os.replace(temp_path, self.path)
+
+    def fingerprint(self, path):
+        """Fingerprint of the file, from the ledger's store when it was seen before"""
+        identity = file_identity(path)
+        _, fingerprint = self.fingerprint_by_identity(identity)
+        if fingerprint is None:
+            fingerprint = fingerprint_file(path)
+            np.savez(self.directory / f"{identity}.npz",
+                     hashes=fingerprint.hashes, times=fingerprint.times, duration=fingerprint.duration)
+            self._cache[identity] = fingerprint
+        return identity, fingerprint
+
+    def record(self, path, identity, fingerprint, status, covered_by=None, score=None):
+        with self.lock:
+            self.entries[identity] = {
+                "path": str(path),
+                "duration_seconds": round(fingerprint.duration, 1),
+                "status": status,
+                "covered_by": str(covered_by) if covered_by else None,
+                "score": score,
+                "recorded": time.strftime("%Y-%m-%dT%H:%M:%S")
+            }
+            self._save()
+
+    def status(self, identity):
+        entry = self.entries.get(identity)
+        return entry["status"] if entry else None
+
+    def find_duplicate(self, identity, fingerprint):
+        """An already transcribed track holding the same session, as (entry, score), or None"""
+        for other_identity, entry in list(self.entries.items()):
+            if other_identity == identity or entry["status"] != "transcribed":
+                continue
+            # Re-exports of one session have about the same length
+            if not 0.5 <= entry["duration_seconds"] / max(fingerprint.duration, 1) <= 2:
+                continue
+            _, other = self.fingerprint_by_identity(other_identity)
+            if other is not None and is_duplicate(fingerprint, other):
+                return entry, round(coverage(fingerprint, other), 3)
+        return None
+
+    def fingerprint_by_identity(self, identity):
+        if identity not in self._cache:
+            stored = self.directory / f"{identity}.npz"
+            if not stored.exists():
+                return identity, None
+            data = np.load(stored)
+            self._cache[identity] = Fingerprint(data["hashes"], data["times"], float(data["duration"]))
+        return identity, self._cache[identity]
+
+def meeting_folder(path):
+    """The meeting folder a track belongs to (participant tracks sit in a subfolder)"""
+    path = Path(path)
+    for parent in path.parents:
+        if not parent.name.startswith(PARTICIPANT_FOLDER):
+            return parent
+    return path.parent
+
+def meeting_tracks(folder):
+    """A meeting's non-empty tracks: those in its folder and in its participant subfolders, not deeper"""
+    folder = Path(folder)
+    tracks = list(folder.glob("*.m4a"))
+    for subfolder in folder.iterdir():
+        if subfolder.is_dir() and subfolder.name.startswith(PARTICIPANT_FOLDER):
+            tracks.extend(subfolder.glob("*.m4a"))
+    return sorted(path for path in tracks if path.stat().st_size > 0)
+
+class TrackSelector:
+    """
+    Decides whether a newly arrived track should be transcribed
+    Args:
+        ledger: FingerprintLedger of the watched tree
+        root: Optional watched root; recordings directly in it are not part of a meeting folder
+    """
+    def __init__(self, ledger, root=None):
+        self.ledger = ledger
+        self.root = Path(root).resolve() if root else None
+
+    def should_transcribe(self, file_path):
+        """
+        Returns (True, None) for the track to transcribe, or (False, reason)
+        Participant tracks wait for the mixed track of their meeting; the best
+        track of a meeting is skipped if it repeats an already transcribed session.
+        """
+        file_path = Path(file_path)
+        folder = meeting_folder(file_path)
+        if self.root is not None and folder.resolve() == self.root:
+            # Loose recordings at the root are unrelated sessions, compared only through the ledger
+            tracks = [file_path]
+        else:
+            tracks = meeting_tracks(folder)
+        if file_path not in tracks:
+            tracks.append(file_path)
+        if all(is_participant_track(track) for track in tracks):
+            return False, "only participant tracks so far; waiting for the mixed track"
+
+        fingerprints, identities = {}, {}
+        for track in tracks:
+            try:
+                identities[track], fingerprints[track] = self.ledger.fingerprint(track)
+            except subprocess.CalledProcessError:
+                if track == file_path:
+                    raise
+                print(f"Skipping {track.name} for now: it could not be decoded (still being written?)")
+        if self.ledger.status(identities[file_path]) in ("transcribed", "redundant", "duplicate"):
+            return False, f"already {self.ledger.status(identities[file_path])}"
+
+        best, redundant = choose_best_track(fingerprints)
+        for track, score in redundant.items():
+            if self.ledger.status(identities[track]) is None:
+                self.ledger.record(track, identities[track], fingerprints[track], "redundant", best, score)
+        if best != file_path:
+            return False, f"redundant with {best.name}"
+
+        duplicate = self.ledger.find_duplicate(identities[best], fingerprints[best])
+        if duplicate:
+            entry, score = duplicate
+            self.ledger.record(best, identities[best], fingerprints[best], "duplicate", entry["path"], score)
+            return False, f"same session as {entry['path']} (score {score})"
+        return True, None
+
+    def transcribed(self, file_path):
+        identity, fingerprint = self.ledger.fingerprint(file_path)
+        self.ledger.record(file_path, identity, fingerprint, "transcribed")
+
+def scan(roots, record=False, ledger_dir=None):
+    """Fingerprint every .m4a under the roots and group recordings of the same session"""
+    tracks = sorted(path for root in roots for path in Path(root).expanduser().rglob("*.m4a"))
+    ledger = FingerprintLedger(ledger_dir or Path(roots[0]).expanduser() / LEDGER_DIR_NAME)
+    fingerprints = {}
+    for track in tracks:
+        try:
+            fingerprints[track] = ledger.fingerprint(track)[1]
+        except subprocess.CalledProcessError as e:
+            print(f"Could not decode {track}: {e}")
+
+    # Connected components of "one contains the other", so participant tracks join through the mix
+    paths = list(fingerprints)
+    parent = {path: path for path in paths}
+    def root_of(path):
+        while parent[path] != path:
+            parent[path] = parent[parent[path]]
+            path = parent[path]
+        return path
+    for i, first in enumerate(paths):
+        for second in paths[i + 1:]:
+            a, b = fingerprints[first], fingerprints[second]
+            if not 0.5 <= a.duration / max(b.duration, 1) <= 2:
+                continue
+            if coverage(a, b) >= CONTAINS_SCORE or coverage(b, a) >= CONTAINS_SCORE:
+                parent[root_of(first)] = root_of(second)
+    members = {}
+    for path in paths:
+        members.setdefault(root_of(path), []).append(path)
+    groups = list(members.values())
+
+    for group in groups:
+        if len(group) == 1:
+            continue
+        best, redundant = choose_best_track({track: fingerprints[track] for track in group})
+        print(f"\n{best}  (best of {len(group)})")
+        for track, score in redundant.items():
+            print(f"  {track}  coverage {score:.2f}")
+            if record:
+                ledger.record(track, file_identity(track), fingerprints[track], "redundant", best, score)
+    print(f"\n{len(tracks)} tracks, {sum(len(group) - 1 for group in groups)} redundant or duplicate")
+    return groups
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find duplicate and redundant audio tracks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    scan_parser = subparsers.add_parser("scan", help="Group tracks that hold the same session")
+    scan_parser.add_argument("roots", nargs="+")
+    scan_parser.add_argument("--record", action="store_true", help="Record redundant tracks in the ledger")
+    scan_parser.add_argument("--ledger", help="Ledger directory (default: .podcast_fingerprints under the first root)")
+    args = parser.parse_args(argv)
+    scan(args.roots, args.record, args.ledger)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
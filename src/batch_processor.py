@@ -0,0 +1,309 @@
+"""
+Batch re-analysis of the back catalog.
+
+Finds every episode folder (a folder containing transcription.md) under one or
+more roots, filters them by stage, date or missing artifact, and runs
+`run_after_transcription` on them concurrently. All episodes share a single
+client whose adaptive concurrency limit converges on the account's real
+rate limit (see adaptive_concurrency.py).
+
+Episodes are queued shortest first by their predicted analysis time (see
+throughput_model.py), which gets show notes out soonest on average; each
+episode's predicted seconds and ETA go into the report.
+
+Progress is recorded in a JSON run report that is rewritten after every
+episode; re-running with --resume skips episodes the report marks as done.
+
+Usage:
+    python src/batch_processor.py ROOT [ROOT ...] [--missing show_notes.md] [--since 2024-01-01]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime
+from pathlib import Path
+
+from model_router import create_pipeline_client
+from hedging import HedgePolicy, MAX_HEDGE_RATE
+from post_transcription_processor import run_after_transcription
+from profiling import profiler_for_episode, profile_rate_from_env
+from throughput_model import default_throughput, schedule, mean_finish_minutes
+
+TRANSCRIPT_FILE = "transcription.md"
+EPISODE_INFO_FILE = "episode_info.md"
+SHOW_NOTES_FILE = "show_notes.md"
+ARTIFACTS = [EPISODE_INFO_FILE, SHOW_NOTES_FILE]
+
+STAGES = ["transcribed", "analyzed", "complete"]
+
+def find_episode_folders(roots):
+    """Find every folder under the given roots that contains a transcription"""
+    folders = set()
+    for root in roots:
+        for dirpath, dirnames, filenames in os.walk(root):
+            # Skip hidden folders (staging areas, caches)
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            if TRANSCRIPT_FILE in filenames:
+                folders.add(Path(dirpath).resolve())
+    return sorted(folders)
+
+def episode_stage(folder):
+    """
+    Determine how far an episode has progressed through the pipeline
+    Returns one of STAGES
+    """
+    folder = Path(folder)
+    if (folder / SHOW_NOTES_FILE).exists() and (folder / EPISODE_INFO_FILE).exists():
+        return "complete"
+    if (folder / EPISODE_INFO_FILE).exists():
+        return "analyzed"
+    return "transcribed"
+
+def episode_date(folder):
+    """Date of the episode from its YYYY-MM-DD folder name, falling back to the transcript mtime"""
+    folder = Path(folder)
+    date_match = re.search(r'(\d{4}-\d{2}-\d{2})', folder.name)
+    if date_match:
+        try:
+            return datetime.strptime(date_match.group(1), "%Y-%m-%d").date()
+        except ValueError:
+            pass
+    return date.fromtimestamp((folder / TRANSCRIPT_FILE).stat().st_mtime)
+
+def filter_episodes(folders, stages=None, since=None, until=None, missing=None):
+    """
+    Filter episode folders
+    Args:
+        folders: Episode folders to filter
+        stages: Optional list of stages to keep
+        since: Optional earliest episode date (inclusive)
+        until: Optional latest episode date (inclusive)
+        missing: Optional list of artifact names, keep episodes missing any of them
+    """
+    selected = []
+    for folder in folders:
+        if stages and episode_stage(folder) not in stages:
+            continue
+        if since or until:
+            episode_day = episode_date(folder)
+            if since and episode_day < since:
+                continue
+            if until and episode_day > until:
+                continue
+        if missing and all((Path(folder) / name).exists() for name in missing):
+            continue
+        selected.append(folder)
+    return selected
+
+class RunReport:
+    """Resumable JSON record of a batch run, rewritten after every episode"""
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        if self.path.exists():
+            self.data = json.loads(self.path.read_text(encoding='utf-8'))
+        else:
+            self.data = {"runs": [], "episodes": {}}
+
+    def start_run(self, total):
+        with self.lock:
+            self.data["runs"].append({
+                "started": datetime.now().isoformat(timespec='seconds'),
+                "episodes": total
+            })
+            self._save()
+
+    def queue(self, estimates):
+        """Record every queued episode's predicted seconds and ETA in one write"""
+        with self.lock:
+            for estimate in estimates:
+                entry = self.data["episodes"].setdefault(str(estimate.item), {})
+                entry.update(status="queued", predicted_seconds=round(estimate.seconds, 1),
+                             eta=estimate.eta.isoformat(timespec='seconds'))
+            self._save()
+
+    def completed(self):
+        """Episode folders that finished successfully in a previous run"""
+        return {
+            path for path, record in self.data["episodes"].items()
+            if record.get("status") == "done"
+        }
+
+    def record(self, folder, **fields):
+        with self.lock:
+            entry = self.data["episodes"].setdefault(str(folder), {})
+            entry.update(fields)
+            entry["updated"] = datetime.now().isoformat(timespec='seconds')
+            self._save()
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        temp_path.write_text(json.dumps(self.data, indent=2), encoding='utf-8')
+        os.replace(temp_path, self.path)
+
+class ProgressSummary:
+    """Single-line live summary of a batch run"""
+    def __init__(self, total, eta=None):
+        self.total = total
+        self.eta = eta      # Predicted end of the run, if known
+        self.counts = {"running": 0, "done": 0, "incomplete": 0, "failed": 0}
+        self.started = time.time()
+        self.lock = threading.Lock()
+
+    def update(self, previous, status):
+        with self.lock:
+            if previous:
+                self.counts[previous] -= 1
+            self.counts[status] += 1
+            self._print()
+
+    def _print(self):
+        finished = self.counts["done"] + self.counts["incomplete"] + self.counts["failed"]
+        elapsed = time.time() - self.started
+        print(
+            f"\n📊 [{finished}/{self.total}] done: {self.counts['done']}, "
+            f"incomplete: {self.counts['incomplete']}, failed: {self.counts['failed']}, "
+            f"running: {self.counts['running']} ({elapsed:.0f}s elapsed"
+            f"{f', ETA {self.eta:%H:%M}' if self.eta else ''})"
+        )
+
+def process_episode(folder, client, report, progress, consolidated=False, profile_rate=0.0):
+    """Run the analysis pipeline for one episode folder"""
+    started = time.time()
+    report.record(folder, status="running")
+    progress.update(None, "running")
+    profiler = profiler_for_episode(profile_rate)
+    try:
+        folder_name = run_after_transcription(str(Path(folder) / TRANSCRIPT_FILE), client,
+                                              consolidated=consolidated, profiler=profiler)
+        # run_after_transcription reports its own errors, so check the artifacts it left
+        status = "done" if episode_stage(folder) == "complete" else "incomplete"
+        report.record(folder, status=status, folder_name=folder_name,
+                      seconds=round(time.time() - started, 1), error=None)
+    except Exception as e:
+        status = "failed"
+        report.record(folder, status=status, error=str(e),
+                      seconds=round(time.time() - started, 1))
+    if profiler.enabled:
+        profiler.write(folder)
+    progress.update("running", status)
+    return status
+
+def queue_episodes(folders, workers, shortest=True):
+    """Estimates for the folders in run order (shortest first unless told otherwise), with ETAs"""
+    model = default_throughput()
+    estimates = []
+    for folder in folders:
+        estimate = model.estimate_episode(
+            (Path(folder) / TRANSCRIPT_FILE).read_text(encoding='utf-8'), Path(folder).name
+        )
+        estimate.item = folder
+        estimates.append(estimate)
+    return schedule(estimates, workers, shortest=shortest)
+
+def run_batch(folders, report, workers=3, requests_per_minute=None, client=None, consolidated=False,
+              hedging=None, profile_rate=0.0, order="shortest"):
+    """
+    Analyze episode folders concurrently
+    In-flight API calls are governed by the adaptive concurrency limit shared by all episodes.
+    Args:
+        requests_per_minute: Optional fixed global rate cap on top of the adaptive limit
+        hedging: Optional HedgePolicy duplicating slow interval/chunk calls
+        profile_rate: Share of episodes to profile (1 profiles every episode)
+        order: "shortest" runs the episodes with the least predicted analysis time
+            first; "given" keeps the folders' order
+    Returns a dict of status counts
+    """
+    client = create_pipeline_client(client, hedging=hedging, requests_per_minute=requests_per_minute)
+
+    report.start_run(len(folders))
+    estimates = queue_episodes(folders, workers, shortest=order == "shortest")
+    folders = [estimate.item for estimate in estimates]
+    report.queue(estimates)
+    run_eta = max((estimate.eta for estimate in estimates), default=None)
+    if estimates:
+        print(f"Predicted finish {run_eta:%H:%M}; mean time to show notes "
+              f"{mean_finish_minutes(estimates):.1f} min")
+    progress = ProgressSummary(len(folders), run_eta)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(process_episode, folder, client, report, progress, consolidated, profile_rate)
+            for folder in folders
+        ]
+        for future in as_completed(futures):
+            future.result()
+    print("\nModel routing:")
+    client.print_report()
+    return dict(progress.counts)
+
+def parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-run episode analysis over the back catalog")
+    parser.add_argument("roots", nargs="+", help="Folders to search for episode folders")
+    parser.add_argument("--stage", action="append", choices=STAGES,
+                        help="Only process episodes at this stage (repeatable)")
+    parser.add_argument("--since", type=parse_date, help="Earliest episode date (YYYY-MM-DD)")
+    parser.add_argument("--until", type=parse_date, help="Latest episode date (YYYY-MM-DD)")
+    parser.add_argument("--missing", action="append", choices=ARTIFACTS,
+                        help="Only process episodes missing this artifact (repeatable)")
+    parser.add_argument("--workers", type=int, default=3, help="Episodes processed concurrently")
+    parser.add_argument("--rpm", type=int,
+                        help="Optional fixed cap on global API requests per minute (concurrency adapts either way)")
+    parser.add_argument("--report", default=os.path.join("output", "batch_report.json"),
+                        help="Path of the resumable run report")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip episodes the report already marks as done")
+    parser.add_argument("--consolidated", action="store_true",
+                        help="Get guest, topic, keywords and titles from one structured call")
+    parser.add_argument("--hedge", action="store_true",
+                        help="Send a duplicate request when an interval or chunk call is unusually slow")
+    parser.add_argument("--hedge-rate", type=float, default=MAX_HEDGE_RATE,
+                        help="Most hedges allowed per hedged call (caps the extra spend)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile every episode (writes profile_summary.md into each folder)")
+    parser.add_argument("--profile-rate", type=float, default=profile_rate_from_env(),
+                        help="Share of episodes to profile (default from PODCAST_PROFILE_RATE)")
+    parser.add_argument("--order", choices=["shortest", "given"], default="shortest",
+                        help="Queue order: shortest predicted analysis first, or catalog order")
+    parser.add_argument("--dry-run", action="store_true", help="List matching episodes and exit")
+    args = parser.parse_args(argv)
+
+    folders = filter_episodes(
+        find_episode_folders(args.roots),
+        stages=args.stage,
+        since=args.since,
+        until=args.until,
+        missing=args.missing
+    )
+    report = RunReport(args.report)
+    if args.resume:
+        completed = report.completed()
+        folders = [folder for folder in folders if str(folder) not in completed]
+
+    print(f"Found {len(folders)} episodes to process")
+    if args.dry_run:
+        for estimate in queue_episodes(folders, args.workers, shortest=args.order == "shortest"):
+            print(f"  [{episode_stage(estimate.item)}] {estimate.item}: {estimate.describe()}")
+        return 0
+    if not folders:
+        return 0
+
+    hedging = HedgePolicy(max_hedge_rate=args.hedge_rate) if args.hedge else None
+    counts = run_batch(folders, report, workers=args.workers, requests_per_minute=args.rpm,
+                       consolidated=args.consolidated, hedging=hedging,
+                       profile_rate=1.0 if args.profile else args.profile_rate, order=args.order)
+    print(f"\nBatch finished: {counts['done']} done, {counts['incomplete']} incomplete, "
+          f"{counts['failed']} failed. Report: {args.report}")
+    return 0 if counts["failed"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
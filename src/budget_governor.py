@@ -0,0 +1,453 @@
+"""
+Per-episode token and latency budgets for the analysis stages.
+
+Before analysis starts, the governor estimates what the episode will cost
+from the transcript (how many timeline segments and chunks it splits into,
+how long they are) and from the observed cost of each stage in earlier runs.
+If the estimate is over the episode's allowance, the analysis is degraded in
+a fixed order until it fits:
+
+    1. coarser timeline: fixed 10, 20, then 30 minute intervals instead of topic segments
+    2. sampled chunks: chunk insights for an evenly spread subset of chunks
+    3. no title suggestions
+
+The allowance is the per-episode cap, or what is left of the per-day cap if
+that is less. When even the degraded plan doesn't fit in what is left of the
+day, the episode only gets guest/topic and episode_info.md; the rest is
+postponed (batch_processor.py --missing show_notes.md picks it up later).
+
+While the analysis runs, a meter counts the real tokens and time per stage;
+calls past a hard limit (HARD_LIMIT_FACTOR times the allowance) are refused.
+The estimate, every decision and the actual spend are written to budget.json
+in the episode folder, and the actual spend updates the stage history and
+the day's total (output/budget_history.json).
+
+Caps come from the environment:
+    PODCAST_EPISODE_TOKEN_BUDGET    tokens per episode (default 120000)
+    PODCAST_EPISODE_SECONDS_BUDGET  seconds of API time per episode (default 1200)
+    PODCAST_DAILY_TOKEN_BUDGET      tokens per calendar day (default 2000000)
+A cap of 0 disables it.
+
+Usage:
+    python src/budget_governor.py ROOT [ROOT ...]   # show the plan each episode would get
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass, field, asdict
+from datetime import date, timedelta
+from pathlib import Path
+from typing import List, Optional
+
+# Add project root to Python path so the prompts package resolves when run from src/
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from api_client import ClientWrapper, stage_client
+from prompts.registry.essential.show_notes.chunker import split_into_chunks, sample_indexes
+from prompts.registry.essential.show_notes.projection import project_transcript
+from prompts.registry.essential.show_notes.timestamps import (
+    DEFAULT_SEGMENTATION, parse_srt_transcript, split_segments
+)
+
+EPISODE_TOKENS_ENV = "PODCAST_EPISODE_TOKEN_BUDGET"
+EPISODE_SECONDS_ENV = "PODCAST_EPISODE_SECONDS_BUDGET"
+DAILY_TOKENS_ENV = "PODCAST_DAILY_TOKEN_BUDGET"
+DEFAULT_EPISODE_TOKENS = 120000
+DEFAULT_EPISODE_SECONDS = 1200
+DEFAULT_DAILY_TOKENS = 2000000
+
+BUDGET_FILE = "budget.json"
+HISTORY_PATH = Path(__file__).resolve().parent.parent / "output" / "budget_history.json"
+HISTORY_DAYS = 31
+HISTORY_WEIGHT = 0.2              # Weight of the newest episode in the per-stage averages
+
+COARSER_INTERVALS = [10, 20, 30]  # Degradation step 1, in order
+MIN_SAMPLED_CHUNKS = 4            # Degradation step 2 never goes below this
+HARD_LIMIT_FACTOR = 1.5           # Calls are refused once actual spend passes this times the allowance
+CHARS_PER_TOKEN = 4.0
+
+# Stage -> (prompt characters per call, completion tokens per call, seconds per call), until history exists.
+# Interval, chunk and compile prompts are measured from the transcript; their figure is the template overhead.
+STAGE_DEFAULTS = {
+    "guest": (2400, 10, 1.5),
+    "topic": (3400, 10, 1.5),
+    "metadata": (4500, 300, 6.0),
+    "intro": (1500, 150, 4.0),
+    "keywords": (2500, 80, 3.0),
+    "titles": (800, 150, 3.0),
+    "interval": (450, 60, 3.0),
+    "chunk": (900, 400, 10.0),
+    "compile": (1000, 500, 15.0),
+}
+
+class BudgetExceededError(RuntimeError):
+    """Raised for calls made after an episode passed its hard spending limit"""
+
+def cap_from_env(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+def model_family(model):
+    """Model name without its release date: gpt-4o-mini-2024-07-18 -> gpt-4o-mini"""
+    return re.sub(r'-\d{4}(-\d{2}-\d{2})?$', '', model) if model else None
+
+def message_chars(messages):
+    return sum(len(str(message.get("content", ""))) for message in messages or [])
+
+@dataclass
+class AnalysisPlan:
+    """How an episode is analyzed; the defaults are the full analysis"""
+    segmentation: str = DEFAULT_SEGMENTATION
+    interval_minutes: int = 5
+    max_chunks: Optional[int] = None
+    titles: bool = True
+    postponed: bool = False
+    allowance_tokens: Optional[int] = None
+    allowance_seconds: Optional[int] = None
+    estimate: dict = field(default_factory=dict)
+    decisions: List[dict] = field(default_factory=list)
+
+    def decide(self, step, detail, estimate):
+        self.estimate = estimate
+        self.decisions.append({"step": step, "detail": detail,
+                               "tokens": estimate["tokens"], "seconds": estimate["seconds"]})
+        print(f"Budget: {detail} (estimate {estimate['tokens']} tokens, {estimate['seconds']:.0f}s)")
+
+    @property
+    def hard_limit(self):
+        return self.allowance_tokens * HARD_LIMIT_FACTOR if self.allowance_tokens else None
+
+class StageUsage:
+    """Actual tokens, calls and seconds per stage for one episode"""
+    def __init__(self, hard_limit=None):
+        self.hard_limit = hard_limit
+        self.stages = {}
+        self.models = {}    # Model -> tokens and seconds, whichever stage used it
+        self.refused = 0
+        self.lock = threading.Lock()
+
+    @property
+    def tokens(self):
+        with self.lock:
+            return sum(stage["prompt_tokens"] + stage["completion_tokens"] for stage in self.stages.values())
+
+    def check(self):
+        if self.hard_limit and self.tokens > self.hard_limit:
+            with self.lock:
+                self.refused += 1
+            raise BudgetExceededError(f"episode passed its hard limit of {self.hard_limit:.0f} tokens")
+
+    def add(self, stage, prompt_chars, prompt_tokens, completion_tokens, seconds, model=None):
+        with self.lock:
+            if model:
+                model_totals = self.models.setdefault(model, {"calls": 0, "tokens": 0, "seconds": 0.0})
+                model_totals["calls"] += 1
+                model_totals["tokens"] += prompt_tokens + completion_tokens
+                model_totals["seconds"] += seconds
+            totals = self.stages.setdefault(stage or "other", {
+                "calls": 0, "prompt_chars": 0, "prompt_tokens": 0, "completion_tokens": 0, "seconds": 0.0
+            })
+            totals["calls"] += 1
+            totals["prompt_chars"] += prompt_chars
+            totals["prompt_tokens"] += prompt_tokens
+            totals["completion_tokens"] += completion_tokens
+            totals["seconds"] += seconds
+
+class BudgetMeter(ClientWrapper):
+    """Client wrapper that records per-stage spend in a StageUsage and enforces its hard limit"""
+    def __init__(self, client, usage, stage=None):
+        super().__init__(client)
+        self.usage = usage
+        self.stage = stage
+
+    def for_stage(self, stage):
+        return BudgetMeter(stage_client(self._client, stage), self.usage, stage)
+
+    def _create_completion(self, **kwargs):
+        self.usage.check()
+        chars = message_chars(kwargs.get("messages"))
+        started = time.monotonic()
+        response = super()._create_completion(**kwargs)
+        if kwargs.get("stream"):
+            return self._meter_stream(response, chars, started, kwargs.get("model"))
+        # The router may have failed over, so the response names the model that answered
+        model = model_family(getattr(response, "model", None) or kwargs.get("model"))
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", None) or int(chars / CHARS_PER_TOKEN)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        if completion_tokens is None:
+            completion_tokens = int(len(response.choices[0].message.content or "") / CHARS_PER_TOKEN)
+        self.usage.add(self.stage, chars, prompt_tokens, completion_tokens, time.monotonic() - started, model)
+        return response
+
+    def _meter_stream(self, stream, chars, started, model=None):
+        # Streams carry no usage; count the text instead
+        text_chars = 0
+        for chunk in stream:
+            model = getattr(chunk, "model", None) or model
+            if chunk.choices and chunk.choices[0].delta.content:
+                text_chars += len(chunk.choices[0].delta.content)
+            yield chunk
+        self.usage.add(self.stage, chars, int(chars / CHARS_PER_TOKEN), int(text_chars / CHARS_PER_TOKEN),
+                       time.monotonic() - started, model_family(model))
+
+class BudgetGovernor:
+    """
+    Plans each episode's analysis within the budget and keeps the spend history
+    Args:
+        episode_tokens / episode_seconds / daily_tokens: Caps (0 or None: no cap)
+        history_path: JSON file with per-stage averages and per-day spend
+    """
+    def __init__(self, episode_tokens=None, episode_seconds=None, daily_tokens=None, history_path=HISTORY_PATH):
+        self.episode_tokens = episode_tokens
+        self.episode_seconds = episode_seconds
+        self.daily_tokens = daily_tokens
+        self.history_path = Path(history_path)
+        self.reserved = 0   # Estimated tokens of episodes being analyzed right now
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, history_path=HISTORY_PATH):
+        return cls(
+            cap_from_env(EPISODE_TOKENS_ENV, DEFAULT_EPISODE_TOKENS),
+            cap_from_env(EPISODE_SECONDS_ENV, DEFAULT_EPISODE_SECONDS),
+            cap_from_env(DAILY_TOKENS_ENV, DEFAULT_DAILY_TOKENS),
+            history_path
+        )
+
+    def load_history(self):
+        try:
+            history = json.loads(self.history_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            history = {}
+        history.setdefault("stages", {})
+        history.setdefault("days", {})
+        return history
+
+    def spent_today(self, history=None):
+        history = history or self.load_history()
+        return history["days"].get(date.today().isoformat(), 0)
+
+    def stage_costs(self, history, stage):
+        """(prompt chars, completion tokens, seconds per call, prompt tokens per char) for a stage"""
+        prompt_chars, completion_tokens, seconds = STAGE_DEFAULTS[stage]
+        observed = history["stages"].get(stage)
+        if not observed:
+            return prompt_chars, completion_tokens, seconds, 1 / CHARS_PER_TOKEN
+        return (observed.get("prompt_chars", prompt_chars), observed["completion_tokens"], observed["seconds"],
+                observed["tokens_per_char"])
+
+    def estimate(self, transcript_content, plan, consolidated=False, history=None):
+        """Calls, tokens and seconds per stage for a plan"""
+        history = history or self.load_history()
+        stages = {}
+
+        def add(stage, calls, prompt_chars=None):
+            """prompt_chars: total measured prompt characters for the calls (default: per-call history)"""
+            per_call_chars, completion, seconds, tokens_per_char = self.stage_costs(history, stage)
+            if prompt_chars is None:
+                prompt_chars = per_call_chars * calls
+            else:
+                prompt_chars += STAGE_DEFAULTS[stage][0] * calls
+            stages[stage] = {
+                "calls": calls,
+                "tokens": int(prompt_chars * tokens_per_char + completion * calls),
+                "seconds": round(seconds * calls, 1)
+            }
+            return completion
+
+        if consolidated:
+            add("metadata", 1)
+        else:
+            add("guest", 1)
+            add("topic", 1)
+        if not plan.postponed:
+            add("intro", 1)
+            if not consolidated:
+                add("keywords", 1)
+                if plan.titles:
+                    add("titles", 1)
+            segments = split_segments(parse_srt_transcript(transcript_content), plan.segmentation,
+                                      plan.interval_minutes)
+            add("interval", len(segments), sum(len(text) for _, text in segments))
+            chunks = split_into_chunks(project_transcript(transcript_content).text)
+            selected = [chunks[i] for i in sample_indexes(len(chunks), plan.max_chunks)]
+            insight_tokens = add("chunk", len(selected), sum(len(chunk) for chunk in selected))
+            add("compile", 1, int(insight_tokens * len(selected) * CHARS_PER_TOKEN))
+
+        return {
+            "tokens": sum(stage["tokens"] for stage in stages.values()),
+            "seconds": round(sum(stage["seconds"] for stage in stages.values()), 1),
+            "stages": stages
+        }
+
+    def fits(self, estimate, tokens, seconds):
+        return (not tokens or estimate["tokens"] <= tokens) and (not seconds or estimate["seconds"] <= seconds)
+
+    def plan(self, transcript_content, consolidated=False, previous=None):
+        """
+        The analysis plan for an episode, degraded as far as needed to fit its allowance
+        The plan's estimated tokens are reserved against today's cap until `settle`.
+        Args:
+            previous: Optional plan of the episode's last analysis (see load_plan); a
+                re-analysis keeps its settings so the recorded responses still match
+        """
+        history = self.load_history()
+        with self.lock:
+            day_left = self.daily_tokens - self.spent_today(history) - self.reserved if self.daily_tokens else None
+        allowances = [cap for cap in (self.episode_tokens, day_left) if cap]
+        tokens = max(min(allowances), 0) if allowances else None
+        seconds = self.episode_seconds or None
+
+        plan = AnalysisPlan(allowance_tokens=tokens, allowance_seconds=seconds)
+        if previous and not previous.postponed:
+            plan.segmentation, plan.interval_minutes = previous.segmentation, previous.interval_minutes
+            plan.max_chunks, plan.titles = previous.max_chunks, previous.titles
+            plan.decide("kept_plan", "re-analysis keeps the last analysis plan",
+                        self.estimate(transcript_content, plan, consolidated, history))
+            with self.lock:
+                self.reserved += plan.estimate["tokens"]
+            return plan
+        plan.estimate = self.estimate(transcript_content, plan, consolidated, history)
+
+        for minutes in COARSER_INTERVALS:
+            if self.fits(plan.estimate, tokens, seconds):
+                break
+            plan.segmentation, plan.interval_minutes = "fixed", minutes
+            plan.decide("coarser_timeline", f"timeline in fixed {minutes}-minute intervals",
+                        self.estimate(transcript_content, plan, consolidated, history))
+
+        if not self.fits(plan.estimate, tokens, seconds):
+            chunk_count = len(split_into_chunks(project_transcript(transcript_content).text))
+            limit = chunk_count
+            while limit > MIN_SAMPLED_CHUNKS and not self.fits(plan.estimate, tokens, seconds):
+                limit = max(limit * 3 // 4, MIN_SAMPLED_CHUNKS)
+                plan.max_chunks = limit
+                plan.estimate = self.estimate(transcript_content, plan, consolidated, history)
+            if plan.max_chunks:
+                plan.decide("sampled_chunks", f"chunk insights for {plan.max_chunks} of {chunk_count} chunks",
+                            plan.estimate)
+
+        if not self.fits(plan.estimate, tokens, seconds) and not consolidated:
+            plan.titles = False
+            plan.decide("skip_titles", "no title suggestions",
+                        self.estimate(transcript_content, plan, consolidated, history))
+
+        if day_left is not None and plan.estimate["tokens"] > day_left:
+            plan.postponed = True
+            plan.decide("postponed", f"only {max(day_left, 0)} tokens left today; timeline and show notes postponed",
+                        self.estimate(transcript_content, plan, consolidated, history))
+        elif not self.fits(plan.estimate, tokens, seconds):
+            plan.decisions.append({"step": "over_budget", "detail": "still over budget at the lowest quality",
+                                   "tokens": plan.estimate["tokens"], "seconds": plan.estimate["seconds"]})
+            print("Budget: still over budget at the lowest quality; running it anyway")
+
+        with self.lock:
+            self.reserved += plan.estimate["tokens"]
+        return plan
+
+    def meter(self, client, plan):
+        """Client that records the episode's spend and refuses calls past the plan's hard limit"""
+        return BudgetMeter(client, StageUsage(plan.hard_limit))
+
+    def settle(self, plan, usage, writer=None, episode_folder=None):
+        """
+        Release the plan's reservation, add the actual spend to the history and
+        record plan and spend in budget.json (staged on writer if given)
+        """
+        actual = {
+            "tokens": usage.tokens,
+            "seconds": round(sum(stage["seconds"] for stage in usage.stages.values()), 1),
+            "refused_calls": usage.refused,
+            "stages": usage.stages,
+            "models": usage.models
+        }
+        with self.lock:
+            self.reserved -= plan.estimate.get("tokens", 0)
+            history = self.load_history()
+            today = date.today()
+            history["days"][today.isoformat()] = history["days"].get(today.isoformat(), 0) + actual["tokens"]
+            oldest = (today - timedelta(days=HISTORY_DAYS)).isoformat()
+            history["days"] = {day: spent for day, spent in history["days"].items() if day >= oldest}
+            for stage, totals in usage.stages.items():
+                if stage not in STAGE_DEFAULTS or not totals["calls"]:
+                    continue
+                self._update_stage(history["stages"], stage, totals)
+            self.history_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.history_path.with_suffix(".json.tmp")
+            temp_path.write_text(json.dumps(history, indent=2), encoding='utf-8')
+            os.replace(temp_path, self.history_path)
+
+        content = json.dumps({"plan": asdict(plan), "actual": actual}, indent=2)
+        if writer:
+            return writer.write(BUDGET_FILE, content)
+        path = Path(episode_folder) / BUDGET_FILE
+        path.write_text(content, encoding='utf-8')
+        return str(path)
+
+    def _update_stage(self, stages, stage, totals):
+        calls = totals["calls"]
+        sample = {
+            "completion_tokens": totals["completion_tokens"] / calls,
+            "seconds": totals["seconds"] / calls,
+            "tokens_per_char": totals["prompt_tokens"] / max(totals["prompt_chars"], 1),
+        }
+        # Per-call prompt size only predicts the stages whose prompt isn't measured from the transcript
+        if stage not in ("interval", "chunk", "compile"):
+            sample["prompt_chars"] = totals["prompt_chars"] / calls
+        observed = stages.get(stage)
+        if observed:
+            sample = {name: round(observed.get(name, value) * (1 - HISTORY_WEIGHT) + value * HISTORY_WEIGHT, 4)
+                      for name, value in sample.items()}
+        stages[stage] = {name: round(value, 4) for name, value in sample.items()}
+
+def load_plan(episode_folder):
+    """The plan recorded in an episode's budget.json, or None"""
+    try:
+        recorded = json.loads((Path(episode_folder) / BUDGET_FILE).read_text(encoding='utf-8'))["plan"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return AnalysisPlan(**{name: value for name, value in recorded.items() if name in AnalysisPlan.__dataclass_fields__})
+
+_default_governor = None
+_default_governor_lock = threading.Lock()
+
+def default_governor():
+    """The process-wide governor configured from the environment"""
+    global _default_governor
+    with _default_governor_lock:
+        if _default_governor is None:
+            _default_governor = BudgetGovernor.from_env()
+        return _default_governor
+
+def main(argv=None):
+    # Imported here: batch_processor imports the analysis, which imports this module
+    from batch_processor import find_episode_folders, TRANSCRIPT_FILE
+
+    parser = argparse.ArgumentParser(description="Show the budget plan episodes would be analyzed with")
+    parser.add_argument("roots", nargs="+", help="Folders to search for episode folders")
+    parser.add_argument("--consolidated", action="store_true", help="Plan for the single metadata call")
+    args = parser.parse_args(argv)
+
+    governor = BudgetGovernor.from_env()
+    print(f"Spent today: {governor.spent_today()} tokens of {governor.daily_tokens or 'unlimited'}")
+    for folder in find_episode_folders(args.roots):
+        transcript = (Path(folder) / TRANSCRIPT_FILE).read_text(encoding='utf-8')
+        print(f"\n{Path(folder).name}")
+        plan = governor.plan(transcript, args.consolidated)
+        governor.reserved = 0   # Nothing runs; don't let one plan squeeze the next
+        print(f"  estimate {plan.estimate['tokens']} tokens, {plan.estimate['seconds']:.0f}s"
+              f"{'' if plan.decisions else ' (full analysis)'}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,472 @@
+"""
+Deferred (Batch API) mode for analysis stages that don't need interactive latency.
+
+Instead of calling chat completions synchronously, the requests for the
+selected stages are serialized into JSONL batch files, submitted, polled,
+and the results are mapped back to their episode folders to finish
+episode_info.md and show_notes.md.
+
+Stages run in two phases because some requests depend on earlier results:
+    phase 1: keywords, chunk insights, timeline interval summaries
+    phase 2: titles (need keywords), final show notes compile (needs chunk insights)
+
+All state lives in a job directory (manifest.json plus the batch input and
+result files), so an interrupted run can be resumed with `--job`.
+
+Episodes must already have an episode_info.md with Guest and Topic lines; the
+deferred stages reuse them rather than re-extracting.
+
+Usage:
+    python src/deferred_analysis.py run ROOT [ROOT ...] --stages keywords titles show_notes
+    python src/deferred_analysis.py run --job output/deferred/20240301-120000
+    python src/deferred_analysis.py run ROOT --backend local   # offline stand-in
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from api_client import create_client
+from artifact_writer import EpisodeArtifactWriter
+from batch_processor import find_episode_folders, filter_episodes, TRANSCRIPT_FILE, SHOW_NOTES_FILE
+from post_transcription_processor import (
+    read_transcript, load_episode_info, save_episode_info,
+    validate_keywords, validate_titles, build_keyword_messages
+)
+from prompts.registry import prompt_versions
+from prompts.registry.essential.show_notes.title_suggestions import create_messages as create_title_messages
+from prompts.registry.essential.show_notes.chunker import split_into_chunks, create_chunk_messages
+from prompts.registry.essential.show_notes.GPT_creator import (
+    SYSTEM_PROMPT as SHOW_NOTES_SYSTEM_PROMPT, CHUNK_PROMPT_TEMPLATE, create_final_messages
+)
+from prompts.registry.essential.show_notes.projection import project_transcript
+from prompts.registry.essential.show_notes.timestamps import (
+    TimestampEntry, parse_srt_transcript, split_segments,
+    create_interval_messages, format_timestamp_section
+)
+
+STAGES = ["keywords", "titles", "show_notes"]
+MODEL = "gpt-3.5-turbo"
+ENDPOINT = "/v1/chat/completions"
+FINISHED_STATUSES = {"completed", "failed", "expired", "cancelled"}
+PARTIAL_STATUSES = {"expired", "cancelled"}   # Ended early; requests that finished have results
+# Prompts the batch requests are built from; their versions are recorded in the manifest
+DEFERRED_PROMPTS = ["keyword_extraction", "title_suggestions", "GPT_creator", "timestamps"]
+
+def make_request(custom_id, messages, temperature=None):
+    """Build one Batch API request line"""
+    body = {"model": MODEL, "messages": messages}
+    if temperature is not None:
+        body["temperature"] = temperature
+    return {"custom_id": custom_id, "method": "POST", "url": ENDPOINT, "body": body}
+
+def parse_custom_id(custom_id):
+    """Split a custom_id of the form episode:kind:index"""
+    episode, kind, index = custom_id.split(":")
+    return int(episode), kind, int(index)
+
+class OpenAIBatchBackend:
+    """Submits JSONL files to the OpenAI Batch API"""
+    def __init__(self, client=None):
+        self.client = client or create_client()
+
+    def submit(self, input_path):
+        with open(input_path, "rb") as input_file:
+            uploaded = self.client.files.create(file=input_file, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=ENDPOINT,
+            completion_window="24h"
+        )
+        return batch.id
+
+    def status(self, batch_id):
+        return self.client.batches.retrieve(batch_id).status
+
+    def download(self, batch_id, output_path):
+        batch = self.client.batches.retrieve(batch_id)
+        if not batch.output_file_id:
+            raise RuntimeError(f"Batch {batch_id} finished without an output file ({batch.status})")
+        content = self.client.files.content(batch.output_file_id)
+        Path(output_path).write_text(content.text, encoding='utf-8')
+
+class LocalBatchBackend:
+    """
+    Local stand-in for the Batch API.
+
+    Consumes the same JSONL input and produces a result file in the Batch API
+    output format. Each request body is answered by `responder`, a callable
+    taking the request body and returning the completion text. Use
+    `client_responder` to answer through a (possibly fake) chat client.
+    """
+    def __init__(self, work_dir, responder=None):
+        self.work_dir = Path(work_dir)
+        self.responder = responder or echo_responder
+
+    def submit(self, input_path):
+        batch_id = f"local_{Path(input_path).stem}_{int(time.time() * 1000)}"
+        results = []
+        with open(input_path, encoding='utf-8') as input_file:
+            for line in input_file:
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                try:
+                    content = self.responder(request["body"])
+                    results.append({
+                        "id": f"{batch_id}_{len(results)}",
+                        "custom_id": request["custom_id"],
+                        "response": {
+                            "status_code": 200,
+                            "body": {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]}
+                        },
+                        "error": None
+                    })
+                except Exception as e:
+                    results.append({
+                        "id": f"{batch_id}_{len(results)}",
+                        "custom_id": request["custom_id"],
+                        "response": None,
+                        "error": {"message": str(e)}
+                    })
+        self._result_path(batch_id).write_text(
+            "\n".join(json.dumps(result) for result in results) + "\n",
+            encoding='utf-8'
+        )
+        return batch_id
+
+    def status(self, batch_id):
+        return "completed" if self._result_path(batch_id).exists() else "failed"
+
+    def download(self, batch_id, output_path):
+        Path(output_path).write_text(self._result_path(batch_id).read_text(encoding='utf-8'), encoding='utf-8')
+
+    def _result_path(self, batch_id):
+        return self.work_dir / f"{batch_id}.results.jsonl"
+
+def echo_responder(body):
+    """Deterministic offline response: just enough shape to pass validation"""
+    prompt = body["messages"][-1]["content"]
+    if "comma-separated list" in prompt:
+        return ", ".join(f"keyword {i}" for i in range(1, 21))
+    if "title options" in prompt:
+        return "\n".join(f"{i}. Local Title {i}" for i in range(1, 11))
+    return f"[local] {prompt[:80]}"
+
+def client_responder(client):
+    """Answer local batch requests through a chat completions client"""
+    def respond(body):
+        response = client.chat.completions.create(**body)
+        return response.choices[0].message.content
+    return respond
+
+class DeferredJob:
+    """A deferred analysis run over a set of episode folders"""
+    def __init__(self, job_dir):
+        self.job_dir = Path(job_dir)
+        self.manifest_path = self.job_dir / "manifest.json"
+        self.manifest = json.loads(self.manifest_path.read_text(encoding='utf-8'))
+
+    @classmethod
+    def create(cls, job_dir, folders, stages):
+        """Create a job directory for the given episode folders"""
+        job_dir = Path(job_dir)
+        job_dir.mkdir(parents=True, exist_ok=True)
+        episodes = []
+        for folder in folders:
+            info = load_episode_info(folder)
+            if not info or not info['guest'] or not info['topic']:
+                print(f"Skipping {folder}: no guest/topic in episode_info.md")
+                continue
+            episodes.append({"folder": str(folder), "info": info})
+
+        manifest = {
+            "created": datetime.now().isoformat(timespec='seconds'),
+            "stages": list(stages),
+            "prompt_versions": prompt_versions(DEFERRED_PROMPTS),
+            "episodes": episodes,
+            "phases": {},
+            "results": {},
+            "finished": False
+        }
+        (job_dir / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+        return cls(job_dir)
+
+    def save(self):
+        temp_path = self.manifest_path.with_suffix(".json.tmp")
+        temp_path.write_text(json.dumps(self.manifest, indent=2), encoding='utf-8')
+        os.replace(temp_path, self.manifest_path)
+
+    def build_requests(self, phase):
+        """Build the batch requests for a phase from the manifest and earlier results"""
+        stages = self.manifest["stages"]
+        results = self.manifest["results"]
+        requests = []
+
+        for episode_id, episode in enumerate(self.manifest["episodes"]):
+            info = episode["info"]
+            transcript = read_transcript(Path(episode["folder"]) / TRANSCRIPT_FILE)
+
+            if phase == 1:
+                # Titles need keywords; only request them if we don't already have valid ones
+                if "keywords" in stages or ("titles" in stages and not validate_keywords(info['keywords'])):
+                    requests.append(make_request(
+                        f"{episode_id}:keywords:0",
+                        build_keyword_messages(transcript, info['guest'], info['topic'], episode["folder"])
+                    ))
+                if "show_notes" in stages:
+                    chunks = split_into_chunks(project_transcript(transcript).text)
+                    episode["chunks"] = len(chunks)
+                    for i, chunk in enumerate(chunks):
+                        requests.append(make_request(
+                            f"{episode_id}:chunk:{i}",
+                            create_chunk_messages(chunk, i, len(chunks), SHOW_NOTES_SYSTEM_PROMPT, CHUNK_PROMPT_TEMPLATE),
+                            temperature=0.7
+                        ))
+                    intervals = split_segments(parse_srt_transcript(transcript))
+                    episode["intervals"] = [timestamp for timestamp, _ in intervals]
+                    for i, (_, segment_text) in enumerate(intervals):
+                        requests.append(make_request(
+                            f"{episode_id}:interval:{i}",
+                            create_interval_messages(segment_text),
+                            temperature=0.7
+                        ))
+            elif phase == 2:
+                if "titles" in stages:
+                    keywords = self.episode_keywords(episode_id)
+                    if validate_keywords(keywords):
+                        requests.append(make_request(
+                            f"{episode_id}:titles:0",
+                            create_title_messages(info['guest'], info['topic'], keywords)
+                        ))
+                    else:
+                        print(f"Warning: no valid keywords for {episode['folder']}, skipping titles")
+                if "show_notes" in stages:
+                    insights = self.ordered_results(episode_id, "chunk", episode.get("chunks", 0))
+                    if insights:
+                        all_insights = "\n\n---\n\n".join(insights)
+                        requests.append(make_request(
+                            f"{episode_id}:compile:0",
+                            create_final_messages(all_insights),
+                            temperature=0.7
+                        ))
+                    else:
+                        print(f"No insights were extracted for {episode['folder']}")
+        return requests
+
+    def episode_keywords(self, episode_id):
+        keywords = self.manifest["results"].get(f"{episode_id}:keywords:0")
+        return keywords or self.manifest["episodes"][episode_id]["info"]['keywords']
+
+    def ordered_results(self, episode_id, kind, count):
+        """Results for episode_id/kind in request order, skipping failed requests"""
+        results = self.manifest["results"]
+        return [
+            results[f"{episode_id}:{kind}:{i}"]
+            for i in range(count)
+            if results.get(f"{episode_id}:{kind}:{i}")
+        ]
+
+    def run_phase(self, phase, backend, poll_interval=30):
+        """Write, submit, poll and collect one phase; resumes from the manifest"""
+        key = str(phase)
+        state = self.manifest["phases"].setdefault(key, {})
+        if state.get("collected"):
+            return
+
+        if "input" not in state:
+            requests = self.build_requests(phase)
+            if not requests:
+                state["collected"] = True
+                self.save()
+                return
+            input_path = self.job_dir / f"phase{phase}.jsonl"
+            input_path.write_text(
+                "\n".join(json.dumps(request) for request in requests) + "\n",
+                encoding='utf-8'
+            )
+            state["input"] = input_path.name
+            state["requests"] = len(requests)
+            self.save()
+
+        if "batch_id" not in state:
+            print(f"Submitting phase {phase} ({state['requests']} requests)...")
+            state["batch_id"] = backend.submit(self.job_dir / state["input"])
+            self.save()
+
+        while True:
+            status = backend.status(state["batch_id"])
+            state["status"] = status
+            self.save()
+            if status in FINISHED_STATUSES:
+                break
+            print(f"⏳ Phase {phase} batch {state['batch_id']}: {status}", end='\r')
+            time.sleep(poll_interval)
+
+        if status != "completed":
+            batch_id = state["batch_id"]
+            if self.abandon_batch(phase, backend, status):
+                return
+            raise RuntimeError(f"Phase {phase} batch {batch_id} ended with status {status}; "
+                               f"run the job again to resubmit it")
+
+        output_path = self.job_dir / f"phase{phase}.results.jsonl"
+        backend.download(state["batch_id"], output_path)
+        failed = self.collect(output_path)
+        state["failed"] = failed
+        state["collected"] = True
+        self.save()
+        print(f"Phase {phase} collected ({state['requests'] - failed} ok, {failed} failed)")
+
+    def abandon_batch(self, phase, backend, status):
+        """
+        Forget a phase's batch that ended without completing, so the next run resubmits it
+        Expired and cancelled batches keep what they finished: those results are
+        collected and only the other requests are resubmitted.
+        Returns True if nothing is left to resubmit
+        """
+        state = self.manifest["phases"][str(phase)]
+        if status in PARTIAL_STATUSES:
+            output_path = self.job_dir / f"phase{phase}.partial.jsonl"
+            try:
+                backend.download(state["batch_id"], output_path)
+                self.collect(output_path)
+                self.save()
+            except (OSError, RuntimeError, ValueError) as e:
+                print(f"No partial results for batch {state['batch_id']}: {e}")
+            # Still the old input until the results above are saved, so a crash here loses nothing
+            input_path = self.job_dir / state["input"]
+            remaining = [
+                line for line in input_path.read_text(encoding='utf-8').splitlines()
+                if line.strip() and json.loads(line)["custom_id"] not in self.manifest["results"]
+            ]
+            if not remaining:
+                state["failed"] = 0
+                state["collected"] = True
+                self.save()
+                print(f"Phase {phase} collected from its {status} batch")
+                return True
+            temp_path = input_path.with_suffix(".jsonl.tmp")
+            temp_path.write_text("\n".join(remaining) + "\n", encoding='utf-8')
+            os.replace(temp_path, input_path)
+            print(f"Phase {phase}: {state['requests'] - len(remaining)} requests finished before the batch "
+                  f"was {status}; {len(remaining)} left to resubmit")
+            state["requests"] = len(remaining)
+        del state["batch_id"]
+        state.pop("status", None)
+        self.save()
+        return False
+
+    def collect(self, output_path):
+        """Store results by custom_id; returns the number of failed requests"""
+        failed = 0
+        with open(output_path, encoding='utf-8') as output_file:
+            for line in output_file:
+                if not line.strip():
+                    continue
+                result = json.loads(line)
+                response = result.get("response") or {}
+                if result.get("error") or response.get("status_code") != 200:
+                    print(f"Request {result['custom_id']} failed: {result.get('error')}")
+                    failed += 1
+                    continue
+                content = response["body"]["choices"][0]["message"]["content"]
+                self.manifest["results"][result["custom_id"]] = content.strip()
+        return failed
+
+    def finish(self):
+        """Write episode_info.md and show_notes.md for every episode from the collected results"""
+        stages = self.manifest["stages"]
+        for episode_id, episode in enumerate(self.manifest["episodes"]):
+            folder = Path(episode["folder"])
+            info = episode["info"]
+            writer = EpisodeArtifactWriter(folder)
+            results = self.manifest["results"]
+
+            keywords = info['keywords']
+            titles = info['titles']
+            if "keywords" in stages or "titles" in stages:
+                new_keywords = results.get(f"{episode_id}:keywords:0")
+                if validate_keywords(new_keywords):
+                    keywords = new_keywords
+            if "titles" in stages:
+                new_titles = results.get(f"{episode_id}:titles:0")
+                if validate_titles(new_titles):
+                    titles = new_titles
+                else:
+                    print(f"Warning: title generation produced unexpected format for {folder}")
+            save_episode_info(folder, info['guest'], info['topic'], info['intro_paragraph'], titles, keywords,
+                              writer=writer)
+
+            if "show_notes" in stages:
+                show_notes = results.get(f"{episode_id}:compile:0")
+                if not show_notes:
+                    print(f"Failed to generate show notes for {folder}")
+                    writer.commit()
+                    continue
+                entries = [
+                    TimestampEntry(time=timestamp, topic=results[f"{episode_id}:interval:{i}"])
+                    for i, timestamp in enumerate(episode.get("intervals", []))
+                    if results.get(f"{episode_id}:interval:{i}")
+                ]
+                show_notes = f"{show_notes}\n\n{format_timestamp_section(entries)}"
+                writer.write(SHOW_NOTES_FILE, show_notes)
+            writer.commit()
+            print(f"✅ Finished {folder.name}")
+
+        self.manifest["finished"] = True
+        self.save()
+
+    def check_prompt_versions(self):
+        """Warn when a resumed job's prompts changed since it was created"""
+        recorded = self.manifest.get("prompt_versions", {})
+        changed = [name for name, version in prompt_versions(DEFERRED_PROMPTS).items()
+                   if recorded.get(name, version) != version]
+        if changed:
+            print(f"Warning: prompts changed since this job was created ({', '.join(changed)}); "
+                  f"phases not yet submitted will use the new versions")
+
+    def run(self, backend, poll_interval=30):
+        self.check_prompt_versions()
+        for phase in (1, 2):
+            self.run_phase(phase, backend, poll_interval)
+        self.finish()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run non-urgent analysis stages through the Batch API")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Create (or resume) a deferred job and run it to completion")
+    run_parser.add_argument("roots", nargs="*", help="Folders to search for episode folders")
+    run_parser.add_argument("--job", help="Existing job directory to resume")
+    run_parser.add_argument("--stages", nargs="+", choices=STAGES, default=["keywords", "titles"],
+                            help="Stages to run deferred")
+    run_parser.add_argument("--missing", action="append", choices=["episode_info.md", SHOW_NOTES_FILE],
+                            help="Only process episodes missing this artifact (repeatable)")
+    run_parser.add_argument("--backend", choices=["openai", "local"], default="openai",
+                            help="'local' answers requests offline without calling the API")
+    run_parser.add_argument("--poll-interval", type=int, default=60, help="Seconds between status checks")
+    args = parser.parse_args(argv)
+
+    if args.job:
+        job = DeferredJob(args.job)
+    else:
+        if not args.roots:
+            parser.error("give episode roots or --job to resume")
+        folders = filter_episodes(find_episode_folders(args.roots), missing=args.missing)
+        job_dir = Path("output") / "deferred" / datetime.now().strftime("%Y%m%d-%H%M%S")
+        job = DeferredJob.create(job_dir, folders, args.stages)
+        print(f"Created deferred job {job_dir} with {len(job.manifest['episodes'])} episodes")
+
+    if args.backend == "local":
+        backend = LocalBatchBackend(job.job_dir)
+    else:
+        backend = OpenAIBatchBackend()
+    job.run(backend, poll_interval=args.poll_interval)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
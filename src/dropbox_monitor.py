@@ -1,35 +1,68 @@
+import threading
 import time
 from watchdog.observers import Observer
 from watchdog.observers.polling import PollingObserver  # More reliable for network filesystems
 from watchdog.events import FileSystemEventHandler
 import os
+from datetime import datetime, timedelta
 from pathlib import Path
 from transcriber import WhisperTranscriber
 from folder_manager import PodcastFolderManager
+from event_coalescer import CoalescingEventHandler
+from work_leases import FileLeaseStore, LeaseHeartbeat, LeaseLost, LEASE_DIR_ENV
+from audio_fingerprint import FingerprintLedger, TrackSelector, is_participant_track, LEDGER_DIR_NAME
+from transcript_watcher import TranscriptEditHandler
+from multitrack import multitrack_enabled, participant_tracks
+from throughput_model import default_throughput
+
+LEASE_RETRY_SECONDS = 30  # How often recordings claimed by other workers are checked for takeover
 
 class ZoomFolderHandler(FileSystemEventHandler):
-    def __init__(self, base_path):
+    def __init__(self, base_path, lease_store=None):
         self.base_path = base_path
         self.processed_m4a = set()  # Track M4A files we've already processed
+        # Picks one track per meeting and skips sessions that were already transcribed
+        self.track_selector = TrackSelector(FingerprintLedger(Path(base_path) / LEDGER_DIR_NAME), base_path)
+        # With a lease store, several machines watching the same tree share the work
+        self.lease_store = lease_store
+        self.waiting = set()  # Recordings another worker holds a lease on
+        self.state_lock = threading.Lock()  # Guards processed_m4a and waiting
+        # Hand edits to transcripts in the tree re-run only the analysis they affect
+        self.transcript_edits = TranscriptEditHandler(base_path, lease_store)
         self.transcriber = WhisperTranscriber()  # Initialize transcriber
         self.folder_manager = PodcastFolderManager()  # Initialize folder manager
         print(f"Monitoring for new recordings in: {self.base_path}")
         
     def on_moved(self, event):
-        # Skip if the path contains the renamed format (guest name followed by date)
-        if any(self.folder_manager.processed_folders):
-            for processed in self.folder_manager.processed_folders:
-                if processed in event.dest_path:
-                    return
+        self.transcript_edits.on_moved(event)
+        # Skip anything inside a folder we have already renamed
+        dest = Path(event.dest_path)
+        if any(str(parent) in self.folder_manager.processed_folders for parent in dest.parents):
+            return
                 
-        if event.dest_path.endswith('.m4a') and not 'Audio Record' in event.dest_path:
+        if event.dest_path.endswith('.m4a'):
             self._process_m4a(event.dest_path)
+
+    def _participant_tracks(self, file_path):
+        """With multi-track mode on, the meeting's participant tracks once they are fully written"""
+        if not multitrack_enabled() or is_participant_track(file_path):
+            return None
+        tracks = participant_tracks(Path(file_path).parent)
+        ready = [track for track in tracks if self._wait_for_file_ready(str(track))]
+        if len(ready) < 2:
+            return None
+        print(f"🎙️ Multi-track mode: {len(ready)} participant tracks")
+        return ready
+
+    def on_modified(self, event):
+        self.transcript_edits.on_modified(event)
             
     def _process_m4a(self, file_path):
-        if file_path in self.processed_m4a:
-            return
+        with self.state_lock:
+            if file_path in self.processed_m4a:
+                return
+            self.processed_m4a.add(file_path)
             
-        self.processed_m4a.add(file_path)
         folder_name = Path(file_path).parent.name
         print(f"\n📁 New recording detected: {folder_name}")
         print(f"🎤 Processing audio file...")
@@ -37,22 +70,119 @@ class ZoomFolderHandler(FileSystemEventHandler):
         # Wait for the file to be fully written
         if self._wait_for_file_ready(file_path):
             print(f"✅ Audio file ready for transcription")
+            transcribe, reason = self._select_track(file_path)
+            if not transcribe:
+                print(f"⏭️ Skipping {Path(file_path).name}: {reason}")
+                return False
+            tracks = self._participant_tracks(file_path)
+            estimate = self._estimate(file_path)
+            if estimate:
+                print(f"⏱️ Estimated {estimate.describe()}")
+            lease = None
+            if self.lease_store:
+                lease = self.lease_store.claim(self._lease_key(file_path))
+                if lease is None:
+                    self._forget(file_path)
+                    if not self.lease_store.is_done(self._lease_key(file_path)):
+                        print(f"🔒 {folder_name} is being processed by another worker")
+                        with self.state_lock:
+                            self.waiting.add(file_path)
+                    return False
+            heartbeat = None
             try:
                 # Get the folder containing the M4A file
                 output_folder = str(Path(file_path).parent)
-                # Transcribe and save to the same folder
-                transcript_path = self.transcriber.transcribe(file_path, output_folder)
+                # Transcribe into the same folder; it is renamed once everything is committed
+                if lease:
+                    with LeaseHeartbeat(self.lease_store, lease) as heartbeat:
+                        transcript_path = self.transcriber.transcribe(file_path, output_folder, self.folder_manager,
+                                                                      participant_tracks=tracks,
+                                                                      lease_lost=heartbeat.lost)
+                    if heartbeat.lost.is_set():
+                        # The new holder finishes and completes it; the lease is no longer ours
+                        print(f"⚠️ Lease on {folder_name} was lost after committing; leaving it to its new holder")
+                        lease = None
+                    else:
+                        # Other workers see the renamed folder as a new recording; it is done too
+                        self.lease_store.mark_done(self._lease_key(Path(transcript_path).parent / Path(file_path).name))
+                        self.lease_store.complete(lease)
+                else:
+                    transcript_path = self.transcriber.transcribe(file_path, output_folder, self.folder_manager,
+                                                                  participant_tracks=tracks)
+                self.track_selector.transcribed(Path(transcript_path).parent / Path(file_path).name)
                 print(f"✅ Transcription saved to: {transcript_path}")
-                
-                # After successful transcription, try to rename the folder
-                self.folder_manager.rename_folder(output_folder)
                 return True
+            except LeaseLost as e:
+                print(f"🔒 Stopped {folder_name}: {e}; another worker has taken it over")
+                self._forget(file_path)
+                with self.state_lock:
+                    self.waiting.add(file_path)
+                return False
             except Exception as e:
                 print(f"❌ Transcription failed: {str(e)}")
+                if lease and not (heartbeat and heartbeat.lost.is_set()):
+                    self.lease_store.release(lease)
                 # Remove from processed files to allow retry
-                self.processed_m4a.remove(file_path)
+                self._forget(file_path)
                 return False
         return False
+
+    def _forget(self, file_path):
+        """Let a recording be picked up again by the next event or retry"""
+        with self.state_lock:
+            self.processed_m4a.discard(file_path)
+
+    def _estimate(self, file_path):
+        """Predicted time to show notes for a recording (throughput_model.py), or None"""
+        backend = self.transcriber.backends.choose(file_path)
+        estimate = default_throughput().estimate_recording(file_path, backend.name, self.transcriber.trim_silence)
+        if estimate:
+            estimate.eta = datetime.now() + timedelta(seconds=estimate.seconds)
+        return estimate
+
+    def _select_track(self, file_path):
+        """Fingerprint-based choice; falls back to skipping participant tracks if decoding fails"""
+        try:
+            return self.track_selector.should_transcribe(file_path)
+        except Exception as e:
+            print(f"Fingerprinting failed ({e}); using the folder name check")
+            if is_participant_track(file_path):
+                return False, "participant track"
+            return True, None
+
+    def _lease_key(self, file_path):
+        """Recording path relative to the watched root, the same on every machine"""
+        try:
+            return Path(file_path).relative_to(self.base_path).as_posix()
+        except ValueError:
+            return Path(file_path).as_posix()
+
+    def retry_waiting(self):
+        """
+        Try again on recordings other workers held, shortest first; picks them up if a lease lapsed
+        Runs on the coalescer's dispatch thread (see start_monitoring), so it never
+        transcribes alongside an event it is handling.
+        """
+        with self.state_lock:
+            waiting = list(self.waiting)
+            self.waiting.clear()
+        estimates = {}
+        for file_path in waiting:
+            try:
+                estimates[file_path] = self._estimate(file_path)
+            except Exception as e:
+                print(f"Could not estimate {Path(file_path).name}: {e}")
+                estimates[file_path] = None
+        for file_path in sorted(waiting, key=lambda path: estimates[path].seconds if estimates[path] else 0):
+            if not os.path.exists(file_path):
+                continue
+            try:
+                self._process_m4a(file_path)
+            except Exception as e:
+                print(f"❌ Retrying {Path(file_path).name} failed: {e}")
+                self._forget(file_path)
+                with self.state_lock:
+                    self.waiting.add(file_path)
             
     def _wait_for_file_ready(self, file_path, check_interval=5, timeout=3600):
         """Wait for the file to stop changing size"""
@@ -142,18 +272,38 @@ class M4AFileHandler(FileSystemEventHandler):
             print(f"Error verifying file: {e}")
             return False
 
-def start_monitoring(path):
+def start_monitoring(path, lease_dir=None):
+    """
+    Watch the tree for new recordings
+    Args:
+        path: Root folder to watch
+        lease_dir: Optional shared directory for lease files (default from PODCAST_LEASE_DIR);
+            when set, workers on several machines split the recordings between them
+    """
     base_path = Path(path).resolve()
-    event_handler = ZoomFolderHandler(base_path)
+    lease_dir = lease_dir or os.getenv(LEASE_DIR_ENV)
+    lease_store = FileLeaseStore(lease_dir) if lease_dir else None
+    if lease_store:
+        print(f"Claiming recordings through leases in {lease_dir} as {lease_store.worker}")
+    event_handler = ZoomFolderHandler(base_path, lease_store)
+    # Debounce event storms and drop the events our own folder renames cause
+    coalescer = CoalescingEventHandler(event_handler)
+    event_handler.folder_manager.on_rename = coalescer.on_rename
     observer = PollingObserver()
-    observer.schedule(event_handler, str(base_path), recursive=True)
+    observer.schedule(coalescer, str(base_path), recursive=True)
     observer.start()
     
     try:
+        last_retry = time.monotonic()
         while True:
             time.sleep(1)
+            if event_handler.waiting and time.monotonic() - last_retry >= LEASE_RETRY_SECONDS:
+                last_retry = time.monotonic()
+                # Retries share the dispatch thread with event handling
+                coalescer.call_soon(event_handler.retry_waiting)
     except KeyboardInterrupt:
         observer.stop()
+        coalescer.stop()
         # Stop any folder-specific observers
         for folder_observer in event_handler.folder_observers.values():
             folder_observer.stop()
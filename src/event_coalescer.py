@@ -0,0 +1,119 @@
+import threading
+import time
+from pathlib import Path
+from watchdog.events import FileSystemEventHandler, EVENT_TYPE_MOVED, EVENT_TYPE_CREATED, EVENT_TYPE_DELETED
+
+# When several events for one path arrive inside the window, the strongest survives
+EVENT_PRIORITY = {EVENT_TYPE_MOVED: 3, EVENT_TYPE_CREATED: 2, EVENT_TYPE_DELETED: 1}
+
+class CoalescingEventHandler(FileSystemEventHandler):
+    """
+    Sits between a watchdog observer and a handler and coalesces event storms.
+
+    - Events are debounced per path: a path's event is only dispatched once
+      no new event for it has arrived for `window` seconds.
+    - Move chains (A -> B -> C) collapse into a single move to the final destination.
+    - Events under paths registered with `suppress` (our own folder renames)
+      are dropped.
+
+    Dispatching happens on a background thread, so a slow handler no longer
+    blocks the observer. Work scheduled with `call_soon` runs on that same
+    thread, so it never overlaps with event handling.
+    """
+    def __init__(self, handler, window=2.0, suppress_seconds=60):
+        self.handler = handler
+        self.window = window
+        self.suppress_seconds = suppress_seconds
+        self.pending = {}     # path -> (event, deadline)
+        self.suppressed = {}  # path -> expiry time
+        self.callbacks = []   # Scheduled with call_soon, run after the next flush
+        self.received = 0
+        self.dispatched = 0
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def suppress(self, *paths):
+        """Drop events for these paths (and anything beneath them) for a while"""
+        expiry = time.monotonic() + self.suppress_seconds
+        with self.lock:
+            for path in paths:
+                self.suppressed[str(path)] = expiry
+
+    def on_rename(self, old_path, new_path):
+        """Hook for PodcastFolderManager: ignore the events our own rename causes"""
+        self.suppress(old_path, new_path)
+
+    def call_soon(self, callback):
+        """Run callback on the dispatch thread, after the events that are due"""
+        with self.lock:
+            self.callbacks.append(callback)
+
+    def _is_suppressed(self, path):
+        now = time.monotonic()
+        for suppressed_path, expiry in list(self.suppressed.items()):
+            if expiry < now:
+                del self.suppressed[suppressed_path]
+        if not path or not self.suppressed:
+            return False
+        candidate = Path(path)
+        return any(str(parent) in self.suppressed for parent in (candidate, *candidate.parents))
+
+    def dispatch(self, event):
+        with self.lock:
+            self.received += 1
+            dest_path = getattr(event, 'dest_path', None)
+            if self._is_suppressed(event.src_path) or self._is_suppressed(dest_path):
+                return
+
+            deadline = time.monotonic() + self.window
+            if event.event_type == EVENT_TYPE_MOVED:
+                previous = self.pending.pop(event.src_path, None)
+                if previous and previous[0].event_type == EVENT_TYPE_MOVED:
+                    # Collapse A -> B -> C into A -> C
+                    event = type(event)(previous[0].src_path, event.dest_path)
+                self.pending[event.dest_path] = (event, deadline)
+                return
+
+            key = event.src_path
+            previous = self.pending.get(key)
+            if previous:
+                previous_event = previous[0]
+                if previous_event.event_type == EVENT_TYPE_CREATED and event.event_type == EVENT_TYPE_DELETED:
+                    # Created and deleted inside the window: nothing happened
+                    del self.pending[key]
+                    return
+                if EVENT_PRIORITY.get(previous_event.event_type, 0) >= EVENT_PRIORITY.get(event.event_type, 0):
+                    event = previous_event
+            self.pending[key] = (event, deadline)
+
+    def _run(self):
+        while not self.stopped.wait(min(self.window / 4, 0.5)):
+            self.flush()
+
+    def flush(self, force=False):
+        """Dispatch every event whose debounce window has passed"""
+        now = time.monotonic()
+        with self.lock:
+            due = [key for key, (_, deadline) in self.pending.items() if force or deadline <= now]
+            events = [self.pending.pop(key)[0] for key in due]
+            callbacks, self.callbacks = self.callbacks, []
+        for event in events:
+            self.dispatched += 1
+            try:
+                self.handler.dispatch(event)
+            except Exception as e:
+                print(f"Error handling {event.event_type} event for {event.src_path}: {e}")
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error running scheduled {getattr(callback, '__name__', 'callback')}: {e}")
+
+    def stop(self):
+        """Stop the dispatch thread after delivering anything still pending"""
+        self.stopped.set()
+        self.thread.join()
+        self.flush(force=True)
+        print(f"Event coalescing: {self.received} events received, {self.dispatched} dispatched")
@@ -3,11 +3,16 @@ from pathlib import Path
 import os
 
 class PodcastFolderManager:
-    def __init__(self):
+    def __init__(self, on_rename=None):
         self.processed_folders = set()
+        # Called with (old_path, new_path) just before a rename, so watchers can ignore it
+        self.on_rename = on_rename
     
     def rename_folder(self, folder_path):
-        """Rename folder with pattern: Guest Name - Topic - YYYY-MM-DD"""
+        """
+        Rename folder with pattern: Guest Name - Topic - YYYY-MM-DD
+        Returns the new folder path, or None if the folder was not renamed
+        """
         # Convert to Path object if string
         folder_path = Path(folder_path)
         
@@ -33,6 +38,8 @@ class PodcastFolderManager:
         if success:
             self.processed_folders.add(str(folder_path))
             print(f"Successfully renamed folder to: {new_name}")
+            return str(folder_path.parent / new_name)
+        return None
         
     def _extract_episode_info(self, folder_path):
         """Extract guest and topic from episode_info.md"""
@@ -100,6 +107,8 @@ class PodcastFolderManager:
                 return False
             
             # Perform the rename
+            if self.on_rename:
+                self.on_rename(old_path, new_path)
             old_path.rename(new_path)
             
             # Add the NEW path to processed_folders, not the old one
@@ -0,0 +1,116 @@
+"""
+Local guest-name detection from the episode intro.
+
+Most intros introduce the guest with a handful of fixed phrasings ("my guest
+today is ...", "sit down with ...", "joined by ..."). Each phrasing is a
+precompiled pattern with a base weight; the capitalized name span that
+follows it is cleaned up and scored on its shape, and corroboration (the name
+coming up again, or several phrasings agreeing) raises the confidence.
+Callers only need the LLM when the best candidate falls below
+CONFIDENCE_THRESHOLD.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+CONFIDENCE_THRESHOLD = 0.8
+
+# Hosts are never the guest
+HOST_NAMES = frozenset(["stewart alsop", "stewart"])
+
+NAME_PARTICLES = r"(?:de|da|di|van|von|der|den|del|la|le|bin|al)"
+NAME_WORD = r"[A-Z][a-zA-Z'’\-]+"
+NAME_SPAN = rf"(?P<name>{NAME_WORD}(?:\s+(?:{NAME_PARTICLES}\s+)?{NAME_WORD}){{0,3}})"
+
+# (lead-in phrasing, base confidence). Lead-ins are case-insensitive; the name must be capitalized.
+INTRO_PHRASINGS = [
+    (r"my\s+guest(?:\s+today|\s+this\s+week|\s+on\s+this\s+episode)?\s+is", 0.95),
+    (r"(?:our|today's)\s+guest\s+is", 0.95),
+    (r"sit(?:ting)?\s+down\s+(?:today\s+)?with", 0.9),
+    # "I'm here with ..." also introduces companies and places, so on its own it stays below the
+    # threshold; "I'm joined by ..." is covered by the "joined by" phrasing
+    (r"(?:i'm|i\s+am|we're|we\s+are)\s+(?:here\s+)?(?:today\s+)?with", 0.7),
+    (r"joined\s+(?:today\s+)?by", 0.85),
+    (r"welcome(?:\s+to\s+the\s+(?:show|podcast))?,?", 0.8),
+    (r"(?:talking|speaking|chatting|conversation)\s+(?:today\s+)?with", 0.75),
+    (r"introduce(?:\s+you\s+to)?", 0.75),
+]
+INTRO_PATTERNS = [
+    (re.compile(rf"(?i:{lead_in})\s+{NAME_SPAN}"), weight, lead_in)
+    for lead_in, weight in INTRO_PHRASINGS
+]
+
+# Capitalized words that start sentences or follow names but are not names
+NOT_NAME_WORDS = frozenset("""
+and but so the this that today we i i'm it's our my on in at to welcome thanks thank
+everybody everyone guys podcast show episode crazy wisdom who he she they hi hello
+dr mr mrs ms prof professor
+""".split())
+
+@dataclass
+class GuestMatch:
+    name: str
+    confidence: float
+    phrasing: str  # Lead-in pattern that matched
+
+def clean_name(span):
+    """Drop leading/trailing words that are capitalized but not part of a name"""
+    words = span.split()
+    while words and words[0].lower() in NOT_NAME_WORDS:
+        words.pop(0)
+    while words and words[-1].lower() in NOT_NAME_WORDS:
+        words.pop()
+    # A trailing possessive belongs to the sentence, not the name
+    if words:
+        words[-1] = re.sub(r"['’]s$", "", words[-1])
+    return " ".join(words)
+
+def name_shape_score(name):
+    """Full names score highest; single words are often first names or not names at all"""
+    words = name.split()
+    if len(words) == 1:
+        return 0.5
+    if len(words) <= 3:
+        return 1.0
+    return 0.8
+
+def guest_candidates(intro_text) -> List[GuestMatch]:
+    """Every name span that follows a known intro phrasing, scored"""
+    candidates = []
+    for pattern, weight, lead_in in INTRO_PATTERNS:
+        for match in pattern.finditer(intro_text):
+            name = clean_name(match.group('name'))
+            if not name or name.lower() in HOST_NAMES:
+                continue
+            candidates.append(GuestMatch(name, weight * name_shape_score(name), lead_in))
+    return candidates
+
+def detect_guest(intro_text) -> Optional[GuestMatch]:
+    """
+    Best local guess at the guest's name
+    Args:
+        intro_text: Cleaned intro of the transcript (see clean_transcript_intro)
+    Returns the best GuestMatch, or None if no intro phrasing matched
+    """
+    candidates = guest_candidates(intro_text)
+    if not candidates:
+        return None
+
+    best = max(candidates, key=lambda candidate: candidate.confidence)
+    confidence = best.confidence
+    surname = best.name.split()[-1]
+
+    # Corroboration: other phrasings agree, or the name comes up again
+    agreeing = {c.phrasing for c in candidates if c.name == best.name}
+    if len(agreeing) > 1:
+        confidence += 0.1
+    if len(re.findall(rf"\b{re.escape(surname)}\b", intro_text)) > 1:
+        confidence += 0.05
+
+    # Disagreement: a different, similarly strong candidate
+    if any(c.name != best.name and surname not in c.name and c.confidence >= best.confidence - 0.1
+           for c in candidates):
+        confidence -= 0.25
+
+    return GuestMatch(best.name, round(min(max(confidence, 0.0), 1.0), 3), best.phrasing)
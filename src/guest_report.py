@@ -0,0 +1,106 @@
+"""
+Report how often the local guest detector answers without an API call.
+
+For every episode under the given roots, runs the local detector on the
+intro and records whether it was confident enough to skip the LLM, how long
+it took, and whether it agrees with the guest already in episode_info.md.
+Latency saved is the LLM latency avoided on local hits; pass --llm to
+measure it with real calls, otherwise --llm-seconds is assumed.
+
+Usage:
+    python src/guest_report.py ROOT [ROOT ...] [--llm] [--json report.json]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+from batch_processor import find_episode_folders, TRANSCRIPT_FILE
+from guest_detector import detect_guest, CONFIDENCE_THRESHOLD
+from post_transcription_processor import (
+    read_transcript, clean_transcript_intro, load_episode_info, extract_guest_name
+)
+from api_client import create_client
+
+DEFAULT_LLM_SECONDS = 1.5
+
+def evaluate_episode(folder, client=None):
+    """Local detection result and timings for one episode folder"""
+    transcript = read_transcript(Path(folder) / TRANSCRIPT_FILE)
+
+    start = time.perf_counter()
+    match = detect_guest(clean_transcript_intro(transcript))
+    local_seconds = time.perf_counter() - start
+
+    info = load_episode_info(folder) or {}
+    known_guest = info.get('guest')
+    result = {
+        "local_guest": match.name if match else None,
+        "confidence": match.confidence if match else 0.0,
+        "hit": bool(match and match.confidence >= CONFIDENCE_THRESHOLD),
+        "local_seconds": local_seconds,
+        "known_guest": known_guest,
+        "agrees": bool(match and known_guest and match.name.lower() == known_guest.lower())
+    }
+    if client is not None:
+        start = time.perf_counter()
+        result["llm_guest"] = extract_guest_name(transcript, client, use_local=False)
+        result["llm_seconds"] = time.perf_counter() - start
+    return result
+
+def summarize(report, llm_seconds=DEFAULT_LLM_SECONDS):
+    episodes = list(report.values())
+    hits = [episode for episode in episodes if episode["hit"]]
+    measured = [episode["llm_seconds"] for episode in episodes if "llm_seconds" in episode]
+    average_llm = sum(measured) / len(measured) if measured else llm_seconds
+    checked = [episode for episode in hits if episode["known_guest"]]
+    return {
+        "episodes": len(episodes),
+        "hits": len(hits),
+        "hit_rate": len(hits) / len(episodes) if episodes else 0.0,
+        "agreement": (sum(episode["agrees"] for episode in checked) / len(checked)) if checked else None,
+        "average_llm_seconds": average_llm,
+        "llm_seconds_measured": bool(measured),
+        "local_seconds": sum(episode["local_seconds"] for episode in episodes),
+        "seconds_saved": len(hits) * average_llm - sum(episode["local_seconds"] for episode in hits)
+    }
+
+def print_report(report, summary):
+    for folder, episode in report.items():
+        status = "local" if episode["hit"] else "LLM  "
+        guess = episode["local_guest"] or "-"
+        print(f"  {status} {episode['confidence']:.2f}  {guess:<28} {Path(folder).name}")
+
+    print(f"\n{summary['episodes']} episodes")
+    print(f"  Local hits:      {summary['hits']} ({summary['hit_rate'] * 100:.1f}%)")
+    if summary["agreement"] is not None:
+        print(f"  Agreement:       {summary['agreement'] * 100:.1f}% of hits match episode_info.md")
+    source = "measured" if summary["llm_seconds_measured"] else "assumed"
+    print(f"  LLM latency:     {summary['average_llm_seconds']:.2f}s per call ({source})")
+    print(f"  Local time:      {summary['local_seconds'] * 1000:.1f}ms total")
+    print(f"  Latency saved:   {summary['seconds_saved']:.1f}s")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hit rate and latency saved by local guest detection")
+    parser.add_argument("roots", nargs="+", help="Folders to search for episode folders")
+    parser.add_argument("--llm", action="store_true", help="Also call the LLM for every episode to measure its latency")
+    parser.add_argument("--llm-seconds", type=float, default=DEFAULT_LLM_SECONDS,
+                        help="Assumed LLM latency per call when --llm is not given")
+    parser.add_argument("--json", help="Also write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    client = create_client() if args.llm else None
+    report = {
+        str(folder): evaluate_episode(folder, client)
+        for folder in find_episode_folders(args.roots)
+    }
+    summary = summarize(report, args.llm_seconds)
+    print_report(report, summary)
+    if args.json:
+        Path(args.json).write_text(json.dumps({"episodes": report, "summary": summary}, indent=2), encoding='utf-8')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+Hedged requests for the many-small-calls stages.
+
+Show notes wait for the slowest interval summary or chunk insight, so one
+stuck completion holds up the whole episode. With hedging on, a call that is
+still running once it passes the stage's tracked latency percentile gets a
+duplicate request; whichever answers first wins and the other is abandoned
+(its result is discarded, and streams are closed as soon as they arrive).
+
+Extra spend is capped: hedges may never exceed `max_hedge_rate` of the calls
+made for hedged stages.
+
+Usage:
+    client = ModelRouter(create_client(), hedging=HedgePolicy())
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+HEDGED_STAGES = ("interval", "chunk")
+HEDGE_PERCENTILE = 0.9     # Hedge once a call is slower than this share of recent calls
+MIN_SAMPLES = 10           # Calls observed per stage before hedging starts
+MIN_DELAY_SECONDS = 1.0
+MAX_HEDGE_RATE = 0.1       # Hedges allowed per hedged-stage call
+LATENCY_WINDOW = 200
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] if ordered else None
+
+def discard(future):
+    """Drop the losing request's result, closing it if it is a stream"""
+    if future.cancel():
+        return
+    def close(done):
+        if not done.exception() and hasattr(done.result(), "close"):
+            done.result().close()
+    future.add_done_callback(close)
+
+class HedgePolicy:
+    def __init__(self, stages=HEDGED_STAGES, hedge_percentile=HEDGE_PERCENTILE,
+                 max_hedge_rate=MAX_HEDGE_RATE, max_workers=16):
+        self.stages = set(stages)
+        self.hedge_percentile = hedge_percentile
+        self.max_hedge_rate = max_hedge_rate
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self.lock = threading.Lock()
+        self.latencies = {}          # stage -> recent winning latencies
+        self.primary_latencies = {}  # stage -> what calls would have taken without hedging
+        self.observed = {}           # stage -> latencies callers actually waited
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def applies(self, stage, kwargs):
+        return stage in self.stages and not kwargs.get("stream")
+
+    def delay(self, stage):
+        """Seconds to wait before hedging, or None while there is too little history"""
+        with self.lock:
+            history = self.latencies.get(stage)
+            if not history or len(history) < MIN_SAMPLES:
+                return None
+            return max(percentile(history, self.hedge_percentile), MIN_DELAY_SECONDS)
+
+    def _budget_allows(self):
+        with self.lock:
+            return self.hedges + 1 <= self.calls * self.max_hedge_rate
+
+    def _record(self, stage, kind, seconds):
+        with self.lock:
+            getattr(self, kind).setdefault(stage, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    def run(self, stage, call):
+        """Run call(), hedging it with a duplicate if it is slow; returns the first response"""
+        with self.lock:
+            self.calls += 1
+        delay = self.delay(stage)
+        started = time.monotonic()
+        if delay is None:
+            response = call()
+            seconds = time.monotonic() - started
+            for kind in ("latencies", "primary_latencies", "observed"):
+                self._record(stage, kind, seconds)
+            return response
+
+        primary = self.executor.submit(call)
+        primary.add_done_callback(
+            lambda done: self._record(stage, "primary_latencies", time.monotonic() - started)
+        )
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._budget_allows():
+            response = primary.result()
+            self._record(stage, "latencies", time.monotonic() - started)
+            self._record(stage, "observed", time.monotonic() - started)
+            return response
+
+        with self.lock:
+            self.hedges += 1
+        hedge = self.executor.submit(call)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception():
+                    error = future.exception()
+                    continue
+                for loser in pending:
+                    discard(loser)
+                seconds = time.monotonic() - started
+                self._record(stage, "latencies", seconds)
+                self._record(stage, "observed", seconds)
+                if future is hedge:
+                    with self.lock:
+                        self.hedge_wins += 1
+                return future.result()
+        raise error
+
+    def report(self):
+        """Hedge rate, hedge wins, and tail latency with and without hedging per stage"""
+        with self.lock:
+            stages = {}
+            for stage, observed in self.observed.items():
+                primary = self.primary_latencies.get(stage, [])
+                stages[stage] = {
+                    "calls": len(observed),
+                    "p95_seconds": round(percentile(observed, 0.95), 2),
+                    "p99_seconds": round(percentile(observed, 0.99), 2),
+                    "unhedged_p95_seconds": round(percentile(primary, 0.95), 2) if primary else None,
+                    "unhedged_p99_seconds": round(percentile(primary, 0.99), 2) if primary else None
+                }
+            return {
+                "calls": self.calls,
+                "hedges": self.hedges,
+                "hedge_rate": round(self.hedges / self.calls, 3) if self.calls else 0.0,
+                "hedge_wins": self.hedge_wins,
+                "stages": stages
+            }
+
+    def print_report(self):
+        report = self.report()
+        print(f"  {report['hedges']} hedges over {report['calls']} calls "
+              f"({report['hedge_rate'] * 100:.1f}%), {report['hedge_wins']} won by the hedge")
+        for stage, stats in report["stages"].items():
+            unhedged = stats["unhedged_p99_seconds"]
+            print(f"  {stage:<10} p95 {stats['p95_seconds']:.2f}s  p99 {stats['p99_seconds']:.2f}s"
+                  + (f"  (unhedged p99 {unhedged:.2f}s)" if unhedged is not None else ""))
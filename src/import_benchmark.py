@@ -0,0 +1,107 @@
+"""
+Measure cold-start import time of the daemons and CLIs against a budget.
+
+Each entry point is imported in fresh interpreters with `-X importtime`; the
+median cumulative import time is compared with its budget, and the slowest
+imports underneath it are listed. It also checks that modules which should
+load lazily (the OpenAI SDK, the prompt modules) are not imported at startup.
+Exits non-zero when an entry point is over budget or imports a lazy module.
+
+Usage:
+    python src/import_benchmark.py [--runs 5] [--json report.json]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent
+
+# Entry point -> cold-start import budget in milliseconds
+IMPORT_BUDGETS = {
+    "dropbox_monitor": 250,
+    "monitor": 250,
+    "transcriber": 250,
+    "batch_processor": 150,
+    "deferred_analysis": 150,
+    "post_transcription_processor": 150,
+}
+
+# Modules that must not be imported until first used
+LAZY_MODULES = ["openai", "dotenv", "prompts.registry.essential.guest_extraction",
+                "prompts.registry.essential.show_notes.compiler"]
+
+SLOWEST_IMPORTS = 5
+
+def measure_once(module):
+    """Cumulative import time of module (ms), per-import self times (ms) and loaded lazy modules"""
+    check = f"import json, sys, {module}; print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", check],
+        cwd=SRC_DIR, capture_output=True, text=True, check=True
+    )
+    total = None
+    self_times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        self_times[name.strip()] = int(self_us) / 1000
+        if name.strip() == module:
+            total = int(cumulative_us) / 1000
+    return total, self_times, json.loads(result.stdout.splitlines()[-1])
+
+def benchmark(module, runs):
+    totals = []
+    self_times = {}
+    for _ in range(runs):
+        total, times, loaded = measure_once(module)
+        totals.append(total)
+        for name, ms in times.items():
+            self_times.setdefault(name, []).append(ms)
+    slowest = sorted(
+        ((name, statistics.median(values)) for name, values in self_times.items()),
+        key=lambda item: item[1], reverse=True
+    )[:SLOWEST_IMPORTS]
+    return {
+        "median_ms": round(statistics.median(totals), 1),
+        "max_ms": round(max(totals), 1),
+        "budget_ms": IMPORT_BUDGETS[module],
+        "eager_lazy_modules": loaded,
+        "slowest": [{"module": name, "self_ms": round(ms, 1)} for name, ms in slowest]
+    }
+
+def print_report(report):
+    print(f"{'Entry point':<30} {'median':>8} {'max':>8} {'budget':>8}")
+    for module, result in report.items():
+        over = result["median_ms"] > result["budget_ms"]
+        print(f"{module:<30} {result['median_ms']:>6.1f}ms {result['max_ms']:>6.1f}ms "
+              f"{result['budget_ms']:>6}ms{'  OVER BUDGET' if over else ''}")
+        if over:
+            for entry in result["slowest"]:
+                print(f"    {entry['module']:<40} {entry['self_ms']:>6.1f}ms")
+        if result["eager_lazy_modules"]:
+            print(f"    imported at startup: {', '.join(result['eager_lazy_modules'])}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check cold-start import time of the entry points")
+    parser.add_argument("modules", nargs="*", default=list(IMPORT_BUDGETS), help="Entry points to measure")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per entry point")
+    parser.add_argument("--json", help="Also write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    report = {module: benchmark(module, args.runs) for module in args.modules}
+    print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding='utf-8')
+    failed = [
+        module for module, result in report.items()
+        if result["median_ms"] > result["budget_ms"] or result["eager_lazy_modules"]
+    ]
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
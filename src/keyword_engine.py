@@ -0,0 +1,327 @@
+"""
+Local TF-IDF keyword engine over the episode corpus.
+
+Every transcript is tokenized into unigrams and bigrams. Corpus
+document-frequency statistics live in a compact NumPy array indexed by term id
+and are updated incrementally as episodes are added (or re-added after an
+edit). Distinctive terms for an episode are its most frequent terms weighted
+by how rare they are across the archive, computed over the full transcript.
+
+Documents are keyed by the resolved episode folder. A renamed folder keeps
+its document (`rename_keyword_episode`), and folders that no longer exist are
+dropped when the corpus is loaded or updated, so no episode is counted twice.
+The pipeline's engine writes its arrays every SAVE_EVERY changed documents
+(or SAVE_INTERVAL_SECONDS) and once more at exit, rather than on every add.
+
+The results can be used directly, or passed to keyword_extraction.create_messages
+as a short candidate list so the LLM only has to pick and polish terms.
+
+Usage:
+    python src/keyword_engine.py update ROOT [ROOT ...]
+    python src/keyword_engine.py terms EPISODE_FOLDER [--top 20]
+"""
+
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from batch_processor import find_episode_folders, TRANSCRIPT_FILE
+from post_transcription_processor import read_transcript
+from prompts.registry.essential.show_notes.projection import project_transcript
+
+DEFAULT_INDEX_DIR = Path(__file__).resolve().parent.parent / "output" / "keyword_index"
+
+TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9]*(?:['\-][a-z0-9]+)*")
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are aren't as at be because been before being
+below between both but by can can't cannot could couldn't did didn't do does doesn't doing don't down
+during each even ever every few for from further get gets getting go goes going gonna got gotta had hadn't
+has hasn't have haven't having he he'd he'll he's her here here's hers herself him himself his how how's
+i i'd i'll i'm i've if in into is isn't it it's its itself just kind kinda know let let's like lot lots
+me maybe mean means more most much must my myself no nor not now of off oh ok okay on once one only or
+other ought our ours ourselves out over own pretty probably quite rather really right said say saying
+says see seem seems she she'd she'll she's should shouldn't so some something sort stuff such sure than
+that that's the their theirs them themselves then there there's these they they'd they'll they're
+they've thing things think thinking this those though through to too totally um uh under until up us
+very wanna want was wasn't way we we'd we'll we're we've well were weren't what what's when when's where
+where's whether which while who who's whom why why's will with won't would wouldn't yeah yes yet you
+you'd you'll you're you've your yours yourself yourselves actually basically definitely exactly
+literally absolutely anyway everything anything nothing someone somebody people guess gonna stewart
+alsop crazy wisdom podcast episode
+""".split())
+
+MIN_TERM_COUNT = 2  # A term must appear at least this often in an episode to be distinctive
+SAVE_EVERY = 10             # Changed documents before the pipeline's engine is written out
+SAVE_INTERVAL_SECONDS = 300 # ...or time since the last write, whichever comes first
+
+def tokenize(text):
+    """Lowercase word tokens with stopwords removed, as runs split at stopwords"""
+    runs = [[]]
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS or len(token) < 3:
+            if runs[-1]:
+                runs.append([])
+            continue
+        runs[-1].append(token)
+    return [run for run in runs if run]
+
+def extract_terms(text):
+    """Unigrams plus bigrams of adjacent content words"""
+    terms = []
+    for run in tokenize(text):
+        terms.extend(run)
+        terms.extend(f"{first} {second}" for first, second in zip(run, run[1:]) if first != second)
+    return terms
+
+class KeywordEngine:
+    """Corpus document-frequency statistics and distinctive-term scoring"""
+    def __init__(self):
+        self.terms = []                         # term id -> term
+        self.vocab = {}                         # term -> term id
+        self.df = np.zeros(1024, dtype=np.int32)  # document frequency by term id
+        self.documents = {}                     # episode key -> {"hash": ..., "terms": ndarray of term ids}
+        self.unsaved = 0                        # Documents changed since the last save
+        self.lock = threading.Lock()
+
+    @property
+    def n_docs(self):
+        return len(self.documents)
+
+    def _term_ids(self, terms, add=False):
+        ids = []
+        for term in terms:
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                if not add:
+                    term_id = -1
+                else:
+                    term_id = len(self.terms)
+                    self.vocab[term] = term_id
+                    self.terms.append(term)
+            ids.append(term_id)
+        if add and len(self.terms) > len(self.df):
+            grown = np.zeros(max(len(self.terms), len(self.df) * 2), dtype=np.int32)
+            grown[:len(self.df)] = self.df
+            self.df = grown
+        return np.asarray(ids, dtype=np.int64)
+
+    def add_document(self, key, text):
+        """
+        Add or refresh one episode's document-frequency contribution
+        Returns True if the corpus statistics changed
+        """
+        content_hash = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        with self.lock:
+            existing = self.documents.get(key)
+            if existing and existing["hash"] == content_hash:
+                return False
+            unique_ids = np.unique(self._term_ids(extract_terms(text), add=True)).astype(np.int32)
+            if existing:
+                self.df[existing["terms"]] -= 1
+            self.df[unique_ids] += 1
+            self.documents[key] = {"hash": content_hash, "terms": unique_ids}
+            self.unsaved += 1
+            return True
+
+    def remove_document(self, key):
+        with self.lock:
+            existing = self.documents.pop(key, None)
+            if existing:
+                self.df[existing["terms"]] -= 1
+                self.unsaved += 1
+
+    def rename_document(self, old_key, new_key):
+        """Move a document to a renamed episode's key; a stale copy under the new key is replaced"""
+        with self.lock:
+            existing = self.documents.pop(old_key, None)
+            if not existing:
+                return False
+            replaced = self.documents.get(new_key)
+            if replaced:
+                self.df[replaced["terms"]] -= 1
+            self.documents[new_key] = existing
+            self.unsaved += 1
+            return True
+
+    def remove_missing(self):
+        """Forget episodes whose folder no longer exists; returns how many were removed"""
+        with self.lock:
+            missing = [key for key in self.documents if not Path(key).exists()]
+        for key in missing:
+            self.remove_document(key)
+        return len(missing)
+
+    def distinctive_terms(self, text, top_n=20):
+        """
+        Most distinctive terms of a text against the corpus
+        Returns a list of (term, score), best first
+        """
+        terms = extract_terms(text)
+        if not terms:
+            return []
+        unique_terms, counts = np.unique(np.asarray(terms), return_counts=True)
+        with self.lock:
+            ids = np.fromiter((self.vocab.get(term, -1) for term in unique_terms),
+                              dtype=np.int64, count=len(unique_terms))
+            df = np.where(ids >= 0, self.df[np.maximum(ids, 0)], 0).astype(np.float64)
+            n_docs = self.n_docs
+
+        tf = 1.0 + np.log(counts)
+        idf = np.log((1.0 + n_docs) / (1.0 + df)) + 1.0
+        scores = np.where(counts >= MIN_TERM_COUNT, tf * idf, 0.0)
+
+        order = np.argsort(-scores, kind='stable')
+        results = []
+        selected = set()
+        for index in order:
+            if scores[index] <= 0 or len(results) >= top_n:
+                break
+            term = str(unique_terms[index])
+            # Skip unigrams already covered by a selected bigram
+            if term in selected or any(term in chosen.split() for chosen in selected if " " in chosen):
+                continue
+            selected.add(term)
+            results.append((term, round(float(scores[index]), 3)))
+        return results
+
+    def save(self, index_dir=DEFAULT_INDEX_DIR):
+        """Write the statistics as NumPy arrays plus a JSON vocabulary"""
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            keys = sorted(self.documents)
+            doc_terms = [self.documents[key]["terms"] for key in keys]
+            offsets = np.cumsum([0] + [len(ids) for ids in doc_terms]).astype(np.int64)
+            arrays_path = index_dir / "keyword_stats.tmp.npz"
+            np.savez_compressed(
+                arrays_path,
+                df=self.df[:len(self.terms)],
+                doc_terms=np.concatenate(doc_terms) if doc_terms else np.zeros(0, dtype=np.int32),
+                doc_offsets=offsets
+            )
+            meta_path = index_dir / "keyword_meta.tmp.json"
+            meta_path.write_text(json.dumps({
+                "terms": self.terms,
+                "documents": [{"key": key, "hash": self.documents[key]["hash"]} for key in keys]
+            }), encoding='utf-8')
+            os.replace(arrays_path, index_dir / "keyword_stats.npz")
+            os.replace(meta_path, index_dir / "keyword_meta.json")
+            self.unsaved = 0
+
+    @classmethod
+    def load(cls, index_dir=DEFAULT_INDEX_DIR):
+        """Load a saved engine, or return an empty one if nothing is saved yet"""
+        engine = cls()
+        index_dir = Path(index_dir)
+        if not (index_dir / "keyword_meta.json").exists():
+            return engine
+        meta = json.loads((index_dir / "keyword_meta.json").read_text(encoding='utf-8'))
+        with np.load(index_dir / "keyword_stats.npz") as arrays:
+            df = arrays["df"]
+            doc_terms = arrays["doc_terms"]
+            offsets = arrays["doc_offsets"]
+        engine.terms = meta["terms"]
+        engine.vocab = {term: term_id for term_id, term in enumerate(engine.terms)}
+        engine.df = np.zeros(max(1024, len(engine.terms)), dtype=np.int32)
+        engine.df[:len(df)] = df
+        for i, document in enumerate(meta["documents"]):
+            engine.documents[document["key"]] = {
+                "hash": document["hash"],
+                "terms": doc_terms[offsets[i]:offsets[i + 1]].astype(np.int32)
+            }
+        return engine
+
+    def update_from_roots(self, roots):
+        """Add every transcript under the roots; returns the number of documents added or refreshed"""
+        self.remove_missing()
+        changed = 0
+        for folder in find_episode_folders(roots):
+            transcript = read_transcript(Path(folder) / TRANSCRIPT_FILE)
+            if self.add_document(str(folder), project_transcript(transcript).text):
+                changed += 1
+        return changed
+
+_default_engine = None
+_default_engine_lock = threading.Lock()
+_last_save = time.monotonic()
+
+def default_engine():
+    """The process-wide engine, loaded once with missing episodes dropped"""
+    global _default_engine
+    with _default_engine_lock:
+        if _default_engine is None:
+            _default_engine = KeywordEngine.load()
+            _default_engine.remove_missing()
+        return _default_engine
+
+def _save_if_due(engine, force=False):
+    global _last_save
+    if not engine.unsaved:
+        return
+    if force or engine.unsaved >= SAVE_EVERY or time.monotonic() - _last_save >= SAVE_INTERVAL_SECONDS:
+        engine.save()
+        _last_save = time.monotonic()
+
+def add_episode(key, text):
+    """Add or refresh an episode in the process-wide engine; returns the engine"""
+    engine = default_engine()
+    with _default_engine_lock:
+        engine.add_document(key, text)
+        _save_if_due(engine)
+    return engine
+
+def rename_keyword_episode(old_folder, new_folder):
+    """Keep the corpus statistics pointing at an episode after its folder is renamed"""
+    engine = default_engine()
+    with _default_engine_lock:
+        engine.rename_document(str(Path(old_folder).resolve()), str(Path(new_folder).resolve()))
+        _save_if_due(engine)
+
+def flush():
+    """Write out anything the process-wide engine hasn't saved yet"""
+    with _default_engine_lock:
+        if _default_engine is not None:
+            _save_if_due(_default_engine, force=True)
+
+atexit.register(flush)
+
+def episode_keywords(engine, transcript_content, top_n=20):
+    """Distinctive terms for a raw transcript, as plain strings"""
+    text = project_transcript(transcript_content).text
+    return [term for term, _ in engine.distinctive_terms(text, top_n)]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local TF-IDF keyword engine over the episode corpus")
+    parser.add_argument("--index", default=str(DEFAULT_INDEX_DIR), help="Index directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    update_parser = subparsers.add_parser("update", help="Add new or changed transcripts under the roots")
+    update_parser.add_argument("roots", nargs="+")
+    terms_parser = subparsers.add_parser("terms", help="Print distinctive terms for an episode folder")
+    terms_parser.add_argument("folder")
+    terms_parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    engine = KeywordEngine.load(args.index)
+    if args.command == "update":
+        changed = engine.update_from_roots(args.roots)
+        engine.save(args.index)
+        print(f"Updated {changed} episodes ({engine.n_docs} in corpus, {len(engine.terms)} terms)")
+    else:
+        transcript = read_transcript(Path(args.folder) / TRANSCRIPT_FILE)
+        text = project_transcript(transcript).text
+        for term, score in engine.distinctive_terms(text, args.top):
+            print(f"{score:7.3f}  {term}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
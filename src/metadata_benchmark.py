@@ -0,0 +1,95 @@
+"""
+Benchmark the consolidated metadata call against the four separate calls.
+
+For every episode under the given roots, runs the current guest, topic,
+keyword and title calls, then the single structured call (including any
+field retries), and compares calls, prompt/completion tokens and latency.
+Nothing is written to the episode folders.
+
+Usage:
+    python src/metadata_benchmark.py ROOT [ROOT ...] [--limit N] [--json report.json]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from api_client import create_client, UsageTrackingClient
+from batch_processor import find_episode_folders, TRANSCRIPT_FILE
+from post_transcription_processor import (
+    read_transcript, extract_guest_name, extract_topic,
+    generate_keywords_and_titles, extract_episode_metadata
+)
+
+FLOWS = ["separate", "consolidated"]
+
+def run_separate(client, transcript, episode_key):
+    guest = extract_guest_name(transcript, client, use_local=False)
+    topic = extract_topic(transcript, client)
+    keywords, titles = generate_keywords_and_titles(
+        client, transcript, guest or "Unknown Speaker", topic, episode_key
+    )
+    return {"guest": guest, "topic": topic, "keywords": keywords, "titles": titles}
+
+def run_consolidated(client, transcript, episode_key):
+    return extract_episode_metadata(transcript, client, episode_key)
+
+def benchmark_episode(folder, client):
+    """Usage and resulting fields of both flows for one episode"""
+    transcript = read_transcript(Path(folder) / TRANSCRIPT_FILE)
+    episode_key = str(Path(folder).resolve())
+    result = {}
+    for flow, run in (("separate", run_separate), ("consolidated", run_consolidated)):
+        client.reset()
+        fields = run(client, transcript, episode_key)
+        result[flow] = {
+            **client.snapshot(),
+            "fields_ok": sorted(field for field, value in fields.items() if value),
+            "fields": fields
+        }
+    return result
+
+def format_flow(usage):
+    return (f"{usage['calls']:>2} calls  {usage['prompt_tokens']:>6} in  {usage['completion_tokens']:>5} out  "
+            f"{usage['seconds']:6.1f}s  ok: {', '.join(usage['fields_ok']) or '-'}")
+
+def print_report(report):
+    totals = {flow: {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "seconds": 0.0} for flow in FLOWS}
+    for folder, flows in report.items():
+        print(f"\n{Path(folder).name}")
+        for flow in FLOWS:
+            print(f"  {flow:<13} {format_flow(flows[flow])}")
+            for key in totals[flow]:
+                totals[flow][key] += flows[flow][key]
+
+    if report:
+        print(f"\nAll {len(report)} episodes")
+        for flow in FLOWS:
+            usage = totals[flow]
+            print(f"  {flow:<13} {usage['calls']:>4} calls  {usage['prompt_tokens'] + usage['completion_tokens']:>8} tokens  "
+                  f"{usage['seconds']:7.1f}s")
+        separate, consolidated = totals["separate"], totals["consolidated"]
+        separate_tokens = separate["prompt_tokens"] + separate["completion_tokens"]
+        consolidated_tokens = consolidated["prompt_tokens"] + consolidated["completion_tokens"]
+        if separate_tokens and separate["seconds"]:
+            print(f"  Tokens saved:  {(1 - consolidated_tokens / separate_tokens) * 100:.1f}%")
+            print(f"  Latency saved: {(1 - consolidated['seconds'] / separate['seconds']) * 100:.1f}%")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the consolidated metadata call with the four separate calls")
+    parser.add_argument("roots", nargs="+", help="Folders to search for episode folders")
+    parser.add_argument("--limit", type=int, help="Only benchmark the first N episodes")
+    parser.add_argument("--json", help="Also write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    folders = find_episode_folders(args.roots)[:args.limit]
+    client = UsageTrackingClient(create_client())
+    report = {str(folder): benchmark_episode(folder, client) for folder in folders}
+    print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding='utf-8')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""
+Per-stage model routing with latency tracking and failover.
+
+Each pipeline stage declares a StageRoute: the models it may use (in order of
+preference), the p95 latency it needs, a per-request timeout and the
+concurrency lane it runs in. The router tracks observed latency and errors
+per stage and model; models that miss their stage's p95 target or keep
+failing are tried last. A request that times out or hits an overloaded model
+is retried once on the same model (by the adaptive layer), then fails over to
+the next model in the list; only when every model fails does the router back
+off and go round again, up to FAILOVER_ROUNDS times.
+
+Lanes have separate concurrency limits, so quick extraction calls never wait
+behind slow chunk or compile calls. An optional HedgePolicy (hedging.py)
+duplicates slow calls for the stages it covers.
+
+Usage:
+    client = create_pipeline_client()
+    stage_client(client, "guest").chat.completions.create(model=..., messages=...)
+"""
+
+import functools
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import List
+
+from api_client import ClientWrapper, create_client, RateLimiter, RateLimitedClient
+from adaptive_concurrency import AdaptiveClient, overload_errors, backoff_seconds, ATTEMPTS_KWARG
+
+@dataclass
+class StageRoute:
+    models: List[str]        # In order of preference
+    max_p95_seconds: float   # Models slower than this at p95 are tried last
+    timeout: float           # Per-request timeout before failing over
+    lane: str = "light"      # Concurrency lane
+
+STAGE_ROUTES = {
+    "guest": StageRoute(["gpt-3.5-turbo", "gpt-4o-mini"], 5, 20),
+    "topic": StageRoute(["gpt-3.5-turbo", "gpt-4o-mini"], 5, 20),
+    "keywords": StageRoute(["gpt-3.5-turbo", "gpt-4o-mini"], 10, 30),
+    "titles": StageRoute(["gpt-3.5-turbo", "gpt-4o-mini"], 15, 45),
+    "metadata": StageRoute(["gpt-4o-mini", "gpt-4o"], 20, 60),   # Strict JSON schemas need 4o models
+    "interval": StageRoute(["gpt-3.5-turbo", "gpt-4o-mini"], 10, 30),
+    "intro": StageRoute(["gpt-3.5-turbo", "gpt-4o-mini"], 20, 60, "heavy"),
+    "chunk": StageRoute(["gpt-3.5-turbo", "gpt-4o-mini"], 30, 90, "heavy"),
+    "compile": StageRoute(["gpt-3.5-turbo", "gpt-4o-mini"], 60, 120, "heavy"),
+    "transcribe": StageRoute(["whisper-1"], 600, 900, "audio"),
+}
+LANE_LIMITS = {"light": 8, "heavy": 4, "audio": 2}
+
+LATENCY_WINDOW = 50      # Recent calls kept per stage and model
+MIN_SAMPLES = 5          # Below this a model counts as healthy
+MAX_ERROR_RATE = 0.2
+PROBE_SECONDS = 120      # A demoted model gets a fresh start after this long unused
+ROUTED_ATTEMPTS = 2      # Adaptive attempts per model before failing over to the next one
+FAILOVER_ROUNDS = 3      # Passes over all of a stage's models before the error is raised
+
+# Errors that mean "try another model" rather than "the request is wrong"
+failover_errors = overload_errors
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+class ModelStats:
+    """Recent latency and outcomes for one stage/model pair"""
+    def __init__(self):
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.outcomes = deque(maxlen=LATENCY_WINDOW)
+        self.calls = 0
+        self.last_call = 0.0
+
+    def record(self, seconds, ok):
+        self.calls += 1
+        self.last_call = time.monotonic()
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(seconds)
+
+    def p95(self):
+        return percentile(self.latencies, 0.95) if self.latencies else None
+
+    def error_rate(self):
+        return (self.outcomes.count(False) / len(self.outcomes)) if self.outcomes else 0.0
+
+    def healthy(self, route):
+        if len(self.outcomes) < MIN_SAMPLES:
+            return True
+        p95 = self.p95()
+        if self.error_rate() <= MAX_ERROR_RATE and (p95 is None or p95 <= route.max_p95_seconds):
+            return True
+        if time.monotonic() - self.last_call > PROBE_SECONDS:
+            # Demoted long enough: forget its history so it is probed again
+            self.latencies.clear()
+            self.outcomes.clear()
+            return True
+        return False
+
+class ModelRouter(ClientWrapper):
+    """
+    Client wrapper that picks the model for each call from its stage's route
+    Calls made on the router itself (not through `for_stage`) pass through unchanged.
+    """
+    def __init__(self, client, routes=None, lane_limits=None, hedging=None):
+        super().__init__(client)
+        self.hedging = hedging
+        self.routes = routes or STAGE_ROUTES
+        limits = lane_limits or LANE_LIMITS
+        self.lanes = {lane: threading.BoundedSemaphore(limit) for lane, limit in limits.items()}
+        self.stats = {}
+        self.lock = threading.RLock()
+
+    def for_stage(self, stage):
+        return StageClient(self, stage)
+
+    def _stats(self, stage, model):
+        with self.lock:
+            return self.stats.setdefault((stage, model), ModelStats())
+
+    def model_order(self, stage):
+        """The stage's models, healthy ones first, each group in declared order"""
+        route = self.routes[stage]
+        healthy, degraded = [], []
+        with self.lock:
+            for model in route.models:
+                (healthy if self._stats(stage, model).healthy(route) else degraded).append(model)
+            # Among degraded models, the fastest recent p95 goes first
+            degraded.sort(key=lambda model: self._stats(stage, model).p95() or 0.0)
+        return healthy + degraded
+
+    def route(self, stage, create, kwargs):
+        """
+        Run `create` for the stage, failing over through its models
+        The recorded latency is time to the response (for streams, to the first chunk).
+        """
+        if stage not in self.routes:
+            return create(**kwargs)
+        route = self.routes[stage]
+        # The router owns failover: the adaptive layer only gets a retry or so per model
+        options = {"timeout": route.timeout}
+        if isinstance(self._client, AdaptiveClient):
+            options[ATTEMPTS_KWARG] = ROUTED_ATTEMPTS
+        last_error = None
+        for attempt in range(FAILOVER_ROUNDS):
+            if attempt:
+                # Every model is overloaded; wait without holding the lane
+                time.sleep(backoff_seconds(attempt))
+            with self.lanes.get(route.lane, self.lanes["light"]):
+                for model in self.model_order(stage):
+                    stats = self._stats(stage, model)
+                    started = time.monotonic()
+                    call = functools.partial(create, **{**kwargs, **options, "model": model})
+                    try:
+                        if self.hedging and self.hedging.applies(stage, kwargs):
+                            response = self.hedging.run(stage, call)
+                        else:
+                            response = call()
+                    except failover_errors() as e:
+                        with self.lock:
+                            stats.record(time.monotonic() - started, False)
+                        print(f"{stage}: {model} failed ({type(e).__name__}), trying next model")
+                        last_error = e
+                        continue
+                    with self.lock:
+                        stats.record(time.monotonic() - started, True)
+                    return response
+        raise last_error
+
+    def report(self):
+        """Calls, p95 latency and error rate per stage and model"""
+        with self.lock:
+            return {
+                f"{stage}/{model}": {
+                    "calls": stats.calls,
+                    "p95_seconds": round(stats.p95(), 2) if stats.p95() is not None else None,
+                    "error_rate": round(stats.error_rate(), 3)
+                }
+                for (stage, model), stats in sorted(self.stats.items())
+                if stats.calls
+            }
+
+    def print_report(self):
+        for key, stats in self.report().items():
+            p95 = f"{stats['p95_seconds']:.2f}s" if stats['p95_seconds'] is not None else "-"
+            print(f"  {key:<32} {stats['calls']:>5} calls  p95 {p95:>7}  errors {stats['error_rate'] * 100:.0f}%")
+        if isinstance(self._client, AdaptiveClient):
+            print("Adaptive concurrency:")
+            self._client.print_report()
+        if self.hedging:
+            print("Hedging:")
+            self.hedging.print_report()
+
+class StageClient(ClientWrapper):
+    """A ModelRouter bound to one stage; use it wherever a client is expected"""
+    def __init__(self, router, stage):
+        super().__init__(router)
+        self.router = router
+        self.stage = stage
+
+    def for_stage(self, stage):
+        return self.router.for_stage(stage)
+
+    def _create_completion(self, **kwargs):
+        return self.router.route(self.stage, self.router._client.chat.completions.create, kwargs)
+
+    def _create_transcription(self, **kwargs):
+        return self.router.route(self.stage, self.router._client.audio.transcriptions.create, kwargs)
+
+def create_pipeline_client(client=None, hedging=None, requests_per_minute=None):
+    """
+    The standard client stack: stage routing over adaptive concurrency
+    Args:
+        client: Optional underlying client; by default an OpenAI client whose own
+            retries are disabled, since AdaptiveClient retries overloaded calls
+        hedging: Optional HedgePolicy
+        requests_per_minute: Optional fixed rate cap under the adaptive limit
+    """
+    if client is None:
+        client = create_client(max_retries=0)
+    if requests_per_minute:
+        client = RateLimitedClient(client, RateLimiter(requests_per_minute))
+    return ModelRouter(AdaptiveClient(client), hedging=hedging)
@@ -0,0 +1,126 @@
+"""
+Multi-track transcription: one transcript per Zoom participant track, merged.
+
+With "record a separate audio file for each participant" on, Zoom puts one
+track per speaker in an "Audio Record" subfolder next to the mixed track.
+Each participant track is transcribed on its own (concurrently; with silence
+trimmed each is only as long as that person spoke), every cue is labeled with
+the track's speaker, and the cues are merged by start time into a single SRT:
+
+    12
+    00:03:10,200 --> 00:03:14,900
+    Jane Doe: Thanks for having me.
+
+speakers.json in the episode folder lists each speaker's track and talk time,
+and the guest: the speaker who talked most, apart from the hosts. The analysis
+uses that guest instead of asking the model.
+
+Enable with PODCAST_MULTITRACK=1. Host names come from PODCAST_HOST_NAMES
+(comma-separated, default "Stewart Alsop").
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+
+from transcription_backends import Segment, TranscriptionResult
+
+MULTITRACK_ENV = "PODCAST_MULTITRACK"
+HOST_NAMES_ENV = "PODCAST_HOST_NAMES"
+DEFAULT_HOST_NAMES = "Stewart Alsop"
+MULTITRACK_WORKERS = 4      # Participant tracks transcribed at once
+SPEAKERS_FILE = "speakers.json"
+
+# Zoom names participant files audio<DisplayName><digits>.m4a
+ZOOM_TRACK_NAME = re.compile(r'^audio(.+?)\d*$')
+
+def multitrack_enabled():
+    return os.getenv(MULTITRACK_ENV, "").lower() in ("1", "true", "yes")
+
+def host_names():
+    return {name.strip().lower() for name in os.getenv(HOST_NAMES_ENV, DEFAULT_HOST_NAMES).split(",") if name.strip()}
+
+def participant_tracks(meeting_folder):
+    """The meeting's per-participant .m4a tracks, sorted"""
+    # Imported here: the analysis reads speakers.json through this module and shouldn't load numpy
+    from audio_fingerprint import PARTICIPANT_FOLDER
+    return sorted(
+        path for folder in Path(meeting_folder).iterdir()
+        if folder.is_dir() and folder.name.startswith(PARTICIPANT_FOLDER)
+        for path in folder.glob("*.m4a")
+        if path.stat().st_size > 0
+    )
+
+def speaker_name(track_path):
+    """Display name from a Zoom track file name: audioJaneDoe21234.m4a -> Jane Doe"""
+    stem = Path(track_path).stem
+    match = ZOOM_TRACK_NAME.match(stem)
+    name = match.group(1) if match else stem
+    # Split CamelCase and separators back into words
+    name = re.sub(r'(?<=[a-z]{2})(?=[A-Z])', ' ', name.replace('_', ' ').replace('-', ' '))
+    return ' '.join(name.split()) or stem
+
+def speaker_names(tracks):
+    """Track -> unique speaker label"""
+    names = {}
+    seen = {}
+    for track in tracks:
+        name = speaker_name(track)
+        seen[name] = seen.get(name, 0) + 1
+        names[track] = name if seen[name] == 1 else f"{name} ({seen[name]})"
+    return names
+
+def merge_tracks(results):
+    """
+    One speaker-labeled result from per-speaker results
+    Args:
+        results: dict of speaker -> TranscriptionResult (times on the meeting timeline)
+    Cues are ordered by start time; overlapping speech stays as separate cues.
+    """
+    segments = sorted(
+        (Segment(segment.start, segment.end, segment.text, speaker, segment.words)
+         for speaker, result in results.items() for segment in result.segments if segment.text.strip()),
+        key=lambda segment: (segment.start, segment.end)
+    )
+    first = next(iter(results.values()))
+    return TranscriptionResult(segments, first.backend, first.model,
+                               max(result.seconds for result in results.values()))
+
+def speaker_summary(result, tracks, hosts=None):
+    """
+    speakers.json content: talk time per speaker and the guest
+    Args:
+        result: Merged TranscriptionResult
+        tracks: dict of speaker -> track path
+        hosts: Lowercased host names (default from PODCAST_HOST_NAMES)
+    """
+    hosts = host_names() if hosts is None else hosts
+    speakers = {
+        speaker: {"track": str(track), "seconds": 0.0, "cues": 0, "words": 0}
+        for speaker, track in tracks.items()
+    }
+    for segment in result.segments:
+        stats = speakers[segment.speaker]
+        stats["seconds"] += segment.end - segment.start
+        stats["cues"] += 1
+        stats["words"] += len(segment.text.split())
+    for stats in speakers.values():
+        stats["seconds"] = round(stats["seconds"], 1)
+
+    # The guest talks most among non-hosts; a one-word display name ("iPhone", "Jane") isn't a full name
+    candidates = [
+        speaker for speaker, stats in speakers.items()
+        if speaker.lower() not in hosts and stats["cues"] and len(speaker.split()) >= 2
+    ]
+    guest = max(candidates, key=lambda speaker: speakers[speaker]["seconds"]) if candidates else None
+    return {"guest": guest, "hosts": sorted(hosts), "speakers": speakers}
+
+def guest_from_speakers(speakers_text):
+    """The guest recorded in speakers.json content, or None"""
+    if not speakers_text:
+        return None
+    try:
+        return json.loads(speakers_text).get("guest")
+    except (ValueError, AttributeError):
+        return None
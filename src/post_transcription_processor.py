@@ -1,26 +1,39 @@
+import json
 import os
+import re
 import sys
-from openai import OpenAI
-from dotenv import load_dotenv
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-# Add project root to Python path
+# Add project root to Python path so the prompts package resolves when run from src/
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from prompts.registry.essential.show_notes.timestamps import extract_timestamps
+# Prompt modules load on first use through the registry; only the light helpers are imported here
+from prompts.registry import get_prompt
+from prompts.registry.essential import show_notes
+from prompts.registry.essential.show_notes.projection import compact_excerpt, KEYWORD_EXCERPT_CHARS
+from prompts.registry.essential.show_notes.streaming import SectionEvents
+from api_client import create_client, stage_client
+from model_router import create_pipeline_client
+from profiling import profiler_for_episode
+from artifact_writer import EpisodeArtifactWriter
+from analysis_cache import AnalysisCache, CachingClient, ANALYSIS_CACHE_FILE
+from budget_governor import default_governor, load_plan
+from throughput_model import default_throughput, transcript_minutes
+from multitrack import guest_from_speakers, SPEAKERS_FILE
+from guest_detector import detect_guest, CONFIDENCE_THRESHOLD
 
-# Get absolute path to project root
-project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-sys.path.append(project_root)
+KEYWORD_CANDIDATES = 40         # Locally ranked terms offered to keyword extraction
+CANDIDATE_EXCERPT_CHARS = 1000  # Raw transcript span sent alongside the candidates
+
+METADATA_MODEL = "gpt-4o-mini"  # Structured outputs need a model that supports strict JSON schemas
+METADATA_RETRIES = 1            # Extra calls allowed for fields that fail validation
+METADATA_INTRO_CHARS = 3000
+SUMMARY_WAIT_SECONDS = 60       # How long titles wait for the companion description once its stream started
 
-from prompts.registry.essential.guest_extraction import create_messages as create_guest_messages
-from prompts.registry.essential.topic_extraction import create_messages as create_topic_messages
-from prompts.registry.essential.show_notes import generate_show_notes
-from prompts.registry.essential.show_notes.intro_paragraph import generate_intro_paragraph
-from prompts.registry.essential.show_notes.keyword_extraction import create_messages as create_keyword_messages
-from prompts.registry.essential.show_notes.title_suggestions import create_messages as create_title_messages
 
 def clean_transcript_intro(transcript_content, max_chars=2000):
     """Clean and get introduction portion of transcript"""
@@ -48,8 +61,12 @@ def get_episode_folder(transcription_path):
     """Get the episode folder from transcription path"""
     return Path(transcription_path).parent
 
-def save_episode_info(episode_folder, guest_name, topic, intro_paragraph=None, titles=None, keywords=None):
-    """Save guest and topic information to a markdown file"""
+def save_episode_info(episode_folder, guest_name, topic, intro_paragraph=None, titles=None, keywords=None,
+                      writer=None):
+    """
+    Save guest and topic information to a markdown file
+    If a writer (EpisodeArtifactWriter) is given, the file is staged on it instead
+    """
     content = ["# Episode Information\n"]
     
     if intro_paragraph:
@@ -66,6 +83,9 @@ def save_episode_info(episode_folder, guest_name, topic, intro_paragraph=None, t
     if titles:
         content.append("\n## Title Suggestions\n" + titles + "\n")
     
+    if writer:
+        return writer.write("episode_info.md", "\n".join(content))
+
     info_file_path = Path(episode_folder) / "episode_info.md"
     info_file_path.write_text(
         "\n".join(content),
@@ -73,6 +93,69 @@ def save_episode_info(episode_folder, guest_name, topic, intro_paragraph=None, t
     )
     return str(info_file_path)
 
+def load_episode_info(episode_folder):
+    """
+    Read back an existing episode_info.md
+    Returns a dict with intro_paragraph, guest, topic, keywords and titles
+    (missing sections are None), or None if the file does not exist
+    """
+    info_path = Path(episode_folder) / "episode_info.md"
+    if not info_path.exists():
+        return None
+    content = info_path.read_text(encoding='utf-8')
+
+    guest_match = re.search(r'^Guest:\s*(.+?)\s*$', content, re.MULTILINE)
+    topic_match = re.search(r'^Topic:\s*(.+?)\s*$', content, re.MULTILINE)
+    keywords_match = re.search(r'^## Keywords\n(.+?)\s*(?=^## |\Z)', content, re.MULTILINE | re.DOTALL)
+    titles_match = re.search(r'^## Title Suggestions\n(.+?)\s*(?=^## |\Z)', content, re.MULTILINE | re.DOTALL)
+
+    # The intro paragraph sits between the heading and the Guest line
+    intro_paragraph = None
+    if guest_match:
+        header = content[:guest_match.start()].replace("# Episode Information", "", 1).strip()
+        intro_paragraph = header or None
+
+    return {
+        'intro_paragraph': intro_paragraph,
+        'guest': guest_match.group(1) if guest_match else None,
+        'topic': topic_match.group(1) if topic_match else None,
+        'keywords': keywords_match.group(1).strip() if keywords_match else None,
+        'titles': titles_match.group(1).strip() if titles_match else None
+    }
+
+def validate_keywords(keywords):
+    """Check that keyword extraction returned a comma-separated list"""
+    return bool(keywords) and "," in keywords
+
+def validate_titles(titles):
+    """Basic check that title generation returned multiple titles"""
+    return bool(titles) and titles.count("\n") >= 5
+
+def keyword_candidates(transcript_content, episode_key):
+    """
+    Rank distinctive terms locally with the corpus keyword engine
+    The episode is added to the corpus statistics first. Returns None if the
+    engine can't be used, so callers fall back to sending a longer excerpt.
+    """
+    try:
+        # Imported here because keyword_engine itself imports this module
+        from keyword_engine import add_episode, episode_keywords
+        from prompts.registry.essential.show_notes.projection import project_transcript
+
+        engine = add_episode(episode_key, project_transcript(transcript_content).text)
+        return episode_keywords(engine, transcript_content, KEYWORD_CANDIDATES) or None
+    except Exception as e:
+        print(f"Warning: local keyword engine unavailable: {e}")
+        return None
+
+def build_keyword_messages(transcript_content, guest_name, topic, episode_key):
+    """Keyword extraction messages, using local candidates when available"""
+    candidates = keyword_candidates(transcript_content, episode_key)
+    excerpt_chars = CANDIDATE_EXCERPT_CHARS if candidates else KEYWORD_EXCERPT_CHARS
+    return get_prompt("keyword_extraction").create_messages(
+        compact_excerpt(transcript_content, excerpt_chars), guest_name, topic, candidates
+    )
+
 def validate_extraction(guest_name=None, topic=None):
     """
     Check if extracted information is valid
@@ -90,33 +173,41 @@ def validate_extraction(guest_name=None, topic=None):
     
     return True, ""
 
-def extract_guest_name(transcript_content):
-    """Extract guest name using OpenAI API"""
-    load_dotenv()
-    
-    client = OpenAI(
-        api_key=os.getenv("OPENAI_API_KEY"),
-        http_client=None
+def is_valid_guest_name(guest_name):
+    """Reject empty, overlong and apologetic responses"""
+    return bool(guest_name) and len(guest_name) <= 50 and not any(
+        phrase in guest_name.lower()
+        for phrase in ["sorry", "i apologize", "could not", "cannot", "don't see", "do not see"]
     )
+
+def extract_guest_name(transcript_content, client=None, use_local=True):
+    """
+    Extract guest name, locally when the intro is clear enough, else with the OpenAI API
+    Args:
+        transcript_content: Full transcript text
+        client: Optional OpenAI client to reuse
+        use_local: Try the local pattern-based detector before calling the API
+    """
+    intro_text = clean_transcript_intro(transcript_content)
+    if use_local:
+        match = detect_guest(intro_text)
+        if match and match.confidence >= CONFIDENCE_THRESHOLD:
+            print(f"Guest identified locally: {match.name} (confidence {match.confidence:.2f})")
+            return match.name
+
+    if client is None:
+        client = create_client()
     
     try:
-        intro_text = clean_transcript_intro(transcript_content)
-        response = client.chat.completions.create(
+        response = stage_client(client, "guest").chat.completions.create(
             model="gpt-3.5-turbo",
-            messages=create_guest_messages(intro_text)
+            messages=get_prompt("guest_extraction").create_messages(intro_text)
         )
         
         guest_name = response.choices[0].message.content.strip()
         
         # Check for error messages or invalid responses
-        if (not guest_name or 
-            len(guest_name) > 50 or 
-            "sorry" in guest_name.lower() or 
-            "i apologize" in guest_name.lower() or
-            "could not" in guest_name.lower() or
-            "cannot" in guest_name.lower() or
-            "don't see" in guest_name.lower() or
-            "do not see" in guest_name.lower()):
+        if not is_valid_guest_name(guest_name):
             return None
             
         print("Guest identified:", guest_name)
@@ -126,20 +217,16 @@ def extract_guest_name(transcript_content):
         print("Error extracting guest name:", e)
         return None
 
-def extract_topic(transcript_content):
+def extract_topic(transcript_content, client=None):
     """Extract main topic using OpenAI API"""
-    load_dotenv()
-    
-    client = OpenAI(
-        api_key=os.getenv("OPENAI_API_KEY"),
-        http_client=None
-    )
+    if client is None:
+        client = create_client()
     
     try:
         intro_text = clean_transcript_intro(transcript_content, max_chars=3000)
-        response = client.chat.completions.create(
+        response = stage_client(client, "topic").chat.completions.create(
             model="gpt-3.5-turbo",
-            messages=create_topic_messages(intro_text)
+            messages=get_prompt("topic_extraction").create_messages(intro_text)
         )
         
         topic = response.choices[0].message.content.strip()
@@ -156,17 +243,230 @@ def extract_topic(transcript_content):
         print("Error extracting topic:", e)
         return "General Discussion"
 
-def run_after_transcription(transcription_path):
-    """Main function to process transcript and save episode information"""
+def validate_metadata(metadata, fields=None):
+    """
+    Check each field of a combined metadata response
+    The shape is checked against the prompt's SCHEMA first, then the content of each field.
+    Returns a dict of field -> error message for the fields that failed
+    """
+    prompt = get_prompt("episode_metadata")
+    fields = fields or prompt.FIELDS
+    errors = prompt.schema_errors(metadata, fields)
+    for field in fields:
+        if field in errors:
+            continue
+        value = metadata[field]
+        if field == "guest":
+            if value is not None and not is_valid_guest_name(value.strip()):
+                errors[field] = "must be the guest's full name or null"
+        elif field == "topic":
+            is_valid, error_msg = validate_extraction(topic=value)
+            if not is_valid:
+                errors[field] = error_msg
+        else:
+            expected = prompt.KEYWORD_COUNT if field == "keywords" else prompt.TITLE_COUNT
+            items = [item for item in value if item.strip()]
+            if len(items) < expected // 2:
+                errors[field] = f"must be a list of {expected} strings (got {len(items)})"
+    return errors
+
+def request_metadata(client, messages, fields=None):
+    """
+    One structured-output call for the given fields (all by default)
+    Returns the parsed object (empty if it isn't a JSON object)
+    """
+    response = stage_client(client, "metadata").chat.completions.create(
+        model=METADATA_MODEL,
+        messages=messages,
+        response_format=get_prompt("episode_metadata").response_format(fields)
+    )
+    try:
+        metadata = json.loads(response.choices[0].message.content)
+    except (TypeError, ValueError):
+        return {}
+    return metadata if isinstance(metadata, dict) else {}
+
+def extract_episode_metadata(transcript_content, client=None, episode_key=None, retries=METADATA_RETRIES):
+    """
+    Guest, topic, keywords and titles from a single structured call
+    Fields that fail validation are re-requested on their own, up to `retries` times.
+    Args:
+        transcript_content: Full transcript text
+        client: Optional OpenAI client to reuse
+        episode_key: Key for the local keyword engine (the resolved episode folder)
+        retries: Follow-up calls allowed for failed fields
+    Returns a dict with guest, topic, keywords and titles in the same formats the
+    separate calls produce (keywords comma-separated, titles a numbered list);
+    fields that never validated are None.
+    """
+    if client is None:
+        client = create_client()
+
+    intro_text = clean_transcript_intro(transcript_content, max_chars=METADATA_INTRO_CHARS)
+    candidates = keyword_candidates(transcript_content, episode_key) if episode_key else None
+
+    prompt = get_prompt("episode_metadata")
+    accepted = {}
+    metadata = request_metadata(client, prompt.create_messages(intro_text, candidates))
+    for attempt in range(retries + 1):
+        errors = validate_metadata(metadata, [field for field in prompt.FIELDS if field not in accepted])
+        accepted.update({
+            field: metadata[field] for field in prompt.FIELDS
+            if field not in accepted and field not in errors
+        })
+        if not errors or attempt == retries:
+            break
+        print(f"Retrying metadata fields: {', '.join(errors)}")
+        # Titles only need the fields already known, not the transcript
+        needs_transcript = any(field != "titles" for field in errors)
+        metadata = request_metadata(client, prompt.create_retry_messages(
+            list(errors), errors, accepted,
+            intro_text if needs_transcript else None,
+            candidates if "keywords" in errors else None
+        ), list(errors))
+
+    for field in prompt.FIELDS:
+        if field not in accepted:
+            print(f"Warning: metadata field '{field}' failed validation")
+
+    guest = accepted.get("guest")
+    keywords = accepted.get("keywords")
+    titles = accepted.get("titles")
+    return {
+        "guest": guest.strip() if guest else None,
+        "topic": accepted["topic"].strip() if accepted.get("topic") else None,
+        "keywords": ", ".join(item.strip() for item in keywords if isinstance(item, str) and item.strip()) if keywords else None,
+        "titles": "\n".join(
+            f"{i}. {title.strip()}"
+            for i, title in enumerate((t for t in titles if isinstance(t, str) and t.strip()), 1)
+        ) if titles else None
+    }
+
+def generate_keywords_and_titles(client, transcript_content, guest_name, topic, episode_key, sections=None,
+                                 with_titles=True):
+    """
+    Keyword extraction followed by title suggestions
+    If sections (SectionEvents of a streaming show notes compile) is given and the
+    compile is already streaming, titles wait for its Description section and use
+    it as extra context; while the compile is still behind the chunk insights,
+    titles go ahead without it.
+    with_titles=False stops after the keywords (the budget governor's last degradation).
+    Returns (keywords, titles); either is None if it failed or came back malformed
+    """
+    keywords = None
+    titles = None
+    try:
+        # Extract keywords
+        keywords_response = stage_client(client, "keywords").chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=build_keyword_messages(transcript_content, guest_name, topic, episode_key)
+        )
+        keywords = keywords_response.choices[0].message.content.strip()
+        print(f"Keywords extracted: {keywords}")
+
+        # Validate keywords
+        if not with_titles:
+            print("Skipping title suggestions to stay within budget")
+        elif validate_keywords(keywords):
+            # Generate title suggestions
+            summary = sections.wait_if_started("Description", SUMMARY_WAIT_SECONDS) if sections else None
+            titles_response = stage_client(client, "titles").chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=get_prompt("title_suggestions").create_messages(guest_name, topic, keywords, summary)
+            )
+            titles = titles_response.choices[0].message.content.strip()
+            if validate_titles(titles):
+                print("Title suggestions generated")
+            else:
+                print("Warning: Title generation produced unexpected format")
+                titles = None
+        else:
+            print("Warning: Keyword extraction produced unexpected format")
+            titles = None
+    except Exception as e:
+        print(f"Error in title generation pipeline: {e}")
+        titles = None
+    return keywords, titles
+
+def run_after_transcription(transcription_path, client=None, writer=None, consolidated=False, streaming=False,
+                            profiler=None, reuse_analysis=False, governor=None):
+    """
+    Main function to process transcript and save episode information
+    Args:
+        transcription_path: Path to the transcription.md file
+        client: Optional OpenAI client (or wrapper) shared by every stage
+        writer: Optional EpisodeArtifactWriter the outputs are staged on; the
+            caller commits it. Without one, all outputs are committed together
+            at the end.
+        consolidated: Get guest, topic, keywords and titles from one structured
+            call instead of four separate ones
+        streaming: Stream the intro paragraph and show notes compile with live
+            progress; the compile runs alongside keywords and titles, and titles
+            start as soon as its description is written
+        profiler: Optional EpisodeProfiler the stages are recorded on; the caller
+            writes it. Without one, a sampled share of episodes (see profiling.py)
+            is profiled and the profile is written into the episode folder.
+        reuse_analysis: Answer requests the last analysis of this episode already
+            made from its record (see analysis_cache.py); used after hand edits
+        governor: Optional BudgetGovernor that plans the analysis within the
+            token/time budget; by default one configured from the environment
+    """
     print(f"\nAnalyzing transcript: {transcription_path}")
+    own_writer = writer is None
+    own_profiler = profiler is None
+    if profiler is None:
+        profiler = profiler_for_episode()
+    transcript_content = None
+    analysis_cache = None
+    plan = None
+    meter = None
     
     try:
+        if client is None:
+            client = create_pipeline_client()
+        if writer is None:
+            writer = EpisodeArtifactWriter(
+                get_episode_folder(transcription_path),
+                staging_root=os.path.join(project_root, "temp")
+            )
+
         # Get transcript content
-        transcript_content = read_transcript(transcription_path)
+        with profiler.stage("read_transcript"):
+            transcript_content = read_transcript(transcription_path)
+        episode_folder = writer.episode_folder
+
+        # Plan within the budget before any call is made; a re-analysis keeps the last plan so its requests match
+        if governor is None:
+            governor = default_governor()
+        plan = governor.plan(transcript_content, consolidated, load_plan(episode_folder) if reuse_analysis else None)
+        meter = governor.meter(client, plan)
+        analysis_started = time.monotonic()
+        # Every response is recorded, so a later edit of the transcript only pays for what changed
+        analysis_cache = AnalysisCache.load(episode_folder) if reuse_analysis else AnalysisCache()
+        analysis_cache.streaming = streaming
+        client = CachingClient(meter, analysis_cache, reuse=reuse_analysis)
+        episode_key = str(Path(episode_folder).resolve())
         
+        # Multi-track transcripts already know who the guest is from the speaker tracks
+        speaker_guest = guest_from_speakers(writer.read(SPEAKERS_FILE))
+        if speaker_guest:
+            print(f"Guest identified from speaker tracks: {speaker_guest}")
+
         # Get both guest name and topic
-        guest_name = extract_guest_name(transcript_content)
-        topic = extract_topic(transcript_content)
+        metadata = None
+        if consolidated:
+            with profiler.stage("metadata"):
+                metadata = extract_episode_metadata(transcript_content, client, episode_key)
+            guest_name = speaker_guest or metadata['guest']
+            topic = metadata['topic'] or "General Discussion"
+        else:
+            if speaker_guest:
+                guest_name = speaker_guest
+            else:
+                with profiler.stage("guest"):
+                    guest_name = extract_guest_name(transcript_content, client)
+            with profiler.stage("topic"):
+                topic = extract_topic(transcript_content, client)
         
         print("Guest name extracted:", guest_name)
         print("Topic extracted:", topic)
@@ -190,10 +490,20 @@ def run_after_transcription(transcription_path):
             folder_name = "Unknown Speaker"
             metadata_guest = "Unknown Speaker"
             topic = "General Discussion"
+
+        if plan.postponed:
+            # Over today's budget: only what the folder name needs; the rest runs another day
+            save_episode_info(episode_folder, metadata_guest, topic,
+                              titles=metadata['titles'] if metadata else None,
+                              keywords=metadata['keywords'] if metadata else None, writer=writer)
+            return folder_name
             
         # Generate intro paragraph
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        intro_paragraph, error = generate_intro_paragraph(client, transcript_content, metadata_guest)
+        with profiler.stage("intro"):
+            intro_paragraph, error = get_prompt("intro_paragraph").generate_intro_paragraph(
+                stage_client(client, "intro"), transcript_content, metadata_guest,
+                stream=streaming, staging_path=writer.partial_path("intro_paragraph") if streaming else None
+            )
         if error:
             print(f"Warning: {error}")
             intro_paragraph = None
@@ -201,52 +511,50 @@ def run_after_transcription(transcription_path):
             print("Successfully generated intro paragraph")
             
         # Save information with correct metadata
-        episode_folder = get_episode_folder(transcription_path)
-        info_file_path = save_episode_info(episode_folder, metadata_guest, topic, intro_paragraph)
+        info_file_path = save_episode_info(episode_folder, metadata_guest, topic, intro_paragraph, writer=writer)
         
         print(f"Episode information saved to: {info_file_path}")
         print(f"Folder will be named: {folder_name}")
         # Generate timestamps and show notes
         try:
             # First generate timestamps
-            client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-            timestamps = extract_timestamps(client, transcript_content)
-            
-            # Extract keywords and generate titles
-            try:
-                # Extract keywords
-                keywords_response = client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=create_keyword_messages(transcript_content[:3000], metadata_guest, topic)
+            with profiler.stage("timestamps"):
+                timestamps = get_prompt("timestamps").extract_timestamps(
+                    stage_client(client, "interval"), transcript_content, plan.segmentation, plan.interval_minutes
                 )
-                keywords = keywords_response.choices[0].message.content.strip()
-                print(f"Keywords extracted: {keywords}")
-
-                # Validate keywords
-                if keywords and "," in keywords:  # Ensure we got a comma-separated list
-                    # Generate title suggestions
-                    titles_response = client.chat.completions.create(
-                        model="gpt-3.5-turbo",
-                        messages=create_title_messages(metadata_guest, topic, keywords)
+            
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                # When streaming, the show notes compile runs alongside keywords and titles
+                sections = None
+                show_notes_future = None
+                if streaming:
+                    sections = SectionEvents()
+                    show_notes_future = executor.submit(
+                        profiler.wrap("show_notes", show_notes.generate_show_notes),
+                        transcription_path, timestamps, client, writer, True, sections, plan.max_chunks
                     )
-                    titles = titles_response.choices[0].message.content.strip()
-                    if titles and titles.count("\n") >= 5:  # Basic validation that we got multiple titles
-                        print("Title suggestions generated")
-                    else:
-                        print("Warning: Title generation produced unexpected format")
-                        titles = None
+
+                # Extract keywords and generate titles
+                if metadata:
+                    keywords, titles = metadata['keywords'], metadata['titles']
                 else:
-                    print("Warning: Keyword extraction produced unexpected format")
-                    titles = None
-            except Exception as e:
-                print(f"Error in title generation pipeline: {e}")
-                titles = None
+                    with profiler.stage("keywords_titles"):
+                        keywords, titles = generate_keywords_and_titles(
+                            client, transcript_content, metadata_guest, topic, episode_key, sections, plan.titles
+                        )
 
-            # Update episode info with keywords and titles (if we have them)
-            info_file_path = save_episode_info(episode_folder, metadata_guest, topic, intro_paragraph, titles, keywords)
+                # Update episode info with keywords and titles (if we have them)
+                info_file_path = save_episode_info(episode_folder, metadata_guest, topic, intro_paragraph, titles, keywords,
+                                                   writer=writer)
 
-            # Generate show notes
-            show_notes_path = generate_show_notes(transcription_path, timestamps)
+                # Generate show notes
+                if show_notes_future:
+                    show_notes_path = show_notes_future.result()
+                else:
+                    with profiler.stage("show_notes"):
+                        show_notes_path = show_notes.generate_show_notes(
+                            transcription_path, timestamps, client, writer, max_chunks=plan.max_chunks
+                        )
             if show_notes_path:
                 print(f"Show notes generated at: {show_notes_path}")
         except Exception as e:
@@ -257,8 +565,25 @@ def run_after_transcription(transcription_path):
     except Exception as e:
         print(f"Error processing transcript: {e}")
         return "Unknown Speaker"
+    finally:
+        # Only settled once metering started; a plan without a meter spent nothing
+        if plan is not None and meter is not None:
+            governor.settle(plan, meter.usage, writer)
+            # Full analyses teach the ETA estimates; replays and postponed ones would skew them
+            if not reuse_analysis and not plan.postponed:
+                default_throughput().record_analysis(meter.usage, time.monotonic() - analysis_started,
+                                                     transcript_minutes(transcript_content))
+        if analysis_cache is not None and transcript_content is not None:
+            writer.write(ANALYSIS_CACHE_FILE, analysis_cache.dumps(transcript_content))
+            if reuse_analysis:
+                print(f"Re-analysis reused {analysis_cache.hits} responses and made {analysis_cache.misses} new calls")
+        # Everything staged so far lands in the folder in one step
+        if own_writer and writer is not None:
+            writer.commit()
+        if own_profiler and profiler.enabled:
+            profiler.write(writer.episode_folder if writer is not None else get_episode_folder(transcription_path))
     
 if __name__ == "__main__":
-    # Test with a sample path - adjust this path as needed
-    sample_path = Path("output/test_episode/transcription.md")
+    # Process a single transcript; use batch_processor.py for whole folders
+    sample_path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path("output/test_episode/transcription.md")
     run_after_transcription(str(sample_path))
\ No newline at end of file
@@ -0,0 +1,214 @@
+"""
+Opt-in per-episode profiling of the pipeline stages.
+
+An EpisodeProfiler wraps each stage (`with profiler.stage("intro"): ...`)
+and records:
+- wall-clock time, CPU time of the stage's thread, and CPU time of child
+  processes (ffmpeg), so the rest can be read as waiting (mostly network)
+- a cProfile of the stage
+- tracemalloc allocation growth over the stage
+- sampled stacks of every thread inside a stage, every SAMPLE_INTERVAL seconds
+
+`write(folder)` puts three files in the episode folder:
+    profile_summary.md   per-stage timings, top functions and top allocations
+    profile_stacks.txt   collapsed stacks (flamegraph.pl / speedscope ready)
+    profile.prof         combined cProfile stats (pstats / snakeviz)
+
+Episodes are profiled when selected explicitly, or at random with the rate in
+the PODCAST_PROFILE_RATE environment variable (e.g. 0.05 for 1 in 20).
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+PROFILE_RATE_ENV = "PODCAST_PROFILE_RATE"
+SAMPLE_INTERVAL = 0.01
+TOP_N = 15
+
+SUMMARY_FILE = "profile_summary.md"
+STACKS_FILE = "profile_stacks.txt"
+STATS_FILE = "profile.prof"
+
+def children_cpu_seconds():
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+@dataclass
+class StageProfile:
+    name: str
+    wall_seconds: float
+    cpu_seconds: float
+    child_cpu_seconds: float
+    profile: Optional[cProfile.Profile] = None
+    memory_top: List[str] = field(default_factory=list)
+
+    @property
+    def wait_seconds(self):
+        return max(self.wall_seconds - self.cpu_seconds - self.child_cpu_seconds, 0.0)
+
+class NullProfiler:
+    """Stand-in when profiling is off; stages cost nothing"""
+    enabled = False
+
+    @contextmanager
+    def stage(self, name):
+        yield
+
+    def wrap(self, name, function):
+        return function
+
+    def write(self, folder):
+        return None
+
+NULL_PROFILER = NullProfiler()
+
+class EpisodeProfiler:
+    enabled = True
+
+    def __init__(self, sample_interval=SAMPLE_INTERVAL, top_n=TOP_N, trace_memory=True):
+        self.sample_interval = sample_interval
+        self.top_n = top_n
+        self.stages: List[StageProfile] = []
+        self.active = {}          # thread id -> names of the stages it is inside
+        self.stacks = Counter()   # collapsed stack -> samples
+        self.lock = threading.Lock()
+        self.started_tracemalloc = trace_memory and not tracemalloc.is_tracing()
+        if self.started_tracemalloc:
+            tracemalloc.start()
+        self.stopped = threading.Event()
+        self.sampler = threading.Thread(target=self._sample, daemon=True)
+        self.sampler.start()
+
+    @contextmanager
+    def stage(self, name):
+        """Profile the enclosed block as one stage (nested stages only get timings)"""
+        thread_id = threading.get_ident()
+        with self.lock:
+            names = self.active.setdefault(thread_id, [])
+            outermost = not names
+            names.append(name)
+
+        # cProfile can't nest within a thread, so only the outermost stage gets one
+        profile = cProfile.Profile() if outermost else None
+        snapshot = tracemalloc.take_snapshot() if outermost and tracemalloc.is_tracing() else None
+        wall, cpu, child_cpu = time.perf_counter(), time.thread_time(), children_cpu_seconds()
+        if profile:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile:
+                profile.disable()
+            record = StageProfile(
+                name,
+                wall_seconds=time.perf_counter() - wall,
+                cpu_seconds=time.thread_time() - cpu,
+                child_cpu_seconds=children_cpu_seconds() - child_cpu,
+                profile=profile
+            )
+            if snapshot is not None and tracemalloc.is_tracing():
+                growth = tracemalloc.take_snapshot().compare_to(snapshot, 'lineno')
+                record.memory_top = [str(stat) for stat in growth[:self.top_n] if stat.size_diff > 0]
+            with self.lock:
+                self.stages.append(record)
+                names.pop()
+                if not names:
+                    del self.active[thread_id]
+
+    def wrap(self, name, function):
+        """`function` run as a stage, for work submitted to other threads"""
+        def profiled(*args, **kwargs):
+            with self.stage(name):
+                return function(*args, **kwargs)
+        return profiled
+
+    def _sample(self):
+        while not self.stopped.wait(self.sample_interval):
+            frames = sys._current_frames()
+            with self.lock:
+                active = {thread_id: list(names) for thread_id, names in self.active.items()}
+            for thread_id, names in active.items():
+                frame = frames.get(thread_id)
+                labels = []
+                while frame is not None:
+                    labels.append(frame_label(frame))
+                    frame = frame.f_back
+                self.stacks[";".join(names + labels[::-1])] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.sampler.join()
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+            self.started_tracemalloc = False
+
+    def summary(self):
+        lines = ["# Profile\n", "| Stage | Wall (s) | CPU (s) | Child CPU (s) | Waiting (s) |",
+                 "|---|---:|---:|---:|---:|"]
+        for stage in self.stages:
+            lines.append(f"| {stage.name} | {stage.wall_seconds:.2f} | {stage.cpu_seconds:.2f} | "
+                         f"{stage.child_cpu_seconds:.2f} | {stage.wait_seconds:.2f} |")
+
+        for stage in self.stages:
+            if not stage.profile and not stage.memory_top:
+                continue
+            lines.append(f"\n## {stage.name}\n")
+            if stage.profile:
+                output = io.StringIO()
+                stats = pstats.Stats(stage.profile, stream=output)
+                stats.sort_stats("cumulative").print_stats(self.top_n)
+                lines.extend(["Top functions by cumulative time:", "```", output.getvalue().strip(), "```"])
+            if stage.memory_top:
+                lines.extend(["\nLargest allocation growth:", "```", *stage.memory_top, "```"])
+        return "\n".join(lines) + "\n"
+
+    def write(self, folder):
+        """Stop profiling and write the summary, collapsed stacks and pstats into the folder"""
+        self.stop()
+        folder = Path(folder)
+        (folder / SUMMARY_FILE).write_text(self.summary(), encoding='utf-8')
+        (folder / STACKS_FILE).write_text(
+            "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items())),
+            encoding='utf-8'
+        )
+        profiles = [stage.profile for stage in self.stages if stage.profile]
+        if profiles:
+            pstats.Stats(*profiles).dump_stats(str(folder / STATS_FILE))
+        print(f"Profile written to {folder / SUMMARY_FILE}")
+        return str(folder / SUMMARY_FILE)
+
+def profile_rate_from_env():
+    try:
+        return float(os.getenv(PROFILE_RATE_ENV, "0"))
+    except ValueError:
+        return 0.0
+
+def profiler_for_episode(rate=None):
+    """An EpisodeProfiler for a sampled share of episodes, NULL_PROFILER for the rest"""
+    rate = profile_rate_from_env() if rate is None else rate
+    if rate >= 1 or (rate > 0 and random.random() < rate):
+        return EpisodeProfiler()
+    return NULL_PROFILER
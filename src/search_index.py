@@ -0,0 +1,415 @@
+"""
+Full-text search over every episode transcript.
+
+The index is an incremental, segmented inverted index with positional
+postings. Each update writes a new immutable segment of NumPy arrays that are
+opened with mmap, so a query only touches the pages it needs:
+
+    term_hashes.npy      uint64, sorted 64-bit hashes of every term
+    term_offsets.npy     int64, postings range of each term (n_terms + 1)
+    post_docs.npy        int32, document id of each posting
+    post_positions.npy   int32, token position of each posting
+    doc_cue_offsets.npy  int64, cue range of each document (n_docs + 1)
+    cue_start_ms.npy     int32, start time of each cue
+    cue_tokens.npy       int32, position of each cue's first token
+    cue_text.bin         utf-8 cue text, sliced by cue_text_offsets.npy
+    docs.json            episode folder and content hash of each document
+
+When an episode has a current word timing sidecar (word_timings.py), a hit's
+timestamp is the time the phrase itself is spoken rather than its cue's start.
+
+manifest.json lists the live segments and which document of which segment
+is the current version of each episode. Re-indexed or renamed episodes only
+touch the manifest; `compact` rewrites everything into a single segment,
+and runs by itself once an update leaves more than COMPACT_SEGMENTS segments.
+
+Usage:
+    python src/search_index.py update ROOT [ROOT ...]
+    python src/search_index.py search "knowledge graph" [--limit 20]
+    python src/search_index.py compact
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from batch_processor import find_episode_folders, TRANSCRIPT_FILE
+from prompts.registry.essential.show_notes.timestamps import parse_srt_transcript, parse_srt_timestamp
+from word_timings import load_word_timings
+
+DEFAULT_INDEX_DIR = Path(__file__).resolve().parent.parent / "output" / "search_index"
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+SNIPPET_CHARS = 240
+CUE_SLACK_MS = 1000   # Word times may fall slightly outside their cue's rounded times
+COMPACT_SEGMENTS = 16 # Live segments an update may leave before the index is compacted
+
+_index_lock = threading.Lock()
+
+@dataclass
+class SearchHit:
+    episode: str     # Episode folder
+    timestamp: str   # HH:MM:SS of the phrase (with word timing) or of the cue containing the hit
+    snippet: str
+
+def tokenize(text):
+    return WORD_PATTERN.findall(text.lower())
+
+def term_hash(term):
+    """Stable 64-bit hash of a term"""
+    return int.from_bytes(hashlib.blake2b(term.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def format_ms(milliseconds):
+    seconds = int(milliseconds) // 1000
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+def format_srt_ms(milliseconds):
+    return f"{format_ms(milliseconds)},{int(milliseconds) % 1000:03d}"
+
+def parse_cues(transcript_text):
+    """(start_ms, text) for every cue; non-SRT text becomes a single cue at 0"""
+    cues = []
+    for entry in parse_srt_transcript(transcript_text):
+        if not entry.start_time or not entry.text:
+            continue
+        start_ms = int(parse_srt_timestamp(entry.start_time).total_seconds() * 1000)
+        cues.append((start_ms, entry.text))
+    if not cues and transcript_text.strip():
+        cues.append((0, transcript_text.strip()))
+    return cues
+
+def content_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def write_segment(segment_dir, documents):
+    """
+    Write an immutable segment
+    Args:
+        segment_dir: Directory to create
+        documents: list of (episode folder, transcript text)
+    """
+    postings = {}
+    doc_cue_offsets = [0]
+    cue_start_ms = []
+    cue_tokens = []
+    cue_texts = []
+    docs = []
+
+    for doc_id, (episode, text) in enumerate(documents):
+        position = 0
+        for start_ms, cue_text in parse_cues(text):
+            cue_start_ms.append(start_ms)
+            cue_tokens.append(position)
+            cue_texts.append(cue_text.encode('utf-8'))
+            for token in tokenize(cue_text):
+                postings.setdefault(token, ([], []))
+                postings[token][0].append(doc_id)
+                postings[token][1].append(position)
+                position += 1
+        doc_cue_offsets.append(len(cue_start_ms))
+        docs.append({"episode": episode, "hash": content_hash(text)})
+
+    terms = sorted(postings, key=term_hash)
+    hashes = np.fromiter((term_hash(term) for term in terms), dtype=np.uint64, count=len(terms))
+    term_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    post_docs = []
+    post_positions = []
+    for i, term in enumerate(terms):
+        doc_ids, positions = postings[term]
+        post_docs.extend(doc_ids)
+        post_positions.extend(positions)
+        term_offsets[i + 1] = len(post_docs)
+    text_offsets = np.cumsum([0] + [len(text) for text in cue_texts]).astype(np.int64)
+
+    temp_dir = Path(str(segment_dir) + ".tmp")
+    temp_dir.mkdir(parents=True, exist_ok=True)
+    np.save(temp_dir / "term_hashes.npy", hashes)
+    np.save(temp_dir / "term_offsets.npy", term_offsets)
+    np.save(temp_dir / "post_docs.npy", np.asarray(post_docs, dtype=np.int32))
+    np.save(temp_dir / "post_positions.npy", np.asarray(post_positions, dtype=np.int32))
+    np.save(temp_dir / "doc_cue_offsets.npy", np.asarray(doc_cue_offsets, dtype=np.int64))
+    np.save(temp_dir / "cue_start_ms.npy", np.asarray(cue_start_ms, dtype=np.int32))
+    np.save(temp_dir / "cue_tokens.npy", np.asarray(cue_tokens, dtype=np.int32))
+    np.save(temp_dir / "cue_text_offsets.npy", text_offsets)
+    (temp_dir / "cue_text.bin").write_bytes(b"".join(cue_texts))
+    (temp_dir / "docs.json").write_text(json.dumps(docs), encoding='utf-8')
+    os.replace(temp_dir, segment_dir)
+
+class Segment:
+    """Read-only, memory-mapped view of one segment"""
+    def __init__(self, segment_dir):
+        segment_dir = Path(segment_dir)
+        self.name = segment_dir.name
+
+        def load(name):
+            return np.load(segment_dir / name, mmap_mode='r')
+
+        self.term_hashes = load("term_hashes.npy")
+        self.term_offsets = load("term_offsets.npy")
+        self.post_docs = load("post_docs.npy")
+        self.post_positions = load("post_positions.npy")
+        self.doc_cue_offsets = load("doc_cue_offsets.npy")
+        self.cue_start_ms = load("cue_start_ms.npy")
+        self.cue_tokens = load("cue_tokens.npy")
+        self.cue_text_offsets = load("cue_text_offsets.npy")
+        self.cue_text = np.memmap(segment_dir / "cue_text.bin", dtype=np.uint8, mode='r') \
+            if (segment_dir / "cue_text.bin").stat().st_size else np.zeros(0, dtype=np.uint8)
+        self.docs = json.loads((segment_dir / "docs.json").read_text(encoding='utf-8'))
+
+    def postings(self, term):
+        """Posting keys (doc_id << 32 | position) for a term"""
+        key = np.uint64(term_hash(term))
+        index = np.searchsorted(self.term_hashes, key)
+        if index >= len(self.term_hashes) or self.term_hashes[index] != key:
+            return np.zeros(0, dtype=np.int64)
+        start, end = self.term_offsets[index], self.term_offsets[index + 1]
+        return (self.post_docs[start:end].astype(np.int64) << 32) | self.post_positions[start:end].astype(np.int64)
+
+    def phrase_matches(self, tokens):
+        """Posting keys where the whole token sequence starts"""
+        matches = None
+        for offset, token in enumerate(tokens):
+            # Shift each term's positions back so every term lines up on the phrase start
+            keys = self.postings(token) - offset
+            matches = keys if matches is None else np.intersect1d(matches, keys, assume_unique=True)
+            if not len(matches):
+                break
+        return matches
+
+    def cue_text_at(self, cue):
+        start, end = self.cue_text_offsets[cue], self.cue_text_offsets[cue + 1]
+        return bytes(self.cue_text[start:end]).decode('utf-8')
+
+    def locate(self, doc_id, position):
+        """Global cue index containing a token position of a document"""
+        first, last = self.doc_cue_offsets[doc_id], self.doc_cue_offsets[doc_id + 1]
+        cue = first + np.searchsorted(self.cue_tokens[first:last], position, side='right') - 1
+        return int(max(cue, first)), int(first), int(last)
+
+    def snippet(self, cue, first, last):
+        """Hit cue with its neighbours for context"""
+        text = " ".join(self.cue_text_at(i) for i in range(max(cue - 1, first), min(cue + 2, last)))
+        if len(text) > SNIPPET_CHARS:
+            text = text[:SNIPPET_CHARS].rsplit(" ", 1)[0] + "…"
+        return text
+
+class SearchIndex:
+    """Segmented inverted index over episode transcripts"""
+    def __init__(self, index_dir=DEFAULT_INDEX_DIR):
+        self.index_dir = Path(index_dir)
+        self.manifest_path = self.index_dir / "manifest.json"
+        if self.manifest_path.exists():
+            self.manifest = json.loads(self.manifest_path.read_text(encoding='utf-8'))
+        else:
+            # episodes: episode folder -> {"segment": name, "doc": id, "hash": content hash}
+            self.manifest = {"segments": [], "episodes": {}, "next_segment": 0}
+        self._segments = {}
+
+    def save(self):
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = self.manifest_path.with_suffix(".json.tmp")
+        temp_path.write_text(json.dumps(self.manifest, indent=2), encoding='utf-8')
+        os.replace(temp_path, self.manifest_path)
+
+    def segment(self, name):
+        if name not in self._segments:
+            self._segments[name] = Segment(self.index_dir / name)
+        return self._segments[name]
+
+    def add_documents(self, documents):
+        """
+        Index new or changed transcripts as one new segment
+        Args:
+            documents: list of (episode folder, transcript text)
+        Returns the number of episodes (re)indexed
+        """
+        episodes = self.manifest["episodes"]
+        changed = [
+            (episode, text) for episode, text in documents
+            if episodes.get(episode, {}).get("hash") != content_hash(text)
+        ]
+        if not changed:
+            return 0
+
+        name = f"seg_{self.manifest['next_segment']:05d}"
+        self.manifest["next_segment"] += 1
+        write_segment(self.index_dir / name, changed)
+        self.manifest["segments"].append(name)
+        for doc_id, (episode, text) in enumerate(changed):
+            episodes[episode] = {"segment": name, "doc": doc_id, "hash": content_hash(text)}
+        self._drop_unused_segments()
+        self.save()
+        if len(self.manifest["segments"]) > COMPACT_SEGMENTS:
+            self.compact()
+        return len(changed)
+
+    def rename_episode(self, old_folder, new_folder):
+        """Point an indexed episode at its renamed folder"""
+        entry = self.manifest["episodes"].pop(str(old_folder), None)
+        if entry:
+            self.manifest["episodes"][str(new_folder)] = entry
+            self.save()
+
+    def remove_missing(self):
+        """Forget episodes whose folder no longer exists"""
+        missing = [episode for episode in self.manifest["episodes"] if not Path(episode).exists()]
+        for episode in missing:
+            del self.manifest["episodes"][episode]
+        if missing:
+            self._drop_unused_segments()
+            self.save()
+        return len(missing)
+
+    def update(self, roots):
+        """Index every new or changed transcript under the roots"""
+        self.remove_missing()
+        documents = []
+        for folder in find_episode_folders(roots):
+            text = (Path(folder) / TRANSCRIPT_FILE).read_text(encoding='utf-8')
+            documents.append((str(folder), text))
+        return self.add_documents(documents)
+
+    def compact(self):
+        """Rewrite all live documents into a single segment"""
+        documents = []
+        for episode, entry in self.manifest["episodes"].items():
+            segment = self.segment(entry["segment"])
+            first, last = segment.doc_cue_offsets[entry["doc"]], segment.doc_cue_offsets[entry["doc"] + 1]
+            # Rebuild an SRT-shaped transcript from the stored cues
+            cues = [
+                f"{i + 1}\n{format_srt_ms(segment.cue_start_ms[cue])} --> {format_srt_ms(segment.cue_start_ms[cue])}\n"
+                f"{segment.cue_text_at(cue)}\n"
+                for i, cue in enumerate(range(first, last))
+            ]
+            documents.append((episode, "\n".join(cues), entry["hash"]))
+
+        name = f"seg_{self.manifest['next_segment']:05d}"
+        self.manifest["next_segment"] += 1
+        write_segment(self.index_dir / name, [(episode, text) for episode, text, _ in documents])
+        self.manifest["segments"] = [name]
+        # Keep the original transcript hashes so unchanged episodes aren't re-indexed
+        self.manifest["episodes"] = {
+            episode: {"segment": name, "doc": doc_id, "hash": original_hash}
+            for doc_id, (episode, _, original_hash) in enumerate(documents)
+        }
+        self._drop_unused_segments()
+        self.save()
+
+    def _drop_unused_segments(self):
+        live = {entry["segment"] for entry in self.manifest["episodes"].values()}
+        for name in list(self.manifest["segments"]):
+            if name not in live:
+                self.manifest["segments"].remove(name)
+                self._segments.pop(name, None)
+                shutil.rmtree(self.index_dir / name, ignore_errors=True)
+
+    def search(self, query, limit=20):
+        """
+        Phrase search across the whole archive
+        Returns a list of SearchHit ordered by episode and time
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        # Which (segment, doc) pairs are the live version of an episode
+        live = {}
+        for episode, entry in self.manifest["episodes"].items():
+            live.setdefault(entry["segment"], {})[entry["doc"]] = episode
+
+        matches = []
+        for name in self.manifest["segments"]:
+            if name not in live:
+                continue
+            segment = self.segment(name)
+            for key in segment.phrase_matches(tokens):
+                doc_id, position = int(key >> 32), int(key & 0xFFFFFFFF)
+                episode = live[name].get(doc_id)
+                if episode is not None:
+                    matches.append((episode, position, segment, doc_id))
+        # Postings come in segment order; sort before cutting at the limit
+        matches.sort(key=lambda match: (match[0], match[1]))
+
+        hits = []
+        word_timings = {}
+        for episode, position, segment, doc_id in matches[:limit]:
+            cue, first, last = segment.locate(doc_id, position)
+            if episode not in word_timings:
+                # Only a sidecar written with the indexed transcript version is used
+                word_timings[episode] = load_word_timings(episode, sha1_hex=segment.docs[doc_id]["hash"])
+            hits.append(SearchHit(
+                episode=episode,
+                timestamp=format_ms(self._spoken_at(word_timings[episode], query, segment, cue, last)),
+                snippet=segment.snippet(cue, first, last)
+            ))
+        return hits
+
+    @staticmethod
+    def _spoken_at(timings, query, segment, cue, last):
+        """Milliseconds the phrase starts in a cue: from word timing when there is some, else the cue start"""
+        cue_start = int(segment.cue_start_ms[cue])
+        if timings is None:
+            return cue_start
+        cue_end = int(segment.cue_start_ms[cue + 1]) + CUE_SLACK_MS if cue + 1 < last else None
+        spoken = timings.find(query, max(cue_start - CUE_SLACK_MS, 0) / 1000,
+                              cue_end / 1000 if cue_end is not None else None, limit=1)
+        return int(spoken[0][0] * 1000) if spoken else cue_start
+
+def search(query, limit=20, index_dir=DEFAULT_INDEX_DIR):
+    """Search the transcript archive; returns a list of SearchHit"""
+    return SearchIndex(index_dir).search(query, limit)
+
+def index_transcript(transcription_path, index_dir=DEFAULT_INDEX_DIR):
+    """Add (or refresh) one transcript in the index, e.g. right after it is written"""
+    transcription_path = Path(transcription_path)
+    with _index_lock:
+        index = SearchIndex(index_dir)
+        text = transcription_path.read_text(encoding='utf-8')
+        return index.add_documents([(str(transcription_path.parent.resolve()), text)])
+
+def rename_indexed_episode(old_folder, new_folder, index_dir=DEFAULT_INDEX_DIR):
+    """Keep the index pointing at an episode after its folder is renamed"""
+    with _index_lock:
+        SearchIndex(index_dir).rename_episode(str(Path(old_folder).resolve()), str(Path(new_folder).resolve()))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Full-text search over episode transcripts")
+    parser.add_argument("--index", default=str(DEFAULT_INDEX_DIR), help="Index directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    update_parser = subparsers.add_parser("update", help="Index new or changed transcripts under the roots")
+    update_parser.add_argument("roots", nargs="+")
+    search_parser = subparsers.add_parser("search", help="Phrase search")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--limit", type=int, default=20)
+    subparsers.add_parser("compact", help="Merge all segments into one")
+    args = parser.parse_args(argv)
+
+    index = SearchIndex(args.index)
+    if args.command == "update":
+        changed = index.update(args.roots)
+        print(f"Indexed {changed} episodes ({len(index.manifest['episodes'])} total, "
+              f"{len(index.manifest['segments'])} segments)")
+    elif args.command == "compact":
+        index.compact()
+        print(f"Compacted {len(index.manifest['episodes'])} episodes into one segment")
+    else:
+        started = time.perf_counter()
+        hits = index.search(args.query, args.limit)
+        elapsed = (time.perf_counter() - started) * 1000
+        for hit in hits:
+            print(f"{Path(hit.episode).name} [{hit.timestamp}] {hit.snippet}")
+        print(f"\n{len(hits)} hits in {elapsed:.1f}ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
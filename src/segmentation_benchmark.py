@@ -0,0 +1,51 @@
+"""
+Benchmark timeline calls saved by topic segmentation.
+
+For every episode under the given roots, compares the number of timeline
+summary calls with fixed 5-minute windows against local topic segmentation,
+along with the time the segmenter itself takes.
+
+Usage:
+    python src/segmentation_benchmark.py ROOT [ROOT ...]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from batch_processor import find_episode_folders, TRANSCRIPT_FILE
+from post_transcription_processor import read_transcript
+from prompts.registry.essential.show_notes.timestamps import parse_srt_transcript, split_segments
+
+def benchmark_episode(transcript_text):
+    """Fixed vs topic segment counts for one transcript"""
+    entries = parse_srt_transcript(transcript_text)
+    fixed = split_segments(entries, "fixed")
+    started = time.perf_counter()
+    topic = split_segments(entries, "topic")
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    return {"fixed_calls": len(fixed), "topic_calls": len(topic), "segment_ms": elapsed_ms,
+            "boundaries": [timestamp for timestamp, _ in topic]}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare fixed-interval and topic timeline segmentation")
+    parser.add_argument("roots", nargs="+", help="Folders to search for episode folders")
+    args = parser.parse_args(argv)
+
+    total_fixed = total_topic = 0
+    for folder in find_episode_folders(args.roots):
+        result = benchmark_episode(read_transcript(Path(folder) / TRANSCRIPT_FILE))
+        total_fixed += result["fixed_calls"]
+        total_topic += result["topic_calls"]
+        print(f"{Path(folder).name}: {result['fixed_calls']} → {result['topic_calls']} calls "
+              f"({result['fixed_calls'] - result['topic_calls']} saved, segmented in {result['segment_ms']:.1f}ms)")
+        print(f"    segments at {', '.join(result['boundaries'])}")
+
+    if total_fixed:
+        saved = total_fixed - total_topic
+        print(f"\nTotal: {total_fixed} → {total_topic} timeline calls ({saved} saved, {saved / total_fixed:.0%})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+import bisect
+import json
+import os
+import re
+import subprocess
+import tempfile
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+NOISE_THRESHOLD = "-40dB"   # Anything quieter counts as silence
+MIN_SILENCE_SECONDS = 2.0   # Only silences at least this long are cut
+PADDING_SECONDS = 0.25      # Audio kept on each side of a cut so words aren't clipped
+
+SRT_TIMESTAMP = re.compile(r'(\d{2}):(\d{2}):(\d{2}),(\d{3})')
+
+@dataclass
+class OffsetMap:
+    """Maps times in the trimmed audio back to the original recording"""
+    # (trimmed start, original start, length) of every kept span, in order
+    spans: List[Tuple[float, float, float]] = field(default_factory=list)
+
+    def __post_init__(self):
+        self._starts = [trimmed_start for trimmed_start, _, _ in self.spans]
+
+    def to_original(self, seconds: float) -> float:
+        if not self.spans:
+            return seconds
+        index = max(bisect.bisect_right(self._starts, seconds) - 1, 0)
+        trimmed_start, original_start, length = self.spans[index]
+        return original_start + min(max(seconds - trimmed_start, 0.0), length)
+
+    def to_dict(self):
+        return {"spans": [list(span) for span in self.spans]}
+
+@dataclass
+class TrimResult:
+    output_file: str
+    offset_map: OffsetMap
+    original_seconds: float
+    trimmed_seconds: float
+    original_bytes: int
+    trimmed_bytes: int
+
+    def report(self):
+        """Bytes and minutes saved by trimming"""
+        return {
+            "original_minutes": round(self.original_seconds / 60, 2),
+            "trimmed_minutes": round(self.trimmed_seconds / 60, 2),
+            "minutes_saved": round((self.original_seconds - self.trimmed_seconds) / 60, 2),
+            "original_bytes": self.original_bytes,
+            "trimmed_bytes": self.trimmed_bytes,
+            "bytes_saved": self.original_bytes - self.trimmed_bytes
+        }
+
+def detect_silences(input_file, noise=NOISE_THRESHOLD, min_silence=MIN_SILENCE_SECONDS):
+    """
+    Find silent stretches with ffmpeg's silencedetect filter
+    Returns (list of (start, end) in seconds, total duration in seconds)
+    """
+    command = [
+        'ffmpeg', '-hide_banner', '-nostats',
+        '-i', input_file,
+        '-af', f'silencedetect=noise={noise}:d={min_silence}',
+        '-f', 'null', '-'
+    ]
+    result = subprocess.run(command, check=True, capture_output=True, text=True)
+    output = result.stderr
+
+    duration_match = re.search(r'Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)', output)
+    if not duration_match:
+        raise ValueError(f"Could not read duration of {input_file}")
+    hours, minutes, seconds = duration_match.groups()
+    duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    starts = [float(value) for value in re.findall(r'silence_start:\s*(-?\d+(?:\.\d+)?)', output)]
+    ends = [float(value) for value in re.findall(r'silence_end:\s*(\d+(?:\.\d+)?)', output)]
+    # A recording that ends in silence has a start without a matching end
+    ends.extend([duration] * (len(starts) - len(ends)))
+    return [(max(start, 0.0), end) for start, end in zip(starts, ends)], duration
+
+def keep_intervals(silences, duration, padding=PADDING_SECONDS):
+    """Spans of audio to keep once the silences (minus padding) are cut"""
+    keep = []
+    position = 0.0
+    for start, end in silences:
+        cut_start = start + padding if start > 0 else 0.0
+        cut_end = end - padding if end < duration else duration
+        if cut_end <= cut_start:
+            continue
+        if cut_start > position:
+            keep.append((position, cut_start))
+        position = cut_end
+    if position < duration:
+        keep.append((position, duration))
+    return keep
+
+def build_offset_map(keep):
+    spans = []
+    trimmed_position = 0.0
+    for start, end in keep:
+        spans.append((round(trimmed_position, 3), round(start, 3), round(end - start, 3)))
+        trimmed_position += end - start
+    return OffsetMap(spans)
+
+def trim_silence(input_file, temp_dir):
+    """
+    Cut long silences out of a recording before upload
+    Returns a TrimResult, or None if there is nothing worth cutting
+    """
+    silences, duration = detect_silences(input_file)
+    keep = keep_intervals(silences, duration)
+    kept_seconds = sum(end - start for start, end in keep)
+    if not keep or duration - kept_seconds < MIN_SILENCE_SECONDS:
+        return None
+
+    # Unique name: tracks with the same base name (participant tracks of one meeting) are trimmed at once
+    base_name = os.path.splitext(os.path.basename(input_file))[0]
+    handle, output_file = tempfile.mkstemp(prefix=f"trimmed_{base_name}_", suffix=".mp3", dir=temp_dir)
+    os.close(handle)
+    selection = '+'.join(f'between(t,{start:.3f},{end:.3f})' for start, end in keep)
+    command = [
+        'ffmpeg',
+        '-i', input_file,
+        '-af', f"aselect='{selection}',asetpts=N/SR/TB",
+        '-acodec', 'libmp3lame',
+        '-b:a', '32k',
+        '-ac', '1',
+        '-ar', '22050',
+        '-y',
+        output_file
+    ]
+    try:
+        subprocess.run(command, check=True, capture_output=True, text=True)
+    except (subprocess.CalledProcessError, OSError):
+        os.remove(output_file)
+        raise
+
+    return TrimResult(
+        output_file=output_file,
+        offset_map=build_offset_map(keep),
+        original_seconds=duration,
+        trimmed_seconds=kept_seconds,
+        original_bytes=os.path.getsize(input_file),
+        trimmed_bytes=os.path.getsize(output_file)
+    )
+
+def format_srt_time(seconds):
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{milliseconds:03d}"
+
+def remap_srt(srt_text, offset_map):
+    """Rewrite every SRT timestamp from trimmed time back to original-recording time"""
+    def replace(match):
+        hours, minutes, seconds, milliseconds = map(int, match.groups())
+        trimmed = hours * 3600 + minutes * 60 + seconds + milliseconds / 1000
+        return format_srt_time(offset_map.to_original(trimmed))
+    return SRT_TIMESTAMP.sub(replace, srt_text)
+
+def save_trim_report(folder_path, trim_result, writer=None):
+    """
+    Write the offset map and savings next to the transcript
+    If a writer (EpisodeArtifactWriter) is given, the report is staged on it instead
+    """
+    if writer:
+        return writer.write("silence_map.json", json.dumps(
+            {**trim_result.report(), **trim_result.offset_map.to_dict()}, indent=2))
+    report_path = os.path.join(folder_path, "silence_map.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump({**trim_result.report(), **trim_result.offset_map.to_dict()}, f, indent=2)
+    return report_path
@@ -0,0 +1,283 @@
+"""
+Throughput history and completion-time estimates for recordings and episodes.
+
+A recording's duration is probed once (ffprobe) and cached by path, size and
+mtime in output/media_durations.json. Every finished job adds samples to a
+rolling history of throughput (output/throughput_history.json, the last
+HISTORY_WINDOW samples per metric):
+
+    encode              recording minutes per second of silence trimming and compression
+    transcribe:<name>   recording minutes per second of a transcription backend; for the
+                        API backend this includes the upload, which is part of the request
+    model:<name>        tokens per second of API time, per analysis model
+    analysis_overlap    API seconds per wall-clock second of an analysis (calls run concurrently)
+    tokens_per_minute   analysis tokens per recording minute
+
+Estimates use the median of each window, or DEFAULT_RATES until there is
+history. A new recording's estimate covers encode, transcription and
+analysis (its tokens predicted from its length); an episode that is already
+transcribed is estimated from the budget governor's token estimate for its
+transcript. `schedule` orders jobs shortest first, which minimizes the mean
+time until each episode's show notes are done, and gives every job its ETA.
+
+Usage:
+    python src/throughput_model.py PATH [PATH ...] [--workers 3]   # ETAs for recordings and episode folders
+"""
+
+import argparse
+import heapq
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional
+
+from model_router import STAGE_ROUTES
+from transcription_backends import parse_srt, probe_duration
+
+OUTPUT_DIR = Path(__file__).resolve().parent.parent / "output"
+HISTORY_PATH = OUTPUT_DIR / "throughput_history.json"
+DURATIONS_PATH = OUTPUT_DIR / "media_durations.json"
+HISTORY_WINDOW = 20
+
+# Rates used until a metric has history
+DEFAULT_RATES = {
+    "encode": 2.0,               # Silence detection and trim: ~30s per recorded hour
+    "transcribe:api": 0.5,       # ~2 minutes per recorded hour, upload included
+    "transcribe:local": 0.1,
+    "transcribe:fake": 60.0,
+    "analysis_overlap": 2.0,
+    "tokens_per_minute": 800,
+}
+DEFAULT_MODEL_RATE = 800         # Tokens per second of API time for a model without history
+ANALYSIS_MODEL = STAGE_ROUTES["chunk"].models[0]
+
+class DurationCache:
+    """Recording durations, probed once per file version and kept across runs"""
+    def __init__(self, path=DURATIONS_PATH):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self._entries = None
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                self._entries = json.loads(self.path.read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def duration(self, audio_path):
+        """Duration in seconds, or None when the file can't be probed"""
+        try:
+            stat = os.stat(audio_path)
+        except OSError:
+            return None
+        key = str(Path(audio_path).resolve())
+        with self.lock:
+            entry = self._load().get(key)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["seconds"]
+        try:
+            seconds = probe_duration(audio_path)
+        except (subprocess.CalledProcessError, ValueError, OSError):
+            return None
+        with self.lock:
+            self._load()[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "seconds": seconds}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_suffix(".json.tmp")
+            temp_path.write_text(json.dumps(self._entries, indent=2), encoding='utf-8')
+            os.replace(temp_path, self.path)
+        return seconds
+
+_durations = DurationCache()
+
+def media_duration(audio_path):
+    """Duration of a recording in seconds (probed once per file version), or None"""
+    return _durations.duration(audio_path)
+
+def transcript_minutes(transcript_content):
+    """Recording length covered by an SRT transcript, from its last cue"""
+    segments = parse_srt(transcript_content)
+    return max((segment.end for segment in segments), default=0.0) / 60
+
+@dataclass
+class JobEstimate:
+    """Predicted seconds per stage of one job, and its place in the schedule"""
+    name: str
+    stages: Dict[str, float]
+    audio_minutes: Optional[float] = None
+    start_offset: float = 0.0         # Seconds from the start of the run until the job starts
+    eta: Optional[datetime] = None
+    item: object = field(default=None, repr=False)   # What the estimate is for (path, folder)
+
+    @property
+    def seconds(self):
+        return sum(self.stages.values())
+
+    @property
+    def finish_offset(self):
+        return self.start_offset + self.seconds
+
+    def describe(self):
+        stages = ", ".join(f"{stage} {seconds / 60:.1f}m" for stage, seconds in self.stages.items())
+        eta = f", ready around {self.eta:%H:%M}" if self.eta else ""
+        return f"{self.seconds / 60:.1f} min ({stages}){eta}"
+
+class ThroughputModel:
+    """
+    Rolling per-stage throughput history and the estimates made from it
+    Args:
+        history_path: JSON file holding the last HISTORY_WINDOW samples per metric
+    """
+    def __init__(self, history_path=HISTORY_PATH):
+        self.history_path = Path(history_path)
+        self.lock = threading.Lock()
+        try:
+            self.samples = json.loads(self.history_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            self.samples = {}
+
+    def record(self, metric, value):
+        with self.lock:
+            window = self.samples.setdefault(metric, [])
+            window.append(round(value, 4))
+            del window[:-HISTORY_WINDOW]
+            self.history_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.history_path.with_suffix(".json.tmp")
+            temp_path.write_text(json.dumps(self.samples, indent=2), encoding='utf-8')
+            os.replace(temp_path, self.history_path)
+
+    def rate(self, metric, default=None):
+        """Median of the metric's recent samples, or its default"""
+        with self.lock:
+            window = self.samples.get(metric)
+            if window:
+                return statistics.median(window)
+        if default is None:
+            default = DEFAULT_RATES.get(metric, DEFAULT_MODEL_RATE if metric.startswith("model:") else None)
+        return default
+
+    def record_audio(self, stage, audio_minutes, seconds):
+        """One audio stage sample: stage is "encode" or "transcribe:<backend>" """
+        if audio_minutes and seconds > 0:
+            self.record(stage, audio_minutes / seconds)
+
+    def record_analysis(self, usage, wall_seconds, audio_minutes=None):
+        """
+        Samples from a finished analysis
+        Args:
+            usage: The analysis's StageUsage (budget_governor.py)
+            wall_seconds: Wall-clock time of the whole analysis
+            audio_minutes: Optional length of the recording the transcript covers
+        """
+        api_seconds = 0.0
+        for model, totals in usage.models.items():
+            if totals["tokens"] and totals["seconds"] > 0:
+                self.record(f"model:{model}", totals["tokens"] / totals["seconds"])
+            api_seconds += totals["seconds"]
+        if api_seconds > 0 and wall_seconds > 0:
+            self.record("analysis_overlap", api_seconds / wall_seconds)
+        if audio_minutes and usage.tokens:
+            self.record("tokens_per_minute", usage.tokens / audio_minutes)
+
+    def analysis_seconds(self, tokens_by_model):
+        api_seconds = sum(tokens / self.rate(f"model:{model}") for model, tokens in tokens_by_model.items())
+        return api_seconds / max(self.rate("analysis_overlap"), 1.0)
+
+    def estimate_recording(self, audio_path, backend="api", trim=True):
+        """Encode, transcription and analysis estimate for a new recording, or None if it can't be probed"""
+        seconds = media_duration(audio_path)
+        if not seconds:
+            return None
+        minutes = seconds / 60
+        stages = {}
+        if trim:
+            stages["encode"] = minutes / self.rate("encode")
+        stages["transcribe"] = minutes / self.rate(f"transcribe:{backend}", DEFAULT_RATES["transcribe:api"])
+        stages["analysis"] = self.analysis_seconds({ANALYSIS_MODEL: minutes * self.rate("tokens_per_minute")})
+        return JobEstimate(Path(audio_path).name, stages, minutes, item=audio_path)
+
+    def estimate_episode(self, transcript_content, name="episode", governor=None):
+        """Analysis estimate for a transcribed episode, from the governor's per-stage token estimate"""
+        # Imported here so the transcriber can record throughput without loading the prompts package
+        from budget_governor import AnalysisPlan, default_governor
+
+        governor = governor or default_governor()
+        estimate = governor.estimate(transcript_content, AnalysisPlan())
+        tokens_by_model = {}
+        for stage, cost in estimate["stages"].items():
+            model = STAGE_ROUTES[stage].models[0]
+            tokens_by_model[model] = tokens_by_model.get(model, 0) + cost["tokens"]
+        return JobEstimate(name, {"analysis": self.analysis_seconds(tokens_by_model)},
+                           transcript_minutes(transcript_content))
+
+def schedule(estimates, workers=1, start=None, shortest=True):
+    """
+    Order jobs shortest first and give each its start offset and ETA
+    With several workers each job goes to the worker that frees up first.
+    Args:
+        shortest: False keeps the given order and only works out the ETAs
+    Returns the estimates in run order.
+    """
+    start = start or datetime.now()
+    ordered = sorted(estimates, key=lambda estimate: estimate.seconds) if shortest else list(estimates)
+    free_at = [0.0] * max(workers, 1)
+    for estimate in ordered:
+        estimate.start_offset = heapq.heappop(free_at)
+        estimate.eta = start + timedelta(seconds=estimate.finish_offset)
+        heapq.heappush(free_at, estimate.finish_offset)
+    return ordered
+
+def mean_finish_minutes(estimates):
+    """Mean predicted time until each job's show notes are done"""
+    return statistics.mean(estimate.finish_offset for estimate in estimates) / 60 if estimates else 0.0
+
+_default_model = None
+_default_model_lock = threading.Lock()
+
+def default_throughput():
+    """The process-wide throughput model"""
+    global _default_model
+    with _default_model_lock:
+        if _default_model is None:
+            _default_model = ThroughputModel()
+        return _default_model
+
+def main(argv=None):
+    # Imported here: batch_processor imports the analysis, which imports this module
+    from batch_processor import find_episode_folders, TRANSCRIPT_FILE
+
+    parser = argparse.ArgumentParser(description="Estimate when recordings and episodes will have show notes")
+    parser.add_argument("paths", nargs="+", help="Recordings (.m4a) or folders to search for episode folders")
+    parser.add_argument("--workers", type=int, default=1, help="Jobs run concurrently")
+    parser.add_argument("--backend", default="api", help="Transcription backend new recordings go to")
+    args = parser.parse_args(argv)
+
+    model = default_throughput()
+    estimates = []
+    for path in map(Path, args.paths):
+        if path.is_file():
+            estimate = model.estimate_recording(path, args.backend)
+            if estimate is None:
+                print(f"Could not read the duration of {path}")
+            else:
+                estimates.append(estimate)
+            continue
+        for folder in find_episode_folders([path]):
+            transcript = (folder / TRANSCRIPT_FILE).read_text(encoding='utf-8')
+            estimates.append(model.estimate_episode(transcript, folder.name))
+
+    for estimate in schedule(estimates, args.workers):
+        print(f"{estimate.name}: {estimate.describe()}")
+    if estimates:
+        print(f"\nMean time to show notes: {mean_finish_minutes(estimates):.1f} min")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
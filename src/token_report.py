@@ -0,0 +1,66 @@
+"""
+Report prompt tokens saved by the compact transcript projection.
+
+For every episode under the given roots, estimates the transcript tokens each
+stage would send with raw SRT versus the compact projection, per stage and
+per episode, with corpus totals at the end.
+
+Usage:
+    python src/token_report.py ROOT [ROOT ...] [--json report.json]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from batch_processor import find_episode_folders, TRANSCRIPT_FILE
+from post_transcription_processor import read_transcript
+from prompts.registry.essential.show_notes.projection import projection_report
+
+def build_report(folders):
+    """Projection report for each episode folder, keyed by folder path"""
+    return {
+        str(folder): projection_report(read_transcript(Path(folder) / TRANSCRIPT_FILE))
+        for folder in folders
+    }
+
+def format_saving(raw, compact):
+    saved = raw - compact
+    percent = (saved / raw * 100) if raw else 0
+    return f"{raw:>8} → {compact:>8} ({percent:4.1f}% saved)"
+
+def print_report(report):
+    totals = {}
+    for folder, stages in report.items():
+        print(f"\n{Path(folder).name}")
+        episode_raw = episode_compact = 0
+        for stage, counts in stages.items():
+            print(f"  {stage:<16} {format_saving(counts['raw'], counts['compact'])}"
+                  f"  calls {counts['calls_raw']} → {counts['calls_compact']}")
+            episode_raw += counts['raw']
+            episode_compact += counts['compact']
+            stage_totals = totals.setdefault(stage, {"raw": 0, "compact": 0})
+            stage_totals["raw"] += counts['raw']
+            stage_totals["compact"] += counts['compact']
+        print(f"  {'episode total':<16} {format_saving(episode_raw, episode_compact)}")
+
+    if totals:
+        print(f"\nAll {len(report)} episodes")
+        for stage, counts in totals.items():
+            print(f"  {stage:<16} {format_saving(counts['raw'], counts['compact'])}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Estimate prompt tokens saved by the compact transcript projection")
+    parser.add_argument("roots", nargs="+", help="Folders to search for episode folders")
+    parser.add_argument("--json", help="Also write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    report = build_report(find_episode_folders(args.roots))
+    print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding='utf-8')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,35 @@
+import json
 import os
 import subprocess
-from openai import OpenAI
-from dotenv import load_dotenv
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from artifact_writer import EpisodeArtifactWriter
+from keyword_engine import rename_keyword_episode
+from model_router import create_pipeline_client
+from multitrack import speaker_names, merge_tracks, speaker_summary, MULTITRACK_WORKERS, SPEAKERS_FILE
 from post_transcription_processor import run_after_transcription
+from profiling import profiler_for_episode, NULL_PROFILER
+from search_index import index_transcript, rename_indexed_episode
+from silence_trimmer import trim_silence, save_trim_report
+from throughput_model import default_throughput, media_duration
+from transcription_backends import Segment, Word, create_backend_router
+from word_timings import encode_word_timings, word_timings_enabled, WORD_TIMINGS_FILE
+from work_leases import LeaseLost
 
 class WhisperTranscriber:
-    MAX_FILE_SIZE = 25 * 1024 * 1024  # 25MB in bytes
-    def __init__(self):
-        load_dotenv()
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    def __init__(self, trim_silence=True, backends=None, word_timings=None):
+        """
+        Args:
+            trim_silence: Cut long silences before transcribing
+            backends: Optional BackendRouter; by default configured from PODCAST_TRANSCRIBE_BACKEND
+            word_timings: Request word-level timing and write the transcription.words
+                sidecar (word_timings.py); default from PODCAST_WORD_TIMINGS
+        """
+        self.trim_silence = trim_silence
+        self.word_timings = word_timings_enabled() if word_timings is None else word_timings
+        self._client = None
+        self.backends = backends or create_backend_router(lambda: self.client, duration=media_duration)
         self.base_dir = os.path.dirname(os.path.dirname(__file__))
         self.output_dir = os.path.join(self.base_dir, "output")
         self.temp_dir = os.path.join(self.base_dir, "temp")
@@ -18,14 +39,19 @@ class WhisperTranscriber:
             if not os.path.exists(directory):
                 os.makedirs(directory)
 
+    @property
+    def client(self):
+        """API client, created on first use so the monitors start watching without loading the SDK"""
+        if self._client is None:
+            self._client = create_pipeline_client()
+        return self._client
+
     def compress_audio(self, input_file, max_size_mb=25):
         """Compress audio file to meet size requirements"""
         # Change the output extension to .mp3
         base_name = os.path.splitext(os.path.basename(input_file))[0]
-        output_file = os.path.join(
-            self.temp_dir,
-            f"compressed_{base_name}.mp3"
-        )
+        handle, output_file = tempfile.mkstemp(prefix=f"compressed_{base_name}_", suffix=".mp3", dir=self.temp_dir)
+        os.close(handle)
         
         try:
             print("Compressing audio file...")
@@ -75,74 +101,193 @@ class WhisperTranscriber:
         seconds = int(seconds % 60)
         return f"{minutes:02d}:{seconds:02d}"
 
-    def transcribe(self, audio_file_path, output_folder=None):
+    def _transcribe_track(self, audio_file_path, backend, temp_files, profiler=NULL_PROFILER, record_throughput=True):
+        """
+        Trim, compress if needed and transcribe one recording
+        record_throughput: Add the encode and transcription rates to the ETA history
+            (off for participant tracks, which share the machine and the backend)
+        Returns (TranscriptionResult with times on the original recording, TrimResult or None)
+        """
+        trim_result = None
+        encode_started = time.monotonic()
+        original_path = audio_file_path
+        encoded = self.trim_silence
+        # Cut long silences before upload; timestamps are mapped back afterwards
+        if self.trim_silence:
+            try:
+                with profiler.stage("trim_silence"):
+                    trim_result = trim_silence(audio_file_path, self.temp_dir)
+            except (subprocess.CalledProcessError, ValueError, OSError) as e:
+                # OSError: ffmpeg isn't installed; only files over the upload limit strictly need it
+                print(f"Warning: silence trimming failed, uploading untrimmed audio: {e}")
+            if trim_result:
+                audio_file_path = trim_result.output_file
+                temp_files.append(audio_file_path)
+                report = trim_result.report()
+                print(f"Trimmed {report['minutes_saved']:.1f} minutes of silence "
+                      f"({report['bytes_saved']/1024/1024:.2f}MB saved)")
+
+        # Check file size
+        file_size = os.path.getsize(audio_file_path)
+        
+        # If file is too large for the backend's upload limit, compress it
+        if backend.max_file_bytes and file_size > backend.max_file_bytes:
+            print(f"File size ({file_size/1024/1024:.2f}MB) exceeds limit. Compressing...")
+            with profiler.stage("compress"):
+                audio_file_path = self.compress_audio(audio_file_path, backend.max_file_bytes / (1024 * 1024))
+            temp_files.append(audio_file_path)
+            encoded = True
+            print(f"Compressed file created at: {audio_file_path}")
+        encode_seconds = time.monotonic() - encode_started
+        
+        with profiler.stage("transcribe"):
+            result = backend.transcribe(audio_file_path, words=self.word_timings)
+        print(f"{backend.name} backend ({result.model}) produced {len(result.segments)} segments "
+              f"in {result.seconds:.1f}s")
+
+        if record_throughput:
+            # Rates are per minute of the original recording, which is what estimates start from
+            seconds = trim_result.original_seconds if trim_result else media_duration(original_path)
+            if seconds:
+                throughput = default_throughput()
+                if encoded:
+                    throughput.record_audio("encode", seconds / 60, encode_seconds)
+                throughput.record_audio(f"transcribe:{backend.name}", seconds / 60, result.seconds)
+
+        if trim_result:
+            with profiler.stage("remap_srt"):
+                to_original = trim_result.offset_map.to_original
+                result.segments = [
+                    Segment(to_original(segment.start), to_original(segment.end), segment.text, segment.speaker,
+                            [Word(to_original(word.start), to_original(word.end), word.text)
+                             for word in segment.words] if segment.words is not None else None)
+                    for segment in result.segments
+                ]
+        return result, trim_result
+
+    def _transcribe_participants(self, tracks, backend, temp_files):
+        """
+        Transcribe participant tracks concurrently and merge them by time
+        Returns (speaker-labeled TranscriptionResult, speakers.json content)
+        """
+        names = speaker_names(tracks)
+        print(f"Transcribing {len(tracks)} participant tracks: {', '.join(names.values())}")
+        with ThreadPoolExecutor(max_workers=min(len(tracks), MULTITRACK_WORKERS)) as executor:
+            futures = {
+                names[track]: executor.submit(self._transcribe_track, str(track), backend, temp_files,
+                                              record_throughput=False)
+                for track in tracks
+            }
+            # Any failed track fails the whole set, so the caller can fall back to the mixed track
+            results = {speaker: future.result()[0] for speaker, future in futures.items()}
+        merged = merge_tracks(results)
+        summary = speaker_summary(merged, {names[track]: track for track in tracks})
+        print(f"Merged {len(merged.segments)} cues from {len(results)} speakers; guest: {summary['guest']}")
+        return merged, summary
+
+    def transcribe(self, audio_file_path, output_folder=None, folder_manager=None, priority="normal",
+                   participant_tracks=None, lease_lost=None):
         """
-        Transcribe the given audio file using OpenAI's Whisper API with timestamps
+        Transcribe the given audio file with timestamps, on the backend chosen for it
+
+        The transcript and everything derived from it are staged first and
+        committed to the episode folder together, followed by the folder rename.
         
         Args:
             audio_file_path: Path to the audio file
             output_folder: Optional custom output folder path. If None, uses default output directory
+            folder_manager: Optional PodcastFolderManager that renames the folder once committed
+            priority: "high" routes to the lowest-latency backend when routing is automatic
+            participant_tracks: Optional per-speaker tracks of the same meeting; they are
+                transcribed instead of audio_file_path (the mixed track, used if they fail)
+                and merged into a speaker-labeled transcript
+            lease_lost: Optional threading.Event (LeaseHeartbeat.lost); once it is set the
+                work stops with LeaseLost before the analysis and before the commit
+        Returns the path of the committed transcription.md
         """
         print(f"Starting transcription of {audio_file_path}")
+        source_path = audio_file_path
+        temp_files = []
+        trim_result = None
+        speakers = None
+        profiler = profiler_for_episode()
+        backend = self.backends.choose(audio_file_path, priority)
+        print(f"Transcription backend: {backend.name}")
+        writer = None
         
         try:
-            # Check file size
-            file_size = os.path.getsize(audio_file_path)
-            
-            # If file is too large, compress it
-            if file_size > self.MAX_FILE_SIZE:
-                print(f"File size ({file_size/1024/1024:.2f}MB) exceeds limit. Compressing...")
-                audio_file_path = self.compress_audio(audio_file_path)
-                print(f"Compressed file created at: {audio_file_path}")
-            
-            with open(audio_file_path, "rb") as audio_file:
-                # Using srt format to get timestamps
-                transcript = self.client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    response_format="srt"
-                )
+            if participant_tracks:
+                try:
+                    with profiler.stage("transcribe_tracks"):
+                        result, speakers = self._transcribe_participants(participant_tracks, backend, temp_files)
+                except Exception as e:
+                    print(f"Warning: multi-track transcription failed ({e}); transcribing the mixed track")
+            if speakers is None:
+                result, trim_result = self._transcribe_track(audio_file_path, backend, temp_files, profiler)
+            transcript = result.to_srt()
 
             # Determine output location
             if output_folder:
                 folder_path = output_folder
             else:
-                # Use default output location
-                original_name = os.path.splitext(os.path.basename(audio_file_path))[0]
-                if original_name.startswith('compressed_'):
-                    original_name = original_name[len('compressed_'):]
+                # Use default output location, named after the original recording
+                original_name = os.path.splitext(os.path.basename(source_path))[0]
                 folder_path = os.path.join(self.output_dir, original_name)
             
-            # Ensure output folder exists
-            if not os.path.exists(folder_path):
-                os.makedirs(folder_path)
+            # Stage every artifact; nothing lands in the folder until commit
+            writer = EpisodeArtifactWriter(folder_path, staging_root=self.temp_dir)
 
-            # Create markdown file path inside the folder
-            output_file = os.path.join(folder_path, "transcription.md")
+            if trim_result:
+                save_trim_report(folder_path, trim_result, writer)
+            if speakers:
+                writer.write(SPEAKERS_FILE, json.dumps(speakers, indent=2))
 
-            # Write the transcript with timestamps
-            with open(output_file, "w", encoding="utf-8") as f:
-                f.write("# Transcription with Timestamps\n\n")
-                # SRT format is returned as a string, we'll write it directly
-                f.write(transcript)
-
-            print(f"Transcription completed and saved to {output_file}")
+            # Stage the transcript with timestamps (SRT format is returned as a string)
+            transcript_file = "# Transcription with Timestamps\n\n" + transcript
+            writer.write("transcription.md", transcript_file)
+            if self.word_timings:
+                writer.write_bytes(WORD_TIMINGS_FILE, encode_word_timings(result.segments, transcript_file))
+            print(f"Transcription completed for {os.path.basename(folder_path)}")
             
+            self._check_lease(lease_lost, folder_path)
             # Add guest detection
             try:
                 print("Detecting guest information...")
-                guest_name = run_after_transcription(output_file)
+                guest_name = run_after_transcription(writer.path("transcription.md"), self.client,
+                                                     writer=writer, streaming=True, profiler=profiler)
                 if guest_name:
                     print(f"Guest detected: {guest_name}")
                 else:
                     print("Could not detect guest information")
             except Exception as e:
                 print(f"Error detecting guest information: {e}")
+
+            self._check_lease(lease_lost, folder_path)
+            with profiler.stage("commit"):
+                final_folder = writer.commit(rename=folder_manager.rename_folder if folder_manager else None)
+            output_file = os.path.join(final_folder, "transcription.md")
+            print(f"Transcription saved to {output_file}")
+            if os.path.abspath(final_folder) != os.path.abspath(folder_path):
+                try:
+                    rename_keyword_episode(folder_path, final_folder)
+                except Exception as e:
+                    print(f"Error updating keyword corpus: {e}")
+                try:
+                    rename_indexed_episode(folder_path, final_folder)
+                except Exception as e:
+                    print(f"Error updating search index: {e}")
+
+            # Keep the transcript search index current
+            try:
+                with profiler.stage("index"):
+                    index_transcript(output_file)
+            except Exception as e:
+                print(f"Error updating search index: {e}")
+            if profiler.enabled:
+                profiler.write(final_folder)
             
-            # Clean up temporary compressed file if it exists
-            if audio_file_path.startswith(self.temp_dir):
-                os.remove(audio_file_path)
-                print("Cleaned up temporary compressed file")
+            # Clean up temporary trimmed/compressed files
+            self._remove_temp_files(temp_files)
             
             return output_file
 
@@ -150,14 +295,29 @@ class WhisperTranscriber:
             print(f"FFmpeg error during compression:")
             print(f"Command output: {e.output}")
             print(f"Error output: {e.stderr}")
+            self._remove_temp_files(temp_files)
+            if writer:
+                writer.abort()
             raise
         except Exception as e:
             print(f"Error during transcription: {str(e)}")
-            # Clean up any temporary files if they exist
-            if 'audio_file_path' in locals() and audio_file_path.startswith(self.temp_dir):
-                try:
-                    os.remove(audio_file_path)
-                    print("Cleaned up temporary compressed file")
-                except:
-                    pass
-            raise
\ No newline at end of file
+            # Clean up any temporary files and staged artifacts if they exist
+            self._remove_temp_files(temp_files)
+            if writer:
+                writer.abort()
+            raise
+
+    @staticmethod
+    def _check_lease(lease_lost, folder_path):
+        """Stop before the next billed stage once another worker has taken the recording over"""
+        if lease_lost is not None and lease_lost.is_set():
+            raise LeaseLost(f"lease on {os.path.basename(folder_path)} was lost")
+
+    def _remove_temp_files(self, temp_files):
+        """Remove intermediate audio files created in the temp directory"""
+        for temp_file in temp_files:
+            try:
+                os.remove(temp_file)
+                print(f"Cleaned up temporary file {os.path.basename(temp_file)}")
+            except OSError:
+                pass
\ No newline at end of file
@@ -0,0 +1,167 @@
+"""
+Re-analyze episodes whose transcript was edited by hand.
+
+A transcript counts as edited when it no longer matches the fingerprint saved
+with its last analysis (`.analysis_cache.json`). The cues are diffed against
+the recorded ones to report what changed, and the analysis is run again with
+its recorded responses reused (see analysis_cache.py): only the chunk
+insights, interval summaries and reduces whose input changed are requested
+again, then episode_info.md and show_notes.md are recomposed.
+
+The dropbox monitor does this for the tree it watches; this script does it on
+its own, for output folders or a one-off sweep.
+
+Usage:
+    python src/transcript_watcher.py ROOT [ROOT ...]          # watch for edits
+    python src/transcript_watcher.py ROOT [ROOT ...] --once   # re-analyze edited episodes and exit
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers.polling import PollingObserver
+
+from analysis_cache import AnalysisCache, changed_cues, transcript_fingerprint
+from batch_processor import find_episode_folders, TRANSCRIPT_FILE
+from event_coalescer import CoalescingEventHandler
+from model_router import create_pipeline_client
+from post_transcription_processor import run_after_transcription, read_transcript
+from search_index import index_transcript
+
+EDIT_SETTLE_SECONDS = 10  # Editors save repeatedly; wait for quiet before re-analyzing
+
+def detect_edit(folder):
+    """
+    Compare the transcript with the one the last analysis was made from
+    Returns (transcript sha, changed cue indexes, removed cue count), or None when
+    the transcript is unchanged or the episode has no analysis record
+    """
+    transcript_path = Path(folder) / TRANSCRIPT_FILE
+    if not transcript_path.exists():
+        return None
+    cache = AnalysisCache.load(folder)
+    if cache.transcript_sha is None:
+        return None
+    transcript_sha, cues = transcript_fingerprint(read_transcript(transcript_path))
+    if transcript_sha == cache.transcript_sha:
+        return None
+    changed, removed = changed_cues(cache.cues, cues)
+    return transcript_sha, changed, removed
+
+def describe_edit(changed, removed):
+    if not changed and not removed:
+        return "formatting only"
+    parts = []
+    if changed:
+        parts.append(f"{len(changed)} cue(s) edited or added (first at cue {changed[0] + 1})")
+    if removed:
+        parts.append(f"{removed} removed")
+    return ", ".join(parts)
+
+def reanalyze_episode(folder, client=None):
+    """Re-run the analysis of an edited episode, reusing every response whose request is unchanged"""
+    transcript_path = str(Path(folder) / TRANSCRIPT_FILE)
+    # Same mode as the recorded analysis, so its requests are the ones in the record
+    streaming = AnalysisCache.load(folder).streaming
+    run_after_transcription(transcript_path, client, streaming=streaming, reuse_analysis=True)
+    try:
+        index_transcript(transcript_path)
+    except Exception as e:
+        print(f"Error updating search index: {e}")
+
+class TranscriptEditHandler(FileSystemEventHandler):
+    """
+    Re-analyzes episodes when their transcription.md changes
+    Args:
+        base_path: Watched root; lease keys are relative to it
+        lease_store: Optional lease store, so only one of several workers re-analyzes an edit
+    """
+    def __init__(self, base_path=None, lease_store=None):
+        self.base_path = Path(base_path) if base_path else None
+        self.lease_store = lease_store
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = create_pipeline_client()
+        return self._client
+
+    def on_modified(self, event):
+        if not event.is_directory and Path(event.src_path).name == TRANSCRIPT_FILE:
+            self.transcript_changed(Path(event.src_path).parent)
+
+    on_created = on_modified
+
+    def on_moved(self, event):
+        # Editors that save atomically rename a temp file over the transcript
+        if not event.is_directory and Path(event.dest_path).name == TRANSCRIPT_FILE:
+            self.transcript_changed(Path(event.dest_path).parent)
+
+    def _lease_key(self, folder, transcript_sha):
+        path = Path(folder) / TRANSCRIPT_FILE
+        if self.base_path:
+            try:
+                path = path.relative_to(self.base_path)
+            except ValueError:
+                pass
+        return f"edit:{path.as_posix()}:{transcript_sha[:16]}"
+
+    def transcript_changed(self, folder):
+        """Re-analyze the episode if its transcript differs from the analyzed one; True if it did"""
+        edit = detect_edit(folder)
+        if edit is None:
+            return False
+        transcript_sha, changed, removed = edit
+        lease = None
+        if self.lease_store:
+            lease = self.lease_store.claim(self._lease_key(folder, transcript_sha))
+            if lease is None:
+                return False
+        print(f"\n✏️ Transcript edited in {Path(folder).name}: {describe_edit(changed, removed)}")
+        try:
+            reanalyze_episode(folder, self.client)
+        finally:
+            if lease:
+                self.lease_store.complete(lease)
+        return True
+
+def sweep(roots):
+    """Re-analyze every edited episode under roots; returns how many were re-analyzed"""
+    handler = TranscriptEditHandler()
+    return sum(handler.transcript_changed(folder) for folder in find_episode_folders(roots))
+
+def watch(roots):
+    handler = TranscriptEditHandler()
+    coalescer = CoalescingEventHandler(handler, window=EDIT_SETTLE_SECONDS)
+    observer = PollingObserver()
+    for root in roots:
+        observer.schedule(coalescer, str(Path(root).resolve()), recursive=True)
+    observer.start()
+    print(f"Watching for transcript edits in: {', '.join(map(str, roots))}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        observer.stop()
+        coalescer.stop()
+    observer.join()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-analyze episodes after their transcript is edited")
+    parser.add_argument("roots", nargs="+", help="Folders to search for episode folders")
+    parser.add_argument("--once", action="store_true", help="Re-analyze edited episodes now and exit")
+    args = parser.parse_args(argv)
+
+    if args.once:
+        count = sweep(args.roots)
+        print(f"Re-analyzed {count} edited episode(s)")
+    else:
+        watch(args.roots)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,329 @@
+"""
+Pluggable transcription backends.
+
+Every backend turns an audio file into a list of Segments; the transcriber
+renders them as SRT, so the transcript format doesn't depend on where the
+audio was transcribed.
+
+- APIBackend: OpenAI whisper-1 (the original path), 25MB upload limit
+- LocalWhisperBackend: quantized Whisper on the CPU through faster-whisper
+  (optional dependency), with the recording split at silences and the
+  pieces transcribed across a process pool; no size limit, no per-minute cost
+- FakeBackend: canned segments, for tests and dry runs
+
+`transcribe(audio_path, words=True)` also returns word-level timing on each
+Segment (verbose_json from the API, word_timestamps locally), which the
+transcriber stores in the word timing sidecar (word_timings.py).
+
+BackendRouter picks the backend per episode from its length and priority.
+The default router is configured with PODCAST_TRANSCRIBE_BACKEND:
+"api" (default), "local", "fake", or "auto" to route by length/priority.
+"""
+
+import bisect
+import os
+import re
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+from api_client import stage_client
+from silence_trimmer import detect_silences, format_srt_time
+
+BACKEND_ENV = "PODCAST_TRANSCRIBE_BACKEND"
+
+API_MODEL = "whisper-1"
+API_MAX_FILE_BYTES = 25 * 1024 * 1024
+API_COST_PER_MINUTE = 0.006
+
+LOCAL_MODEL_SIZE = "small"
+LOCAL_COMPUTE_TYPE = "int8"          # Quantized weights; fastest on CPU
+LOCAL_CHUNK_SECONDS = 600            # Pieces handed to the process pool
+LOCAL_SAMPLE_RATE = 16000
+
+# Routing for "auto": urgent episodes go to the API, long ones to the local engine
+LOCAL_MIN_MINUTES = 30
+
+SRT_BLOCK = re.compile(
+    r'(\d{2}):(\d{2}):(\d{2}),(\d{3})\s*-->\s*(\d{2}):(\d{2}):(\d{2}),(\d{3})\s*\n(.*?)(?=\n\s*\n|\Z)',
+    re.DOTALL
+)
+
+@dataclass
+class Word:
+    start: float
+    end: float
+    text: str
+
+@dataclass
+class Segment:
+    start: float
+    end: float
+    text: str
+    speaker: Optional[str] = None   # Set on multi-track transcripts
+    words: Optional[List[Word]] = None   # Set when word timing was requested
+
+    @property
+    def label(self):
+        """Cue text, prefixed with the speaker when known"""
+        return f"{self.speaker}: {self.text.strip()}" if self.speaker else self.text.strip()
+
+@dataclass
+class TranscriptionResult:
+    segments: List[Segment]
+    backend: str
+    model: str
+    seconds: float = 0.0   # Wall time spent transcribing
+
+    def to_srt(self):
+        blocks = []
+        for index, segment in enumerate(self.segments, 1):
+            blocks.append(f"{index}\n{format_srt_time(segment.start)} --> {format_srt_time(segment.end)}\n"
+                          f"{segment.label}\n")
+        return "\n".join(blocks)
+
+def parse_srt(srt_text):
+    """SRT text -> Segments"""
+    segments = []
+    for match in SRT_BLOCK.finditer(srt_text):
+        values = list(map(int, match.groups()[:8]))
+        start = values[0] * 3600 + values[1] * 60 + values[2] + values[3] / 1000
+        end = values[4] * 3600 + values[5] * 60 + values[6] + values[7] / 1000
+        segments.append(Segment(start, end, match.group(9).strip()))
+    return segments
+
+def assign_words(segments, words):
+    """Attach each Word to the segment it starts in"""
+    starts = [segment.start for segment in segments]
+    for segment in segments:
+        segment.words = []
+    for word in words if segments else []:
+        segments[max(bisect.bisect_right(starts, word.start) - 1, 0)].words.append(word)
+    return segments
+
+def probe_duration(audio_path):
+    """Duration in seconds from ffprobe"""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+         '-of', 'default=noprint_wrappers=1:nokey=1', str(audio_path)],
+        check=True, capture_output=True, text=True
+    )
+    return float(result.stdout.strip())
+
+class TranscriptionBackend:
+    """Interface: `transcribe(audio_path, words=False)` returns a TranscriptionResult"""
+    name = "base"
+    max_file_bytes = None         # Upload limit; larger files are compressed first
+    cost_per_minute = 0.0
+
+    def transcribe(self, audio_path, words=False):
+        """words: Also fill Segment.words with word-level timing"""
+        raise NotImplementedError
+
+    def available(self):
+        return True
+
+class APIBackend(TranscriptionBackend):
+    name = "api"
+    max_file_bytes = API_MAX_FILE_BYTES
+    cost_per_minute = API_COST_PER_MINUTE
+
+    def __init__(self, client_factory, model=API_MODEL):
+        """client_factory: returns the (routing) client, so it is only created when first needed"""
+        self.client_factory = client_factory
+        self.model = model
+
+    def transcribe(self, audio_path, words=False):
+        started = time.monotonic()
+        client = stage_client(self.client_factory(), "transcribe")
+        with open(audio_path, "rb") as audio_file:
+            if not words:
+                srt_text = client.audio.transcriptions.create(
+                    model=self.model,
+                    file=audio_file,
+                    response_format="srt"
+                )
+                return TranscriptionResult(parse_srt(srt_text), self.name, self.model, time.monotonic() - started)
+            response = client.audio.transcriptions.create(
+                model=self.model,
+                file=audio_file,
+                response_format="verbose_json",
+                timestamp_granularities=["word", "segment"]
+            )
+        data = response.model_dump() if hasattr(response, "model_dump") else response
+        segments = [Segment(item["start"], item["end"], item["text"].strip()) for item in data.get("segments") or []]
+        assign_words(segments, [Word(item["start"], item["end"], item["word"].strip())
+                                for item in data.get("words") or []])
+        return TranscriptionResult(segments, self.name, self.model, time.monotonic() - started)
+
+# Per-process model for the local backend's pool; loaded once by the initializer
+_local_model = None
+
+def _load_local_model(model_size, compute_type, cpu_threads):
+    global _local_model
+    from faster_whisper import WhisperModel
+    _local_model = WhisperModel(model_size, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+
+def _transcribe_piece(piece_path, offset, words=False):
+    segments, _ = _local_model.transcribe(piece_path, beam_size=1, vad_filter=True, word_timestamps=words)
+    return [
+        Segment(offset + segment.start, offset + segment.end, segment.text,
+                words=[Word(offset + word.start, offset + word.end, word.word.strip())
+                       for word in segment.words] if words else None)
+        for segment in segments
+    ]
+
+def split_points(audio_path, duration, chunk_seconds=LOCAL_CHUNK_SECONDS):
+    """Cut points near every chunk_seconds, moved into the nearest silence so no word is split"""
+    if duration <= chunk_seconds:
+        return []
+    try:
+        silences, _ = detect_silences(str(audio_path), min_silence=0.5)
+    except (subprocess.CalledProcessError, ValueError):
+        silences = []
+    middles = [(start + end) / 2 for start, end in silences]
+    points = []
+    target = chunk_seconds
+    while target < duration - chunk_seconds / 4:
+        nearby = [point for point in middles if abs(point - target) <= chunk_seconds / 4]
+        points.append(min(nearby, key=lambda point: abs(point - target)) if nearby else target)
+        target = points[-1] + chunk_seconds
+    return points
+
+class LocalWhisperBackend(TranscriptionBackend):
+    """
+    CPU transcription with faster-whisper (CTranslate2, int8 weights)
+    The recording is split into pieces at silences, and the pieces are
+    transcribed in parallel worker processes that each load the model once.
+    """
+    name = "local"
+
+    def __init__(self, model_size=LOCAL_MODEL_SIZE, compute_type=LOCAL_COMPUTE_TYPE, workers=None,
+                 chunk_seconds=LOCAL_CHUNK_SECONDS):
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.workers = workers or max((os.cpu_count() or 2) // 2, 1)
+        self.chunk_seconds = chunk_seconds
+        self._pool = None
+
+    def available(self):
+        try:
+            import faster_whisper  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def _executor(self):
+        if self._pool is None:
+            if not self.available():
+                raise RuntimeError("The local backend needs faster-whisper: pip install faster-whisper")
+            threads = max((os.cpu_count() or 2) // self.workers, 1)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_load_local_model,
+                initargs=(self.model_size, self.compute_type, threads)
+            )
+        return self._pool
+
+    def _extract(self, audio_path, start, end, output_path):
+        command = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-ss', f"{start:.3f}", '-i', str(audio_path)]
+        if end is not None:
+            command += ['-t', f"{end - start:.3f}"]
+        command += ['-ac', '1', '-ar', str(LOCAL_SAMPLE_RATE), '-y', str(output_path)]
+        subprocess.run(command, check=True, capture_output=True)
+
+    def transcribe(self, audio_path, words=False):
+        started = time.monotonic()
+        executor = self._executor()
+        duration = probe_duration(audio_path)
+        bounds = [0.0] + split_points(audio_path, duration, self.chunk_seconds) + [None]
+        with tempfile.TemporaryDirectory(prefix="local_whisper_") as temp_dir:
+            futures = []
+            for index, (start, end) in enumerate(zip(bounds, bounds[1:])):
+                piece_path = os.path.join(temp_dir, f"piece_{index:03d}.wav")
+                self._extract(audio_path, start, end, piece_path)
+                futures.append(executor.submit(_transcribe_piece, piece_path, start, words))
+            segments = [segment for future in futures for segment in future.result()]
+        model = f"{self.model_size}-{self.compute_type}"
+        return TranscriptionResult(segments, self.name, model, time.monotonic() - started)
+
+    def close(self):
+        if self._pool:
+            self._pool.shutdown()
+            self._pool = None
+
+class FakeBackend(TranscriptionBackend):
+    """Canned transcript: `lines` repeated in segment_seconds steps over `duration` seconds"""
+    name = "fake"
+
+    def __init__(self, lines=None, duration=None, segment_seconds=5.0, delay=0.0):
+        self.lines = lines or ["This is a fake transcript line."]
+        self.duration = duration
+        self.segment_seconds = segment_seconds
+        self.delay = delay
+
+    def transcribe(self, audio_path, words=False):
+        started = time.monotonic()
+        duration = self.duration if self.duration is not None else len(self.lines) * self.segment_seconds
+        count = max(int(duration // self.segment_seconds), 1)
+        segments = [
+            Segment(i * self.segment_seconds, min((i + 1) * self.segment_seconds, duration),
+                    self.lines[i % len(self.lines)])
+            for i in range(count)
+        ]
+        if words:
+            # Spread each line's words evenly over its segment
+            for segment in segments:
+                texts = segment.text.split()
+                step = (segment.end - segment.start) / max(len(texts), 1)
+                segment.words = [Word(segment.start + i * step, segment.start + (i + 1) * step, text)
+                                 for i, text in enumerate(texts)]
+        time.sleep(self.delay)
+        return TranscriptionResult(segments, self.name, "fake", time.monotonic() - started)
+
+class BackendRouter:
+    """
+    Chooses a backend per episode
+    mode "auto": priority "high" goes to the API (lowest latency), recordings of
+    at least local_min_minutes to the local engine when it is installed, the
+    rest to the API. Any other mode names the backend to always use.
+    """
+    def __init__(self, backends, mode="api", local_min_minutes=LOCAL_MIN_MINUTES, duration=None):
+        """duration: Optional function returning a recording's seconds (or None); default ffprobe"""
+        self.backends = backends
+        self.mode = mode
+        self.local_min_minutes = local_min_minutes
+        self.duration = duration or probe_duration
+
+    def choose(self, audio_path, priority="normal"):
+        if self.mode != "auto":
+            return self.backends[self.mode]
+        local = self.backends.get("local")
+        if priority == "high" or local is None or not local.available():
+            return self.backends["api"]
+        try:
+            seconds = self.duration(audio_path)
+        except (subprocess.CalledProcessError, ValueError, OSError):
+            return self.backends["api"]
+        if seconds is None:
+            return self.backends["api"]
+        minutes = seconds / 60
+        return local if minutes >= self.local_min_minutes else self.backends["api"]
+
+def create_backend_router(client_factory, mode=None, duration=None):
+    """
+    The router for PODCAST_TRANSCRIBE_BACKEND (or `mode`), with every backend registered
+    duration: Optional function returning a recording's seconds, e.g. a cached probe
+    """
+    mode = mode or os.getenv(BACKEND_ENV, "api")
+    backends = {
+        "api": APIBackend(client_factory),
+        "local": LocalWhisperBackend(),
+        "fake": FakeBackend(),
+    }
+    if mode != "auto" and mode not in backends:
+        raise ValueError(f"Unknown transcription backend {mode!r}; choose from auto, {', '.join(backends)}")
+    return BackendRouter(backends, mode, duration=duration)
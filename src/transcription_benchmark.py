@@ -0,0 +1,97 @@
+"""
+Compare transcription backends on the same recordings.
+
+Each selected backend transcribes every file (optionally several at once)
+and the harness reports wall time, the speed relative to real time, aggregate
+throughput in audio minutes per wall-clock minute, and cost. Nothing is
+written to episode folders.
+
+Usage:
+    python src/transcription_benchmark.py AUDIO [AUDIO ...] --backends api local [--parallel 2] [--json report.json]
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from model_router import create_pipeline_client
+from transcription_backends import create_backend_router, probe_duration
+
+def run_file(backend, audio_path, minutes):
+    if backend.max_file_bytes and Path(audio_path).stat().st_size > backend.max_file_bytes:
+        return {"file": str(audio_path), "skipped": "over the upload limit; compress first"}
+    try:
+        result = backend.transcribe(audio_path)
+    except Exception as e:
+        return {"file": str(audio_path), "error": str(e)}
+    return {
+        "file": str(audio_path),
+        "audio_minutes": round(minutes, 2),
+        "seconds": round(result.seconds, 1),
+        "realtime_factor": round(minutes * 60 / result.seconds, 1) if result.seconds else None,
+        "segments": len(result.segments),
+        "cost": round(minutes * backend.cost_per_minute, 4)
+    }
+
+def benchmark_backend(backend, files, durations, parallel=1):
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        runs = list(executor.map(lambda path: run_file(backend, path, durations[path] / 60), files))
+    wall_minutes = (time.monotonic() - started) / 60
+    done = [run for run in runs if "seconds" in run]
+    audio_minutes = sum(run["audio_minutes"] for run in done)
+    return {
+        "files": runs,
+        "audio_minutes": round(audio_minutes, 2),
+        "wall_minutes": round(wall_minutes, 2),
+        "throughput": round(audio_minutes / wall_minutes, 1) if wall_minutes else None,
+        "cost": round(sum(run["cost"] for run in done), 4)
+    }
+
+def print_report(report):
+    print(f"{'Backend':<8} {'audio min':>10} {'wall min':>9} {'audio min/wall min':>19} {'cost':>8}")
+    for name, result in report.items():
+        if "unavailable" in result:
+            print(f"{name:<8} unavailable: {result['unavailable']}")
+            continue
+        throughput = f"{result['throughput']:.1f}" if result['throughput'] is not None else "-"
+        print(f"{name:<8} {result['audio_minutes']:>10.1f} {result['wall_minutes']:>9.2f} "
+              f"{throughput:>19} ${result['cost']:>7.2f}")
+        for run in result["files"]:
+            if "seconds" not in run:
+                print(f"    {Path(run['file']).name}: {run.get('skipped') or run.get('error')}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare transcription backend throughput")
+    parser.add_argument("files", nargs="+", help="Audio files to transcribe")
+    parser.add_argument("--backends", nargs="+", default=["api", "local"], choices=["api", "local", "fake"])
+    parser.add_argument("--parallel", type=int, default=1, help="Files transcribed at once per backend")
+    parser.add_argument("--json", help="Also write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    durations = {path: probe_duration(path) for path in args.files}
+    client = None
+    def client_factory():
+        nonlocal client
+        client = client or create_pipeline_client()
+        return client
+    router = create_backend_router(client_factory, "api")
+
+    report = {}
+    for name in args.backends:
+        backend = router.backends[name]
+        if not backend.available():
+            report[name] = {"unavailable": "not installed"}
+            continue
+        print(f"Benchmarking {name}...")
+        report[name] = benchmark_backend(backend, args.files, durations, args.parallel)
+    print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding='utf-8')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
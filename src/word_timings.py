@@ -0,0 +1,248 @@
+"""
+Word-level timing sidecar for transcripts.
+
+With PODCAST_WORD_TIMINGS=1 the transcriber asks the backend for word timing
+and writes `transcription.words` next to transcription.md. It is one binary
+file that is opened with mmap, so a lookup only touches the pages it needs:
+
+    header               magic, word count, segment count, text bytes and the
+                         sha1 of the transcription.md it was written with
+    word_start_ms        uint32, start of each word
+    word_end_ms          uint32, end of each word
+    word_text_offsets    uint32, start of each word in the text (n_words + 1)
+    segment_start_ms     uint32, start of each transcript cue
+    segment_end_ms       uint32, end of each cue
+    segment_words        uint32, first word of each cue (n_segments + 1)
+    text                 utf-8 words separated by spaces
+
+All integers are little-endian. Time -> text is a binary search on the start
+times; text -> time finds the phrase in the text and binary-searches the
+offsets. A transcript edited by hand no longer matches the recorded sha1, and
+`load_word_timings` ignores the stale sidecar.
+
+Cues a backend returned without word timing get their words spread evenly
+over the cue.
+
+Usage:
+    python src/word_timings.py EPISODE_FOLDER --at 00:42:10        # words around a time
+    python src/word_timings.py EPISODE_FOLDER --find "knowledge graph"
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import struct
+import sys
+from pathlib import Path
+
+import numpy as np
+
+WORD_TIMINGS_ENV = "PODCAST_WORD_TIMINGS"
+WORD_TIMINGS_FILE = "transcription.words"
+TRANSCRIPT_FILE = "transcription.md"
+
+MAGIC = b"PODWORD1"
+HEADER = struct.Struct("<8s3I20s")   # magic, words, segments, text bytes, transcript sha1
+CONTEXT_WORDS = 12                   # Words shown on each side by the CLI
+
+def word_timings_enabled():
+    return os.getenv(WORD_TIMINGS_ENV, "").lower() in ("1", "true", "yes")
+
+def transcript_digest(transcript_text):
+    return hashlib.sha1(transcript_text.encode('utf-8')).digest()
+
+def _segment_words(segment):
+    """Words of a segment, spread evenly over it when the backend gave no word timing"""
+    if segment.words:
+        return [(word.start, word.end, word.text) for word in segment.words if word.text]
+    texts = segment.text.split()
+    step = (segment.end - segment.start) / max(len(texts), 1)
+    return [(segment.start + i * step, segment.start + (i + 1) * step, text) for i, text in enumerate(texts)]
+
+def _ms(seconds):
+    return max(int(round(seconds * 1000)), 0)
+
+def _key(value):
+    """Search key of the arrays' own type; a Python int would make numpy cast the whole array"""
+    return np.uint32(value)
+
+def encode_word_timings(segments, transcript_text):
+    """
+    Sidecar bytes for a transcript
+    Args:
+        segments: The transcript's Segments, in cue order
+        transcript_text: Content of the transcription.md the segments were rendered into
+    """
+    starts, ends, offsets = [], [], []
+    segment_words = [0]
+    text = bytearray()
+    for segment in segments:
+        for start, end, word in _segment_words(segment):
+            starts.append(_ms(start))
+            ends.append(_ms(end))
+            offsets.append(len(text))
+            text += word.encode('utf-8') + b" "
+        segment_words.append(len(starts))
+    offsets.append(len(text))
+
+    header = HEADER.pack(MAGIC, len(starts), len(segments), len(text), transcript_digest(transcript_text))
+    arrays = np.concatenate([
+        np.asarray(starts, dtype='<u4'), np.asarray(ends, dtype='<u4'), np.asarray(offsets, dtype='<u4'),
+        np.asarray([_ms(segment.start) for segment in segments], dtype='<u4'),
+        np.asarray([_ms(segment.end) for segment in segments], dtype='<u4'),
+        np.asarray(segment_words, dtype='<u4'),
+    ])
+    return header + arrays.tobytes() + bytes(text)
+
+def phrase_pattern(phrase):
+    """Case-insensitive pattern for the phrase's words with any punctuation between them"""
+    words = re.findall(r"[\w']+", phrase.lower())
+    if not words:
+        return None
+    body = rb"[^\w']+".join(re.escape(word.encode('utf-8')) for word in words)
+    return re.compile(rb"(?<![\w'])" + body + rb"(?![\w'])", re.IGNORECASE)
+
+class WordTimings:
+    """Read-only, memory-mapped view of a sidecar"""
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as sidecar:
+            magic, self.word_count, self.segment_count, text_bytes, self.digest = \
+                HEADER.unpack(sidecar.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a word timing file")
+        words, segments = self.word_count, self.segment_count
+        arrays = np.memmap(self.path, dtype='<u4', mode='r', offset=HEADER.size,
+                           shape=(3 * words + 1 + 3 * segments + 1,))
+        self.word_start_ms = arrays[:words]
+        self.word_end_ms = arrays[words:2 * words]
+        self.word_text_offsets = arrays[2 * words:3 * words + 1]
+        segment_arrays = arrays[3 * words + 1:]
+        self.segment_start_ms = segment_arrays[:segments]
+        self.segment_end_ms = segment_arrays[segments:2 * segments]
+        self.segment_words = segment_arrays[2 * segments:]
+        self.text = np.memmap(self.path, dtype=np.uint8, mode='r', offset=HEADER.size + arrays.nbytes,
+                              shape=(text_bytes,)) if text_bytes else np.zeros(0, dtype=np.uint8)
+
+    def __len__(self):
+        return self.word_count
+
+    def matches(self, transcript_text=None, sha1_hex=None):
+        """Whether the sidecar was written with this transcript (its text or sha1 hex digest)"""
+        if sha1_hex is not None:
+            return self.digest.hex() == sha1_hex
+        return self.digest == transcript_digest(transcript_text)
+
+    def word(self, index):
+        """(start seconds, end seconds, text) of a word"""
+        start, end = self.word_text_offsets[index], self.word_text_offsets[index + 1]
+        return (int(self.word_start_ms[index]) / 1000, int(self.word_end_ms[index]) / 1000,
+                bytes(self.text[start:end]).decode('utf-8').strip())
+
+    def word_at(self, seconds):
+        """Index of the word being spoken at (or last started before) a time; -1 before the first"""
+        return int(np.searchsorted(self.word_start_ms, _key(_ms(seconds)), side='right')) - 1
+
+    def segment_at(self, seconds):
+        """Index of the cue at (or last started before) a time; -1 before the first"""
+        return int(np.searchsorted(self.segment_start_ms, _key(_ms(seconds)), side='right')) - 1
+
+    def text_between(self, start_seconds, end_seconds):
+        """Words that start within [start, end)"""
+        first = int(np.searchsorted(self.word_start_ms, _key(_ms(start_seconds)), side='left'))
+        last = int(np.searchsorted(self.word_start_ms, _key(_ms(end_seconds)), side='left'))
+        if last <= first:
+            return ""
+        start, end = self.word_text_offsets[first], self.word_text_offsets[last]
+        return bytes(self.text[start:end]).decode('utf-8').strip()
+
+    def find(self, phrase, start_seconds=0.0, end_seconds=None, limit=None):
+        """
+        Where a phrase is spoken
+        Args:
+            start_seconds / end_seconds: Optional window the phrase has to start in
+            limit: Optional most matches to return
+        Returns a list of (start seconds, end seconds) of each match
+        """
+        pattern = phrase_pattern(phrase)
+        if pattern is None or not self.word_count:
+            return []
+        first = max(self.word_at(start_seconds), 0)
+        last = self.word_count if end_seconds is None else \
+            int(np.searchsorted(self.word_start_ms, _key(_ms(end_seconds)), side='left'))
+        matches = []
+        for match in pattern.finditer(self.text, int(self.word_text_offsets[first]),
+                                      int(self.word_text_offsets[max(last, first)])):
+            first_word = int(np.searchsorted(self.word_text_offsets, _key(match.start()), side='right')) - 1
+            last_word = int(np.searchsorted(self.word_text_offsets, _key(match.end() - 1), side='right')) - 1
+            if self.word_start_ms[first_word] < _ms(start_seconds):
+                continue
+            matches.append((int(self.word_start_ms[first_word]) / 1000, int(self.word_end_ms[last_word]) / 1000))
+            if limit and len(matches) >= limit:
+                break
+        return matches
+
+def load_word_timings(episode_folder, transcript_text=None, sha1_hex=None):
+    """
+    The episode's sidecar, or None if it has none or it is stale
+    Args:
+        transcript_text / sha1_hex: The current transcript (or its sha1 hex digest);
+            read from transcription.md when neither is given
+    """
+    path = Path(episode_folder) / WORD_TIMINGS_FILE
+    if not path.exists():
+        return None
+    try:
+        timings = WordTimings(path)
+    except (OSError, ValueError, struct.error):
+        return None
+    if sha1_hex is None and transcript_text is None:
+        try:
+            transcript_text = (Path(episode_folder) / TRANSCRIPT_FILE).read_text(encoding='utf-8')
+        except OSError:
+            return None
+    return timings if timings.matches(transcript_text, sha1_hex) else None
+
+def parse_time(value):
+    """HH:MM:SS, MM:SS or seconds -> seconds"""
+    seconds = 0.0
+    for part in value.replace(',', '.').split(':'):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+def format_time(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Look up words by time or times by phrase in an episode")
+    parser.add_argument("episode", help="Episode folder with transcription.md and transcription.words")
+    lookup = parser.add_mutually_exclusive_group(required=True)
+    lookup.add_argument("--at", help="Show the words spoken around this time (HH:MM:SS)")
+    lookup.add_argument("--find", help="List the times this phrase is spoken")
+    args = parser.parse_args(argv)
+
+    timings = load_word_timings(args.episode)
+    if timings is None:
+        print(f"No current word timing for {args.episode} (missing, or the transcript was edited since)")
+        return 1
+    if args.at:
+        index = max(timings.word_at(parse_time(args.at)), 0)
+        first, last = max(index - CONTEXT_WORDS, 0), min(index + CONTEXT_WORDS + 1, len(timings))
+        if first >= last:
+            print("No words")
+            return 0
+        words = [timings.word(i) for i in range(first, last)]
+        # The word being spoken at that time is marked
+        text = " ".join(f"*{word}*" if i == index else word for i, (_, _, word) in enumerate(words, first))
+        print(f"[{format_time(words[0][0])}] {text}")
+    else:
+        matches = timings.find(args.find)
+        for start, end in matches:
+            print(f"{format_time(start)}  {timings.text_between(max(start - 3, 0), end + 3)}")
+        print(f"\n{len(matches)} matches")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
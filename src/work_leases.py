@@ -0,0 +1,402 @@
+"""
+Lease-based work claiming for several workers sharing one episode tree.
+
+Before processing an episode, a worker claims a lease on it. A lease expires
+unless its holder renews it (a heartbeat thread does that while the work
+runs), so the episode of a crashed or hung worker is taken over by another
+worker once the lease lapses. Completed episodes are marked done and never
+claimed again, so each recording is transcribed and analysed once no matter
+how many machines are watching.
+
+Two stores:
+- FileLeaseStore keeps lease files in a directory on the shared filesystem.
+  Each claim creates the next generation file (`<key>.<generation>.lease`)
+  with O_CREAT|O_EXCL, so of several workers racing for an episode (or for the
+  takeover of an expired lease) exactly one succeeds. This needs a filesystem
+  with atomic exclusive create (local disks, NFSv3+, SMB). Sync services such
+  as Dropbox only reconcile files after the fact, so machines that merely sync
+  the tree should point the lease directory at a real shared mount or use a
+  SQLite store on one host.
+- SQLiteLeaseStore keeps the same records in a SQLite database, for workers
+  on one host (and as a queue stand-in in tests).
+
+Usage:
+    store = FileLeaseStore(".podcast_leases")
+    lease = store.claim("Guest 2024-03-01/audio.m4a")
+    if lease:
+        with LeaseHeartbeat(store, lease):
+            process()
+        store.complete(lease)
+
+    # Several local processes racing over the same episodes, some crashing
+    python src/work_leases.py simulate --workers 4 --episodes 30 --crash-rate 0.2
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import socket
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+
+LEASE_SECONDS = 120          # A lease lapses this long after its last renewal
+CLOCK_SKEW_SECONDS = 10      # Extra wait before taking over a lease held on another machine
+LEASE_DIR_NAME = ".podcast_leases"
+LEASE_DIR_ENV = "PODCAST_LEASE_DIR"   # Turns on lease claiming in the monitors
+
+def worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+class LeaseLost(Exception):
+    """Raised by work that stops because another worker took over its lease"""
+
+@dataclass
+class Lease:
+    key: str
+    worker: str
+    token: str
+    generation: int
+    expires: float
+
+class FileLeaseStore:
+    """Leases as files in a directory on a shared filesystem"""
+    def __init__(self, directory, lease_seconds=LEASE_SECONDS, worker=None, clock_skew=CLOCK_SKEW_SECONDS):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.worker = worker or worker_id()
+        self.clock_skew = clock_skew
+
+    def _stem(self, key):
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+
+    def _done_path(self, key):
+        return self.directory / f"{self._stem(key)}.done"
+
+    def _generations(self, key):
+        """Existing lease generations for the key, newest first"""
+        stem = self._stem(key)
+        generations = []
+        for path in self.directory.glob(f"{stem}.*.lease"):
+            try:
+                generations.append(int(path.name.split(".")[1]))
+            except ValueError:
+                continue
+        return sorted(generations, reverse=True)
+
+    def _lease_path(self, key, generation):
+        return self.directory / f"{self._stem(key)}.{generation}.lease"
+
+    def _read(self, path):
+        try:
+            record = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        return Lease(**record)
+
+    def _write(self, path, lease):
+        # Rewrite in place via rename so readers never see a partial record
+        temp_path = path.with_name(f"{path.name}.{lease.token}.tmp")
+        temp_path.write_text(json.dumps(lease.__dict__), encoding='utf-8')
+        os.replace(temp_path, path)
+
+    def is_done(self, key):
+        return self._done_path(key).exists()
+
+    def claim(self, key):
+        """Claim the key; returns a Lease, or None if it is done or someone else holds it"""
+        if self.is_done(key):
+            return None
+        generations = self._generations(key)
+        if generations:
+            current = self._read(self._lease_path(key, generations[0]))
+            if current is None:
+                # Being written right now (or unreadable); let its writer have it
+                return None
+            skew = 0 if current.worker == self.worker else self.clock_skew
+            if time.time() < current.expires + skew:
+                return None
+            print(f"Lease on {key} held by {current.worker} expired; taking over")
+        generation = generations[0] + 1 if generations else 1
+
+        lease = Lease(key, self.worker, uuid.uuid4().hex, generation, time.time() + self.lease_seconds)
+        path = self._lease_path(key, generation)
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return None  # Another worker claimed this generation first
+        with os.fdopen(fd, "w", encoding='utf-8') as f:
+            f.write(json.dumps(lease.__dict__))
+        # Done may have been marked between the check and the claim
+        if self.is_done(key):
+            path.unlink(missing_ok=True)
+            return None
+        for old in generations:
+            self._lease_path(key, old).unlink(missing_ok=True)
+        return lease
+
+    def holds(self, lease):
+        """Whether the lease is still the newest generation and carries our token"""
+        if self._generations(lease.key)[:1] != [lease.generation]:
+            return False
+        current = self._read(self._lease_path(lease.key, lease.generation))
+        return current is not None and current.token == lease.token
+
+    def renew(self, lease):
+        """Extend the lease; False if it was lost (taken over after lapsing)"""
+        if not self.holds(lease):
+            return False
+        lease.expires = time.time() + self.lease_seconds
+        self._write(self._lease_path(lease.key, lease.generation), lease)
+        return True
+
+    def mark_done(self, key):
+        """Record the key as done without a lease (e.g. the new path of a renamed episode)"""
+        self._done_path(key).write_text(
+            json.dumps({"key": key, "worker": self.worker, "completed": time.time()}),
+            encoding='utf-8'
+        )
+
+    def complete(self, lease):
+        """Mark the key done and drop the lease"""
+        self.mark_done(lease.key)
+        self.release(lease)
+
+    def release(self, lease):
+        """Give the lease up without completing, so another worker can claim the key right away"""
+        if self.holds(lease):
+            self._lease_path(lease.key, lease.generation).unlink(missing_ok=True)
+
+class SQLiteLeaseStore:
+    """The same leases in a SQLite database, for workers on one host"""
+    def __init__(self, path, lease_seconds=LEASE_SECONDS, worker=None):
+        self.path = str(path)
+        self.lease_seconds = lease_seconds
+        self.worker = worker or worker_id()
+        self._execute("""
+            CREATE TABLE IF NOT EXISTS leases (
+                key TEXT PRIMARY KEY,
+                worker TEXT,
+                token TEXT,
+                generation INTEGER,
+                expires REAL,
+                done INTEGER DEFAULT 0
+            )
+        """)
+
+    def _connect(self):
+        # isolation_level=None: transactions are opened explicitly with BEGIN IMMEDIATE
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _execute(self, sql, params=()):
+        """Run one statement; returns (rowcount, first row)"""
+        with closing(self._connect()) as connection:
+            cursor = connection.execute(sql, params)
+            return cursor.rowcount, cursor.fetchone()
+
+    def is_done(self, key):
+        _, row = self._execute("SELECT done FROM leases WHERE key = ?", (key,))
+        return bool(row and row[0])
+
+    def claim(self, key):
+        lease = Lease(key, self.worker, uuid.uuid4().hex, 1, time.time() + self.lease_seconds)
+        with closing(self._connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(
+                "SELECT worker, generation, expires, done, token FROM leases WHERE key = ?", (key,)
+            ).fetchone()
+            if row:
+                holder, generation, expires, done, token = row
+                if done or (token and time.time() < expires):
+                    connection.execute("ROLLBACK")
+                    return None
+                if token:
+                    print(f"Lease on {key} held by {holder} expired; taking over")
+                lease.generation = generation + 1
+            connection.execute(
+                "INSERT OR REPLACE INTO leases (key, worker, token, generation, expires, done) VALUES (?, ?, ?, ?, ?, 0)",
+                (key, lease.worker, lease.token, lease.generation, lease.expires)
+            )
+            connection.execute("COMMIT")
+        return lease
+
+    def holds(self, lease):
+        _, row = self._execute("SELECT token FROM leases WHERE key = ?", (lease.key,))
+        return bool(row and row[0] == lease.token)
+
+    def renew(self, lease):
+        expires = time.time() + self.lease_seconds
+        updated, _ = self._execute("UPDATE leases SET expires = ? WHERE key = ? AND token = ? AND done = 0",
+                                   (expires, lease.key, lease.token))
+        if not updated:
+            return False
+        lease.expires = expires
+        return True
+
+    def mark_done(self, key):
+        self._execute("INSERT OR REPLACE INTO leases (key, worker, generation, expires, done) VALUES (?, ?, 0, 0, 1)",
+                      (key, self.worker))
+
+    def complete(self, lease):
+        self._execute("UPDATE leases SET done = 1, token = NULL WHERE key = ? AND token = ?",
+                      (lease.key, lease.token))
+
+    def release(self, lease):
+        self._execute("UPDATE leases SET token = NULL, expires = 0 WHERE key = ? AND token = ?",
+                      (lease.key, lease.token))
+
+class LeaseHeartbeat:
+    """
+    Renews a lease in the background while the enclosed work runs
+    If a renewal finds the lease lost, `lost` is set and a warning printed;
+    long-running work can check it between billed stages.
+    """
+    def __init__(self, store, lease, interval=None):
+        self.store = store
+        self.lease = lease
+        self.interval = interval or store.lease_seconds / 3
+        self.lost = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                renewed = self.store.renew(self.lease)
+            except (OSError, sqlite3.Error) as e:
+                print(f"Lease renewal for {self.lease.key} failed: {e}")
+                continue
+            if not renewed:
+                print(f"⚠️ Lost the lease on {self.lease.key}; another worker has taken it over")
+                self.lost.set()
+                return
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+        return False
+
+def create_lease_store(kind, location, lease_seconds=LEASE_SECONDS, worker=None, clock_skew=CLOCK_SKEW_SECONDS):
+    """'file' keeps leases in the `location` directory, 'sqlite' in the `location` database file"""
+    if kind == "sqlite":
+        return SQLiteLeaseStore(location, lease_seconds, worker)
+    return FileLeaseStore(location, lease_seconds, worker, clock_skew)
+
+def simulated_worker(kind, location, lease_seconds, episodes, work_seconds, crash_rate, billing_path, seed):
+    """One simulated worker: claims episodes, 'bills' each one it completes, sometimes dies mid-work"""
+    random.seed(seed)
+    store = create_lease_store(kind, location, lease_seconds, clock_skew=0)  # One host, one clock
+    remaining = list(episodes)
+    while remaining:
+        random.shuffle(remaining)
+        progressed = False
+        for key in list(remaining):
+            if store.is_done(key):
+                remaining.remove(key)
+                continue
+            lease = store.claim(key)
+            if lease is None:
+                continue
+            progressed = True
+            with LeaseHeartbeat(store, lease, interval=lease_seconds / 4) as heartbeat:
+                deadline = time.monotonic() + random.uniform(*work_seconds)
+                while time.monotonic() < deadline and not heartbeat.lost.is_set():
+                    if random.random() < crash_rate / 10:
+                        os._exit(1)  # Crash: no release, no more heartbeats
+                    time.sleep(0.05)
+            if heartbeat.lost.is_set() or not store.holds(lease):
+                continue
+            # Billing is recorded under the lease, just before it is marked done
+            with open(billing_path, "a", encoding='utf-8') as billing:
+                billing.write(f"{key}\t{store.worker}\t{lease.generation}\n")
+            store.complete(lease)
+            remaining.remove(key)
+        if not progressed:
+            time.sleep(lease_seconds / 4)
+
+def simulate(workers=4, episodes=20, kind="file", lease_seconds=1.0, work_seconds=(0.2, 0.8),
+             crash_rate=0.2, respawn=True):
+    """
+    Race several local worker processes over the same episodes
+    Crashed workers are replaced (when respawn is on) until every episode is done.
+    Returns a report with completions per episode; `duplicates` must be 0.
+    """
+    keys = [f"Episode {i:03d}/audio.m4a" for i in range(episodes)]
+    with tempfile.TemporaryDirectory() as work_dir:
+        location = Path(work_dir) / ("leases.db" if kind == "sqlite" else LEASE_DIR_NAME)
+        billing_path = Path(work_dir) / "billing.log"
+        billing_path.touch()
+        store = create_lease_store(kind, location, lease_seconds)
+        args = (kind, str(location), lease_seconds, keys, work_seconds, crash_rate, str(billing_path))
+
+        started = time.time()
+        seed = 0
+        processes = []
+        crashes = 0
+        for _ in range(workers):
+            seed += 1
+            processes.append(multiprocessing.Process(target=simulated_worker, args=args + (seed,)))
+            processes[-1].start()
+        while processes:
+            for process in list(processes):
+                process.join(timeout=0.1)
+                if process.exitcode is None:
+                    continue
+                processes.remove(process)
+                if process.exitcode != 0:
+                    crashes += 1
+                    if respawn and not all(store.is_done(key) for key in keys):
+                        seed += 1
+                        processes.append(multiprocessing.Process(target=simulated_worker, args=args + (seed,)))
+                        processes[-1].start()
+
+        billed = {}
+        takeovers = 0
+        for line in billing_path.read_text(encoding='utf-8').splitlines():
+            key, _, generation = line.split("\t")
+            billed[key] = billed.get(key, 0) + 1
+            takeovers += int(generation) > 1
+        return {
+            "episodes": episodes,
+            "completed": sum(1 for key in keys if store.is_done(key)),
+            "billed": sum(billed.values()),
+            "duplicates": sum(count - 1 for count in billed.values() if count > 1),
+            "crashes": crashes,
+            "completed_after_takeover": takeovers,
+            "seconds": round(time.time() - started, 1)
+        }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lease-based work claiming across workers")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    sim_parser = subparsers.add_parser("simulate", help="Race local worker processes over simulated episodes")
+    sim_parser.add_argument("--workers", type=int, default=4)
+    sim_parser.add_argument("--episodes", type=int, default=20)
+    sim_parser.add_argument("--store", choices=["file", "sqlite"], default="file")
+    sim_parser.add_argument("--lease-seconds", type=float, default=1.0)
+    sim_parser.add_argument("--crash-rate", type=float, default=0.2,
+                            help="Rough share of work items whose worker dies mid-way")
+    args = parser.parse_args(argv)
+
+    report = simulate(args.workers, args.episodes, args.store, args.lease_seconds, crash_rate=args.crash_rate)
+    print(json.dumps(report, indent=2))
+    ok = report["completed"] == args.episodes and report["duplicates"] == 0
+    print("✅ Every episode billed exactly once" if ok else "❌ Episodes missed or billed twice")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
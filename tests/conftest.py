@@ -0,0 +1,56 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+# The pipeline modules import each other from src/ and the prompts package from the project root
+for path in (PROJECT_ROOT / "src", PROJECT_ROOT):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+def format_srt_time(seconds):
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d},000"
+
+def make_srt(cues=40, step=30):
+    """transcription.md content: one cue every `step` seconds"""
+    blocks = [
+        f"{i + 1}\n{format_srt_time(i * step)} --> {format_srt_time(i * step + step - 1)}\n"
+        f"Cue {i} is about knowledge graphs, agents and the archive.\n"
+        for i in range(cues)
+    ]
+    return "# Transcription with Timestamps\n\n" + "\n".join(blocks)
+
+def api_error(kind="timeout", retry_after=None):
+    """An overload error as the OpenAI SDK raises it: 'timeout' or 'rate_limit' (with optional retry-after)"""
+    import httpx
+    import openai
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    if kind == "timeout":
+        return openai.APITimeoutError(request=request)
+    headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+    return openai.RateLimitError("rate limited", response=httpx.Response(429, headers=headers, request=request),
+                                 body=None)
+
+@pytest.fixture
+def transcript():
+    return make_srt()
+
+@pytest.fixture
+def episode(tmp_path, transcript):
+    """An analyzed episode folder: transcript plus episode_info.md with guest and topic"""
+    folder = tmp_path / "Jane Doe - 2024-03-01"
+    folder.mkdir()
+    (folder / "transcription.md").write_text(transcript, encoding='utf-8')
+    (folder / "episode_info.md").write_text(
+        "# Episode Information\n\nGuest: Jane Doe\n\nTopic: Knowledge Graphs\n", encoding='utf-8'
+    )
+    return folder
+
+@pytest.fixture(autouse=True)
+def isolated_keyword_corpus(monkeypatch):
+    """Keep the process-wide keyword engine in memory so tests never write output/keyword_index"""
+    import keyword_engine
+    monkeypatch.setattr(keyword_engine, "_default_engine", keyword_engine.KeywordEngine())
+    monkeypatch.setattr(keyword_engine, "SAVE_EVERY", float("inf"))
+    monkeypatch.setattr(keyword_engine, "SAVE_INTERVAL_SECONDS", float("inf"))
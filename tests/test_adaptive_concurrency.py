@@ -0,0 +1,89 @@
+from types import SimpleNamespace
+
+import pytest
+
+import adaptive_concurrency
+from adaptive_concurrency import (
+    ATTEMPTS_KWARG, AdaptiveClient, AdaptiveLimiter, CircuitBreaker, retry_after_seconds
+)
+from conftest import api_error
+
+class FlakyClient:
+    """Raises the queued errors first, then answers"""
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "answer"
+
+@pytest.fixture(autouse=True)
+def no_waiting(monkeypatch):
+    monkeypatch.setattr(adaptive_concurrency, "backoff_seconds", lambda attempt: 0)
+
+def ask(client, **kwargs):
+    return client.chat.completions.create(model="gpt-3.5-turbo", messages=[], **kwargs)
+
+def test_limit_grows_additively_and_halves_on_overload():
+    limiter = AdaptiveLimiter(initial=4)
+    for _ in range(4):
+        limiter.acquire()
+        limiter.release("key", 1.0)
+    # About +1 per window of healthy responses
+    assert 4.9 < limiter.limit < 5.0
+    limiter.acquire()
+    limiter.release("key", overloaded=True)
+    assert limiter.limit == pytest.approx(limiter.peak_limit / 2)
+
+def test_one_burst_of_overloads_halves_once():
+    limiter = AdaptiveLimiter(initial=16)
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release(overloaded=True)
+    assert limiter.limit == 8
+
+def test_latency_inflation_slows_down():
+    limiter = AdaptiveLimiter(initial=10)
+    limiter.acquire()
+    limiter.release("key", 1.0)
+    before = limiter.limit
+    limiter.acquire()
+    limiter.release("key", 5.0)   # Far above the usual second
+    assert limiter.limit == pytest.approx(before * adaptive_concurrency.SLOWDOWN_FACTOR)
+
+def test_overloaded_calls_are_retried():
+    api = FlakyClient(api_error("rate_limit"), api_error("timeout"))
+    client = AdaptiveClient(api)
+    assert ask(client) == "answer"
+    assert (api.calls, client.retries, client.overloads) == (3, 2, 2)
+
+def test_attempts_can_be_capped_per_call():
+    api = FlakyClient(api_error("timeout"), api_error("timeout"))
+    client = AdaptiveClient(api)
+    with pytest.raises(type(api_error("timeout"))):
+        ask(client, **{ATTEMPTS_KWARG: 2})
+    assert api.calls == 2
+
+def test_other_errors_are_not_retried():
+    api = FlakyClient(ValueError("bad request"))
+    with pytest.raises(ValueError):
+        ask(AdaptiveClient(api))
+    assert api.calls == 1
+
+def test_retry_after_header():
+    assert retry_after_seconds(api_error("rate_limit", retry_after=7)) == 7.0
+    assert retry_after_seconds(api_error("rate_limit")) is None
+    assert retry_after_seconds(api_error("timeout")) is None
+
+def test_circuit_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=60)
+    for _ in range(2):
+        breaker.failure()
+    breaker.success()
+    for _ in range(3):
+        breaker.failure()
+    assert (breaker.state, breaker.times_opened) == ("open", 1)
@@ -0,0 +1,111 @@
+from types import SimpleNamespace
+
+import pytest
+
+from analysis_cache import ANALYSIS_CACHE_FILE, AnalysisCache, CachingClient, changed_cues, transcript_fingerprint
+
+class FakeChatClient:
+    """Answers every chat completion with a numbered reply and records the requests"""
+    def __init__(self):
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        content = f"reply {len(self.requests)}"
+        if kwargs.get("stream"):
+            return iter([self._chunk(content[:3]), self._chunk(content[3:])])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    @staticmethod
+    def _chunk(text):
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+def ask(client, stage, prompt, **kwargs):
+    return client.for_stage(stage).chat.completions.create(
+        model="gpt-3.5-turbo", messages=[{"role": "user", "content": prompt}], **kwargs
+    )
+
+def save(folder, cache, transcript):
+    (folder / ANALYSIS_CACHE_FILE).write_text(cache.dumps(transcript), encoding='utf-8')
+
+def test_reanalysis_reuses_recorded_responses(tmp_path, transcript):
+    api = FakeChatClient()
+    first_run = AnalysisCache()
+    client = CachingClient(api, first_run)
+    ask(client, "chunk", "chunk 1")
+    ask(client, "chunk", "chunk 2")
+    save(tmp_path, first_run, transcript)
+
+    second_run = AnalysisCache.load(tmp_path)
+    client = CachingClient(api, second_run, reuse=True)
+    assert ask(client, "chunk", "chunk 1").choices[0].message.content == "reply 1"
+    # The model isn't part of the key; a failover model's answer is just as good
+    assert ask(client, "chunk", "chunk 2", timeout=30).choices[0].message.content == "reply 2"
+    assert ask(client, "chunk", "chunk 3").choices[0].message.content == "reply 3"
+    assert len(api.requests) == 3
+    assert (second_run.hits, second_run.misses) == (2, 1)
+
+def test_stage_is_part_of_the_key():
+    api = FakeChatClient()
+    cache = AnalysisCache()
+    ask(CachingClient(api, cache), "chunk", "same prompt")
+    ask(CachingClient(api, cache, reuse=True), "interval", "same prompt")
+    assert len(api.requests) == 2
+
+def test_streams_are_recorded_and_replayed(tmp_path, transcript):
+    api = FakeChatClient()
+    cache = AnalysisCache()
+    stream = ask(CachingClient(api, cache), "compile", "notes", stream=True)
+    assert "".join(chunk.choices[0].delta.content for chunk in stream) == "reply 1"
+    save(tmp_path, cache, transcript)
+
+    replay = ask(CachingClient(api, AnalysisCache.load(tmp_path), reuse=True), "compile", "notes", stream=True)
+    assert "".join(chunk.choices[0].delta.content for chunk in replay) == "reply 1"
+    assert len(api.requests) == 1
+
+def test_unused_responses_expire(tmp_path, transcript):
+    api = FakeChatClient()
+    cache = AnalysisCache()
+    client = CachingClient(api, cache)
+    ask(client, "chunk", "kept")
+    ask(client, "chunk", "dropped")
+    save(tmp_path, cache, transcript)
+
+    # Two more runs that only ask for one of the prompts
+    for _ in range(2):
+        cache = AnalysisCache.load(tmp_path)
+        ask(CachingClient(api, cache, reuse=True), "chunk", "kept")
+        save(tmp_path, cache, transcript)
+
+    cache = AnalysisCache.load(tmp_path)
+    client = CachingClient(api, cache, reuse=True)
+    ask(client, "chunk", "kept")
+    ask(client, "chunk", "dropped")
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_changed_cues_after_an_edit(transcript):
+    _, old_cues = transcript_fingerprint(transcript)
+    edited = transcript.replace("Cue 3 is about", "Cue 3 is really about")
+    _, new_cues = transcript_fingerprint(edited)
+    assert changed_cues(old_cues, new_cues) == ([3], 0)
+    assert changed_cues(old_cues, old_cues[:-2]) == ([], 2)
+
+@pytest.mark.parametrize("streaming", [True, False])
+def test_reanalysis_runs_in_the_recorded_mode(episode, transcript, monkeypatch, streaming):
+    import transcript_watcher
+    cache = AnalysisCache()
+    cache.streaming = streaming
+    save(episode, cache, transcript)
+    assert AnalysisCache.load(episode).streaming == streaming
+
+    runs = []
+    monkeypatch.setattr(transcript_watcher, "run_after_transcription", lambda path, client, **options: runs.append(options))
+    monkeypatch.setattr(transcript_watcher, "index_transcript", lambda path: None)
+    transcript_watcher.reanalyze_episode(episode)
+    assert runs == [{"streaming": streaming, "reuse_analysis": True}]
+
+def test_records_without_a_mode_were_streamed(episode):
+    # Monitor analyses stream; records from before the mode was saved came from there
+    (episode / ANALYSIS_CACHE_FILE).write_text('{"entries": {}}', encoding='utf-8')
+    assert AnalysisCache.load(episode).streaming
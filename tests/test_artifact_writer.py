@@ -0,0 +1,63 @@
+import os
+
+from artifact_writer import EpisodeArtifactWriter, INCOMING_PREFIX
+
+def test_files_appear_only_on_commit(tmp_path):
+    folder = tmp_path / "episode"
+    writer = EpisodeArtifactWriter(folder, staging_root=tmp_path / "temp")
+    committed_path = writer.write("episode_info.md", "first")
+    writer.write("episode_info.md", "second")
+    writer.write_bytes("transcription.words", b"\x00\x01")
+
+    assert committed_path == str(folder / "episode_info.md")
+    assert os.listdir(folder) == []
+    # Readers inside the pipeline see the staged copy
+    assert writer.read("episode_info.md") == "second"
+    assert writer.path("episode_info.md").startswith(str(tmp_path / "temp"))
+
+    assert writer.commit() == str(folder)
+    assert (folder / "episode_info.md").read_text() == "second"
+    assert (folder / "transcription.words").read_bytes() == b"\x00\x01"
+    assert not writer.staging_dir.exists()
+
+def test_commit_renames_the_folder_after_moving_files(tmp_path):
+    folder = tmp_path / "2024-03-01 recording"
+    writer = EpisodeArtifactWriter(folder, staging_root=tmp_path / "temp")
+    writer.write("episode_info.md", "Guest: Jane Doe")
+
+    def rename(path):
+        # Everything staged is already in the folder when it is renamed
+        assert (tmp_path / "2024-03-01 recording" / "episode_info.md").exists()
+        renamed = tmp_path / "Jane Doe - 2024-03-01"
+        os.rename(path, renamed)
+        return str(renamed)
+
+    assert writer.commit(rename=rename) == str(tmp_path / "Jane Doe - 2024-03-01")
+    assert (tmp_path / "Jane Doe - 2024-03-01" / "episode_info.md").exists()
+
+def test_abort_discards_staged_files(tmp_path):
+    folder = tmp_path / "episode"
+    writer = EpisodeArtifactWriter(folder, staging_root=tmp_path / "temp")
+    writer.write("show_notes.md", "draft")
+    with open(writer.partial_path("show_notes.md"), "w") as partial:
+        partial.write("streaming")
+    writer.abort()
+    assert os.listdir(folder) == []
+    assert os.listdir(tmp_path / "temp") == []
+
+def test_staging_never_happens_in_the_episode_tree(tmp_path):
+    folder = tmp_path / "Dropbox" / "episode"
+    writer = EpisodeArtifactWriter(folder, staging_root=tmp_path / "temp")
+    assert writer.staging_dir.parent == tmp_path / "temp"
+    writer.abort()
+
+def test_commit_across_filesystems_copies_then_renames(tmp_path):
+    folder = tmp_path / "episode"
+    folder.mkdir()
+    (folder / "transcription.md").write_text("old")
+    writer = EpisodeArtifactWriter(folder, staging_root=tmp_path / "temp")
+    writer.same_filesystem = False   # As if temp/ were on another disk
+    writer.write("transcription.md", "new")
+    writer.commit()
+    assert (folder / "transcription.md").read_text() == "new"
+    assert not any(name.startswith(INCOMING_PREFIX) for name in os.listdir(folder))
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+import audio_fingerprint
+from audio_fingerprint import (
+    SAMPLE_RATE, FingerprintLedger, TrackSelector, aligned_matches, choose_best_track, coverage,
+    fingerprint_samples, is_duplicate
+)
+
+def voice(seed, seconds=60):
+    """Synthetic speaker: short enveloped tone bursts at random times and pitches, like syllables"""
+    rng = np.random.default_rng(seed)
+    samples = np.zeros(seconds * SAMPLE_RATE, dtype=np.float32)
+    burst = int(0.08 * SAMPLE_RATE)
+    tone = np.arange(burst) / SAMPLE_RATE
+    for start in rng.integers(0, len(samples) - burst, seconds * 8):
+        pitch, level = rng.uniform(200, 3500), rng.uniform(0.2, 1.0)
+        samples[start:start + burst] += np.hanning(burst) * np.sin(2 * np.pi * pitch * tone) * level
+    return samples
+
+def re_export(samples, lead_in_seconds=1.0, noise=0.01):
+    """The same audio exported again: shifted by a lead-in and with a little encoding noise"""
+    hiss = np.random.default_rng(0).normal(0, noise, len(samples)).astype(np.float32)
+    return np.concatenate([np.zeros(int(lead_in_seconds * SAMPLE_RATE), dtype=np.float32), samples + hiss])
+
+@pytest.fixture(scope="module")
+def speakers():
+    return voice(1), voice(2)
+
+def test_re_export_is_a_duplicate(speakers):
+    original = fingerprint_samples(speakers[0])
+    exported = fingerprint_samples(re_export(speakers[0]))
+    assert is_duplicate(original, exported)
+    _, offset = aligned_matches(original, exported)
+    assert offset == pytest.approx(1.0, abs=0.05)
+
+def test_different_sessions_do_not_match(speakers):
+    first, second = (fingerprint_samples(samples) for samples in speakers)
+    assert not is_duplicate(first, second)
+    assert coverage(first, second) < 0.01
+
+def test_mixed_track_is_chosen_over_participant_tracks(speakers):
+    fingerprints = {
+        "Audio Record/jane.m4a": fingerprint_samples(speakers[0]),
+        "Audio Record/stewart.m4a": fingerprint_samples(speakers[1]),
+        "meeting.m4a": fingerprint_samples(speakers[0] + speakers[1]),
+    }
+    best, redundant = choose_best_track(fingerprints)
+    assert best == "meeting.m4a"
+    assert set(redundant) == {"Audio Record/jane.m4a", "Audio Record/stewart.m4a"}
+
+@pytest.fixture
+def save_track(monkeypatch):
+    """Tracks are stored as raw PCM, so no ffmpeg is needed to decode them"""
+    monkeypatch.setattr(audio_fingerprint, "decode_pcm", lambda path: np.load(path))
+    def save(path, samples):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            np.save(f, samples)
+        return path
+    return save
+
+def test_selector_skips_a_re_exported_session(tmp_path, speakers, save_track):
+    selector = TrackSelector(FingerprintLedger(tmp_path / ".podcast_fingerprints"), tmp_path)
+    first = save_track(tmp_path / "2024-03-01 meeting" / "audio.m4a", speakers[0])
+    assert selector.should_transcribe(first) == (True, None)
+    selector.transcribed(first)
+
+    again = save_track(tmp_path / "2024-03-08 export" / "audio.m4a", re_export(speakers[0]))
+    transcribe, reason = selector.should_transcribe(again)
+    assert not transcribe and reason.startswith(f"same session as {first}")
+    # A new selector reads the ledger back
+    reloaded = TrackSelector(FingerprintLedger(tmp_path / ".podcast_fingerprints"), tmp_path)
+    assert reloaded.should_transcribe(again) == (False, "already duplicate")
+
+def test_participant_tracks_wait_for_the_mixed_track(tmp_path, speakers, save_track):
+    selector = TrackSelector(FingerprintLedger(tmp_path / ".podcast_fingerprints"), tmp_path)
+    meeting = tmp_path / "2024-03-01 meeting"
+    participant = save_track(meeting / "Audio Record" / "jane.m4a", speakers[0])
+    assert not selector.should_transcribe(participant)[0]
+
+    mixed = save_track(meeting / "audio.m4a", speakers[0] + speakers[1])
+    assert selector.should_transcribe(mixed) == (True, None)
+    assert selector.should_transcribe(participant) == (False, "already redundant")
@@ -0,0 +1,80 @@
+import json
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from budget_governor import (
+    MIN_SAMPLED_CHUNKS, BudgetExceededError, BudgetGovernor, BudgetMeter, StageUsage, load_plan
+)
+from conftest import make_srt
+
+@pytest.fixture(scope="module")
+def long_transcript():
+    """Two hours of talk, long enough to split into a few dozen chunks"""
+    filler = "We keep talking about memory, retrieval and evaluation. " * 8
+    return make_srt(cues=240).replace("the archive.", "the archive. " + filler)
+
+def governor(tmp_path, **caps):
+    return BudgetGovernor(history_path=tmp_path / "budget_history.json", **caps)
+
+def steps(plan):
+    return [decision["step"] for decision in plan.decisions]
+
+def test_full_analysis_within_budget(tmp_path, long_transcript):
+    plan = governor(tmp_path, episode_tokens=200000).plan(long_transcript)
+    assert steps(plan) == []
+    assert (plan.segmentation, plan.max_chunks, plan.titles) == ("topic", None, True)
+
+def test_degradation_order(tmp_path, long_transcript):
+    plan = governor(tmp_path, episode_tokens=1000).plan(long_transcript)
+    assert steps(plan) == ["coarser_timeline"] * 3 + ["sampled_chunks", "skip_titles", "over_budget"]
+    assert [decision["detail"] for decision in plan.decisions[:3]] == [
+        f"timeline in fixed {minutes}-minute intervals" for minutes in (10, 20, 30)
+    ]
+    assert (plan.interval_minutes, plan.max_chunks, plan.titles) == (30, MIN_SAMPLED_CHUNKS, False)
+
+def test_degradation_stops_once_the_plan_fits(tmp_path, long_transcript):
+    full = governor(tmp_path).plan(long_transcript).estimate["tokens"]
+    plan = governor(tmp_path, episode_tokens=full - 1).plan(long_transcript)
+    # A coarser timeline is enough; chunks and titles are untouched
+    assert set(steps(plan)) == {"coarser_timeline"}
+    assert plan.max_chunks is None and plan.titles
+    assert plan.estimate["tokens"] <= full - 1
+
+def test_postponed_when_the_day_is_spent(tmp_path, long_transcript):
+    (tmp_path / "budget_history.json").write_text(json.dumps({"days": {date.today().isoformat(): 99000}}))
+    plan = governor(tmp_path, daily_tokens=100000).plan(long_transcript)
+    assert plan.postponed and steps(plan)[-1] == "postponed"
+    # Only guest and topic are still made
+    assert set(plan.estimate["stages"]) == {"guest", "topic"}
+
+def test_reservations_count_against_the_day(tmp_path, long_transcript):
+    budget = governor(tmp_path, daily_tokens=120000)
+    first = budget.plan(long_transcript)
+    second = budget.plan(long_transcript)
+    assert not first.postponed and second.postponed
+    budget.settle(first, StageUsage(), episode_folder=tmp_path)
+    assert budget.reserved == second.estimate["tokens"]
+
+def test_meter_refuses_calls_past_the_hard_limit():
+    api = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: None)))
+    usage = StageUsage(hard_limit=100)
+    usage.add("chunk", 800, 200, 50, 1.0)
+    with pytest.raises(BudgetExceededError):
+        BudgetMeter(api, usage).for_stage("chunk").chat.completions.create(model="gpt-3.5-turbo", messages=[])
+    assert usage.refused == 1
+
+def test_re_analysis_keeps_the_recorded_plan(tmp_path, long_transcript):
+    budget = governor(tmp_path, episode_tokens=1000)
+    plan = budget.plan(long_transcript)
+    usage = StageUsage()
+    usage.add("interval", 4000, 1000, 240, 12.0, "gpt-3.5-turbo")
+    budget.settle(plan, usage, episode_folder=tmp_path)
+    history = budget.load_history()
+    assert budget.spent_today(history) == 1240
+    assert history["stages"]["interval"]["completion_tokens"] == 240
+
+    kept = governor(tmp_path).plan(long_transcript, previous=load_plan(tmp_path))
+    assert steps(kept) == ["kept_plan"]
+    assert (kept.interval_minutes, kept.max_chunks, kept.titles) == (30, MIN_SAMPLED_CHUNKS, False)
@@ -0,0 +1,171 @@
+import json
+
+import pytest
+
+from deferred_analysis import DeferredJob, LocalBatchBackend, echo_responder
+from post_transcription_processor import load_episode_info
+
+STAGES = ["keywords", "titles", "show_notes"]
+
+class CrashingBackend(LocalBatchBackend):
+    """LocalBatchBackend that fails once at a chosen step, and counts submissions"""
+    def __init__(self, work_dir, crash_on=None, responder=None):
+        super().__init__(work_dir, responder)
+        self.crash_on = crash_on
+        self.submitted = []
+
+    def _maybe_crash(self, step):
+        if self.crash_on == step:
+            self.crash_on = None
+            raise KeyboardInterrupt(f"crashed during {step}")
+
+    def submit(self, input_path):
+        self._maybe_crash("submit")
+        batch_id = super().submit(input_path)
+        self.submitted.append(batch_id)
+        return batch_id
+
+    def download(self, batch_id, output_path):
+        self._maybe_crash("download")
+        super().download(batch_id, output_path)
+
+def read_manifest(job_dir):
+    return json.loads((job_dir / "manifest.json").read_text(encoding='utf-8'))
+
+def assert_finished(job_dir, episode):
+    manifest = read_manifest(job_dir)
+    assert manifest["finished"]
+    assert all(state["collected"] for state in manifest["phases"].values())
+    info = load_episode_info(episode)
+    assert info["guest"] == "Jane Doe"
+    assert info["keywords"].startswith("keyword 1, keyword 2")
+    assert "Local Title 10" in info["titles"]
+    show_notes = (episode / "show_notes.md").read_text(encoding='utf-8')
+    assert show_notes.startswith("[local]")
+
+def test_submit_manifest_collect(tmp_path, episode):
+    job_dir = tmp_path / "job"
+    job = DeferredJob.create(job_dir, [episode], STAGES)
+    backend = CrashingBackend(job_dir)
+    job.run(backend, poll_interval=0)
+
+    assert len(backend.submitted) == 2
+    manifest = read_manifest(job_dir)
+    requests = [json.loads(line) for line in (job_dir / "phase1.jsonl").read_text().splitlines()]
+    assert manifest["phases"]["1"]["requests"] == len(requests)
+    assert {request["custom_id"].split(":")[1] for request in requests} == {"keywords", "chunk", "interval"}
+    # Every phase 1 result is stored under its custom_id
+    assert all(request["custom_id"] in manifest["results"] for request in requests)
+    assert "0:titles:0" in manifest["results"] and "0:compile:0" in manifest["results"]
+    assert_finished(job_dir, episode)
+
+def test_episodes_without_guest_are_skipped(tmp_path, episode):
+    (episode / "episode_info.md").write_text("# Episode Information\n\nTopic: Knowledge Graphs\n")
+    job = DeferredJob.create(tmp_path / "job", [episode], STAGES)
+    assert job.manifest["episodes"] == []
+
+@pytest.mark.parametrize("crash_on", ["submit", "download"])
+def test_resume_after_crash_in_phase_1(tmp_path, episode, crash_on):
+    job_dir = tmp_path / "job"
+    backend = CrashingBackend(job_dir, crash_on)
+    with pytest.raises(KeyboardInterrupt):
+        DeferredJob.create(job_dir, [episode], STAGES).run(backend, poll_interval=0)
+
+    state = read_manifest(job_dir)["phases"]["1"]
+    assert state["input"] == "phase1.jsonl" and not state.get("collected")
+    assert ("batch_id" in state) == (crash_on == "download")
+    phase1_input = (job_dir / "phase1.jsonl").read_text()
+
+    # A new process picks the job up from its directory
+    DeferredJob(job_dir).run(backend, poll_interval=0)
+
+    # The written input is reused, and a submitted batch is never submitted again
+    assert (job_dir / "phase1.jsonl").read_text() == phase1_input
+    assert len(backend.submitted) == 2
+    if crash_on == "download":
+        assert backend.submitted[0] == state["batch_id"]
+    assert_finished(job_dir, episode)
+
+def test_resume_between_phases(tmp_path, episode):
+    job_dir = tmp_path / "job"
+    job = DeferredJob.create(job_dir, [episode], STAGES)
+    backend = CrashingBackend(job_dir)
+    job.run_phase(1, backend, poll_interval=0)
+
+    resumed = DeferredJob(job_dir)
+    resumed.run(backend, poll_interval=0)
+
+    # Phase 1 was already collected, so only phase 2 is submitted on resume
+    assert len(backend.submitted) == 2
+    assert_finished(job_dir, episode)
+
+def test_failed_requests_are_counted_and_skipped(tmp_path, episode):
+    def responder(body):
+        if "Summarize the main topics" in body["messages"][-1]["content"]:
+            raise RuntimeError("interval failed")
+        return echo_responder(body)
+
+    job_dir = tmp_path / "job"
+    job = DeferredJob.create(job_dir, [episode], STAGES)
+    job.run(LocalBatchBackend(job_dir, responder), poll_interval=0)
+
+    manifest = read_manifest(job_dir)
+    intervals = len(manifest["episodes"][0]["intervals"])
+    assert manifest["phases"]["1"]["failed"] == intervals
+    assert not any(":interval:" in custom_id for custom_id in manifest["results"])
+    # The show notes are still written, just without timeline entries
+    assert (episode / "show_notes.md").exists()
+
+class EndingEarlyBackend(CrashingBackend):
+    """The first batch ends with `status`, having answered only the first `finished` requests"""
+    def __init__(self, work_dir, status, finished=0):
+        super().__init__(work_dir)
+        self.end_status = status
+        self.finished = finished
+        self.batch_sizes = []
+
+    def submit(self, input_path):
+        batch_id = super().submit(input_path)
+        results = self._result_path(batch_id).read_text().splitlines()
+        self.batch_sizes.append(len(results))
+        if len(self.submitted) == 1:
+            self._result_path(batch_id).write_text("\n".join(results[:self.finished]) + "\n")
+        return batch_id
+
+    def status(self, batch_id):
+        return self.end_status if batch_id == self.submitted[0] else super().status(batch_id)
+
+def test_expired_batch_keeps_its_finished_requests(tmp_path, episode):
+    job_dir = tmp_path / "job"
+    backend = EndingEarlyBackend(job_dir, "expired", finished=3)
+    with pytest.raises(RuntimeError, match="expired"):
+        DeferredJob.create(job_dir, [episode], STAGES).run(backend, poll_interval=0)
+
+    state = read_manifest(job_dir)["phases"]["1"]
+    assert "batch_id" not in state and "status" not in state
+    total = backend.batch_sizes[0]
+    assert len(read_manifest(job_dir)["results"]) == 3
+    assert state["requests"] == total - 3
+
+    DeferredJob(job_dir).run(backend, poll_interval=0)
+    # Only the requests the expired batch didn't finish are submitted (and billed) again
+    assert backend.batch_sizes[1] == total - 3
+    assert_finished(job_dir, episode)
+
+def test_failed_batch_is_resubmitted(tmp_path, episode):
+    job_dir = tmp_path / "job"
+    backend = EndingEarlyBackend(job_dir, "failed")
+    with pytest.raises(RuntimeError, match="failed"):
+        DeferredJob.create(job_dir, [episode], STAGES).run(backend, poll_interval=0)
+    assert "batch_id" not in read_manifest(job_dir)["phases"]["1"]
+
+    DeferredJob(job_dir).run(backend, poll_interval=0)
+    assert backend.batch_sizes[1] == backend.batch_sizes[0]
+    assert_finished(job_dir, episode)
+
+def test_cancelled_batch_that_had_finished_everything(tmp_path, episode):
+    job_dir = tmp_path / "job"
+    backend = EndingEarlyBackend(job_dir, "cancelled", finished=1000)
+    DeferredJob.create(job_dir, [episode], STAGES).run(backend, poll_interval=0)
+    assert len(backend.submitted) == 2   # Phase 1 isn't submitted again, phase 2 is
+    assert_finished(job_dir, episode)
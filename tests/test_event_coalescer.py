@@ -0,0 +1,70 @@
+import pytest
+from watchdog.events import FileCreatedEvent, FileDeletedEvent, FileModifiedEvent, FileMovedEvent
+
+from event_coalescer import CoalescingEventHandler
+
+class RecordingHandler:
+    def __init__(self):
+        self.events = []
+
+    def dispatch(self, event):
+        self.events.append((event.event_type, event.src_path, getattr(event, 'dest_path', '')))
+
+@pytest.fixture
+def coalesce():
+    """A coalescer whose window never passes on its own; tests flush it"""
+    handler = RecordingHandler()
+    coalescer = CoalescingEventHandler(handler, window=60)
+    yield coalescer, handler
+    coalescer.stop()
+
+def test_events_wait_for_the_window(coalesce):
+    coalescer, handler = coalesce
+    coalescer.dispatch(FileCreatedEvent("/root/a.m4a"))
+    coalescer.flush()
+    assert handler.events == []
+    coalescer.flush(force=True)
+    assert handler.events == [("created", "/root/a.m4a", "")]
+
+def test_storm_on_one_path_keeps_the_strongest_event(coalesce):
+    coalescer, handler = coalesce
+    coalescer.dispatch(FileCreatedEvent("/root/a.m4a"))
+    for _ in range(5):
+        coalescer.dispatch(FileModifiedEvent("/root/a.m4a"))
+    coalescer.flush(force=True)
+    assert handler.events == [("created", "/root/a.m4a", "")]
+    assert (coalescer.received, coalescer.dispatched) == (6, 1)
+
+def test_move_chain_collapses(coalesce):
+    coalescer, handler = coalesce
+    coalescer.dispatch(FileMovedEvent("/root/a", "/root/b"))
+    coalescer.dispatch(FileMovedEvent("/root/b", "/root/c"))
+    coalescer.flush(force=True)
+    assert handler.events == [("moved", "/root/a", "/root/c")]
+
+def test_created_then_deleted_is_dropped(coalesce):
+    coalescer, handler = coalesce
+    coalescer.dispatch(FileCreatedEvent("/root/tmp.m4a"))
+    coalescer.dispatch(FileDeletedEvent("/root/tmp.m4a"))
+    coalescer.flush(force=True)
+    assert handler.events == []
+
+def test_own_renames_are_suppressed(coalesce):
+    coalescer, handler = coalesce
+    coalescer.on_rename("/root/2024-03-01 recording", "/root/Jane Doe - 2024-03-01")
+    coalescer.dispatch(FileMovedEvent("/root/2024-03-01 recording", "/root/Jane Doe - 2024-03-01"))
+    coalescer.dispatch(FileCreatedEvent("/root/Jane Doe - 2024-03-01/show_notes.md"))
+    coalescer.dispatch(FileCreatedEvent("/root/other/audio.m4a"))
+    coalescer.flush(force=True)
+    assert handler.events == [("created", "/root/other/audio.m4a", "")]
+
+def test_scheduled_work_runs_after_due_events(coalesce):
+    coalescer, handler = coalesce
+    coalescer.dispatch(FileCreatedEvent("/root/a.m4a"))
+    coalescer.call_soon(lambda: handler.events.append("retry"))
+    coalescer.call_soon(lambda: 1 / 0)   # A failing callback doesn't stop the others
+    coalescer.call_soon(lambda: handler.events.append("after"))
+    coalescer.flush(force=True)
+    assert handler.events == [("created", "/root/a.m4a", ""), "retry", "after"]
+    coalescer.flush(force=True)
+    assert len(handler.events) == 3
@@ -0,0 +1,37 @@
+import pytest
+
+from guest_detector import CONFIDENCE_THRESHOLD, clean_name, detect_guest
+
+@pytest.mark.parametrize("intro, guest", [
+    ("Hey everybody, my guest today is Jane Doe. Jane, welcome.", "Jane Doe"),
+    ("Today I sit down with Ludwig van Beethoven to talk about music.", "Ludwig van Beethoven"),
+    ("I'm joined by Ada Lovelace, who wrote the first program.", "Ada Lovelace"),
+])
+def test_clear_intros_are_confident(intro, guest):
+    match = detect_guest(intro)
+    assert match.name == guest
+    assert match.confidence >= CONFIDENCE_THRESHOLD
+
+def test_here_with_alone_leaves_it_to_the_model():
+    # "here with" also introduces companies and places
+    match = detect_guest("I'm here with Acme Robotics in Boston.")
+    assert match.name == "Acme Robotics"
+    assert match.confidence < CONFIDENCE_THRESHOLD
+
+def test_repeated_surname_raises_confidence():
+    once = detect_guest("Welcome to the show, Jane Doe. We talk about graphs.")
+    again = detect_guest("Welcome to the show, Jane Doe. Doe has written about graphs.")
+    assert again.confidence > once.confidence
+
+def test_conflicting_candidates_lower_confidence():
+    match = detect_guest("My guest today is Jane Doe. Our guest is John Smith.")
+    assert match.confidence < CONFIDENCE_THRESHOLD
+
+def test_host_is_never_the_guest():
+    assert detect_guest("Welcome to the show, Stewart Alsop here.") is None
+
+def test_no_intro_phrasing():
+    assert detect_guest("Let's talk about knowledge graphs.") is None
+
+def test_clean_name_drops_sentence_words():
+    assert clean_name("Today Jane Doe's") == "Jane Doe"
@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+
+import hedging
+from hedging import HedgePolicy
+
+@pytest.fixture
+def policy(monkeypatch):
+    """A policy that hedges after 50ms once it has seen a few calls"""
+    monkeypatch.setattr(hedging, "MIN_DELAY_SECONDS", 0.05)
+    policy = HedgePolicy(max_hedge_rate=0.5)
+    for _ in range(hedging.MIN_SAMPLES):
+        policy.run("chunk", lambda: "quick")
+    return policy
+
+def stuck_then_quick():
+    """The first call hangs until released; later ones answer at once"""
+    release = threading.Event()
+    started = []
+    def call():
+        started.append(True)
+        if len(started) == 1:
+            release.wait(5)
+            return "stuck"
+        return "hedge"
+    return call, release
+
+def test_only_short_stages_without_streams_are_hedged():
+    policy = HedgePolicy()
+    assert policy.applies("chunk", {})
+    assert not policy.applies("chunk", {"stream": True})
+    assert not policy.applies("compile", {})
+
+def test_no_hedging_without_latency_history():
+    policy = HedgePolicy()
+    assert policy.delay("chunk") is None
+    assert policy.run("chunk", lambda: "answer") == "answer"
+    assert policy.hedges == 0
+
+def test_slow_call_is_hedged_and_the_hedge_wins(policy):
+    call, release = stuck_then_quick()
+    assert policy.run("chunk", call) == "hedge"
+    release.set()
+    assert (policy.hedges, policy.hedge_wins) == (1, 1)
+
+def test_hedges_stay_within_the_budget(policy):
+    policy.max_hedge_rate = 0.0
+    call, release = stuck_then_quick()
+    threading.Timer(0.2, release.set).start()
+    assert policy.run("chunk", call) == "stuck"
+    assert policy.hedges == 0
+
+def test_error_only_when_both_requests_fail(policy):
+    attempts = []
+    def call():
+        attempts.append(True)
+        if len(attempts) == 1:
+            threading.Event().wait(0.1)
+            raise RuntimeError("primary failed")
+        return "hedge"
+    assert policy.run("chunk", call) == "hedge"
+
+    def always_fails():
+        threading.Event().wait(0.1)
+        raise RuntimeError("down")
+    with pytest.raises(RuntimeError):
+        policy.run("chunk", always_fails)
@@ -0,0 +1,48 @@
+import keyword_engine
+from keyword_engine import KeywordEngine, extract_terms
+
+def corpus():
+    engine = KeywordEngine()
+    for i in range(4):
+        engine.add_document(f"episode {i}", "We talk about machine learning and agents. " * 3)
+    return engine
+
+def test_terms_rare_in_the_corpus_rank_first():
+    engine = corpus()
+    text = "Agents and knowledge graphs. Agents, knowledge graphs and agents."
+    scores = dict(engine.distinctive_terms(text))
+    # "agents" is said more often here, but appears in every other episode too
+    assert scores["knowledge graphs"] > scores["agents"]
+    assert list(scores)[-1] == "agents"
+
+def test_terms_said_once_are_not_distinctive():
+    assert KeywordEngine().distinctive_terms("Knowledge graphs, mentioned once.") == []
+
+def test_stopwords_split_bigrams():
+    assert extract_terms("graphs of agents") == ["graphs", "agents"]
+
+def test_refreshing_a_document_replaces_its_counts():
+    engine = KeywordEngine()
+    assert engine.add_document("episode", "knowledge graphs")
+    assert not engine.add_document("episode", "knowledge graphs")
+    engine.add_document("episode", "vector search")
+    assert engine.df[engine.vocab["knowledge"]] == 0
+    assert engine.df[engine.vocab["vector"]] == 1
+
+def test_renamed_episode_is_counted_once(tmp_path):
+    old_folder, new_folder = tmp_path / "2024-03-01 recording", tmp_path / "Jane Doe - 2024-03-01"
+    engine = keyword_engine.add_episode(str(old_folder.resolve()), "knowledge graphs")
+    new_folder.mkdir()
+    keyword_engine.rename_keyword_episode(old_folder, new_folder)
+    assert list(engine.documents) == [str(new_folder.resolve())]
+    assert engine.df[engine.vocab["knowledge graphs"]] == 1
+    # The new folder exists, so nothing is dropped as missing
+    assert engine.remove_missing() == 0
+
+def test_save_and_load_round_trip(tmp_path):
+    engine = corpus()
+    engine.save(tmp_path)
+    loaded = KeywordEngine.load(tmp_path)
+    text = "knowledge graphs and agents " * 2
+    assert loaded.distinctive_terms(text) == engine.distinctive_terms(text)
+    assert loaded.n_docs == 4
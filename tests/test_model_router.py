@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+import pytest
+
+import model_router
+from conftest import api_error
+from model_router import MIN_SAMPLES, ModelRouter, StageRoute
+
+ROUTES = {
+    "guest": StageRoute(["fast-model", "backup-model"], max_p95_seconds=5, timeout=20),
+    "chunk": StageRoute(["big-model"], max_p95_seconds=30, timeout=90, lane="heavy"),
+}
+
+class ScriptedClient:
+    """Fails calls to the models in `failing`, answers the rest with the model's name"""
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if kwargs["model"] in self.failing:
+            raise api_error("timeout")
+        return kwargs["model"]
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(model_router, "backoff_seconds", lambda attempt: 0)
+
+def ask(router, stage):
+    return router.for_stage(stage).chat.completions.create(model="gpt-3.5-turbo", messages=[])
+
+def test_stage_route_picks_model_and_timeout():
+    api = ScriptedClient()
+    router = ModelRouter(api, routes=ROUTES)
+    assert ask(router, "chunk") == "big-model"
+    assert api.calls[0]["timeout"] == 90
+
+def test_calls_outside_a_stage_pass_through():
+    api = ScriptedClient()
+    router = ModelRouter(api, routes=ROUTES)
+    assert router.chat.completions.create(model="gpt-4o", messages=[]) == "gpt-4o"
+    assert "timeout" not in api.calls[0]
+
+def test_overloaded_model_fails_over():
+    api = ScriptedClient(failing={"fast-model"})
+    router = ModelRouter(api, routes=ROUTES)
+    assert ask(router, "guest") == "backup-model"
+    assert [call["model"] for call in api.calls] == ["fast-model", "backup-model"]
+
+def test_failing_model_is_demoted():
+    api = ScriptedClient(failing={"fast-model"})
+    router = ModelRouter(api, routes=ROUTES)
+    for _ in range(MIN_SAMPLES):
+        ask(router, "guest")
+    assert router.model_order("guest") == ["backup-model", "fast-model"]
+    api.calls.clear()
+    ask(router, "guest")
+    assert [call["model"] for call in api.calls] == ["backup-model"]
+    assert router.report()["guest/fast-model"]["error_rate"] == 1.0
+
+def test_slow_model_is_demoted():
+    router = ModelRouter(ScriptedClient(), routes=ROUTES)
+    for _ in range(MIN_SAMPLES):
+        router._stats("guest", "fast-model").record(8.0, True)   # Above the 5s p95 target
+    assert router.model_order("guest") == ["backup-model", "fast-model"]
+
+def test_error_raised_after_every_round_fails():
+    api = ScriptedClient(failing={"fast-model", "backup-model"})
+    router = ModelRouter(api, routes=ROUTES)
+    with pytest.raises(type(api_error("timeout"))):
+        ask(router, "guest")
+    assert len(api.calls) == 2 * model_router.FAILOVER_ROUNDS
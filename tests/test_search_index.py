@@ -0,0 +1,76 @@
+import os
+
+from conftest import make_srt
+from search_index import SearchIndex, index_transcript, rename_indexed_episode, search
+
+def write_episode(root, name, transcript):
+    folder = root / name
+    folder.mkdir(parents=True, exist_ok=True)
+    (folder / "transcription.md").write_text(transcript, encoding='utf-8')
+    return folder
+
+def test_phrase_search_returns_cue_times(tmp_path, transcript):
+    index_dir = tmp_path / "index"
+    folder = write_episode(tmp_path, "Jane Doe - 2024-03-01", transcript)
+    assert index_transcript(folder / "transcription.md", index_dir) == 1
+
+    hits = search("Cue 12 is about", index_dir=index_dir)
+    assert [(hit.episode, hit.timestamp) for hit in hits] == [(str(folder.resolve()), "00:06:00")]
+    assert "Cue 12" in hits[0].snippet
+    # Words that are never adjacent don't match as a phrase
+    assert search("graphs knowledge", index_dir=index_dir) == []
+
+def test_lookup_after_a_folder_rename(tmp_path, transcript):
+    index_dir = tmp_path / "index"
+    folder = write_episode(tmp_path, "2024-03-01 recording", transcript)
+    index_transcript(folder / "transcription.md", index_dir)
+
+    renamed = tmp_path / "Jane Doe - 2024-03-01"
+    os.rename(folder, renamed)
+    rename_indexed_episode(folder, renamed, index_dir)
+
+    index = SearchIndex(index_dir)
+    # The renamed folder exists, so the episode survives the next update's cleanup
+    assert index.remove_missing() == 0
+    hits = index.search("cue 3 is about")
+    assert [hit.episode for hit in hits] == [str(renamed.resolve())]
+    # Nothing is re-indexed for the same transcript under its new name
+    assert index_transcript(renamed / "transcription.md", index_dir) == 0
+
+def test_edited_transcript_replaces_its_old_version(tmp_path, transcript):
+    index_dir = tmp_path / "index"
+    folder = write_episode(tmp_path, "episode", transcript)
+    index_transcript(folder / "transcription.md", index_dir)
+    (folder / "transcription.md").write_text(transcript.replace("Cue 5 is about", "Cue 5 covers"), encoding='utf-8')
+    index_transcript(folder / "transcription.md", index_dir)
+
+    assert search("cue 5 is about", index_dir=index_dir) == []
+    assert len(search("cue 5 covers", index_dir=index_dir)) == 1
+    # The first segment no longer holds a live document and is gone
+    assert SearchIndex(index_dir).manifest["segments"] == ["seg_00001"]
+
+def test_results_are_ordered_before_the_limit(tmp_path):
+    index_dir = tmp_path / "index"
+    # Indexed in reverse order, each episode in its own segment
+    for name in ["c", "b", "a"]:
+        folder = write_episode(tmp_path, name, make_srt(cues=3))
+        index_transcript(folder / "transcription.md", index_dir)
+
+    hits = search("knowledge graphs", limit=4, index_dir=index_dir)
+    assert [(os.path.basename(hit.episode), hit.timestamp) for hit in hits] == [
+        ("a", "00:00:00"), ("a", "00:00:30"), ("a", "00:01:00"), ("b", "00:00:00")
+    ]
+
+def test_compact_keeps_every_episode(tmp_path):
+    index_dir = tmp_path / "index"
+    for name in ["a", "b"]:
+        folder = write_episode(tmp_path, name, make_srt(cues=3))
+        index_transcript(folder / "transcription.md", index_dir)
+    before = search("knowledge graphs", index_dir=index_dir)
+
+    index = SearchIndex(index_dir)
+    index.compact()
+    assert len(index.manifest["segments"]) == 1
+    assert search("knowledge graphs", index_dir=index_dir) == before
+    # Compaction keeps the transcript hashes, so unchanged episodes aren't re-indexed
+    assert index_transcript(tmp_path / "a" / "transcription.md", index_dir) == 0
@@ -0,0 +1,50 @@
+import numpy as np
+
+from conftest import format_srt_time
+from prompts.registry.essential.show_notes.segmentation import (
+    MAX_SEGMENT_MINUTES, MIN_SEGMENT_MINUTES, gap_similarities, segment_by_topic
+)
+from prompts.registry.essential.show_notes.timestamps import parse_srt_transcript
+
+TOPICS = [
+    "Knowledge graphs link entities, relations and ontologies across databases.",
+    "Meditation retreats teach breathing, silence, mindfulness and patience.",
+    "Sailing boats need wind, rigging, anchors and harbours along coastlines.",
+]
+
+def transcript(topic_minutes, step=15):
+    """One cue every `step` seconds, talking about each topic for its number of minutes"""
+    cues = []
+    for topic, minutes in topic_minutes:
+        for _ in range(minutes * 60 // step):
+            start = len(cues) * step
+            cues.append(f"{len(cues) + 1}\n{format_srt_time(start)} --> {format_srt_time(start + step - 1)}\n{topic}\n")
+    return parse_srt_transcript("\n".join(cues))
+
+def minutes(timestamp):
+    mm, ss = timestamp.split(":")
+    return int(mm) + int(ss) / 60
+
+def test_boundaries_fall_on_topic_shifts():
+    segments = segment_by_topic(transcript([(TOPICS[0], 6), (TOPICS[1], 6), (TOPICS[2], 6)]))
+    assert [start for start, _ in segments] == ["00:00", "06:00", "12:00"]
+    assert all(text.count("Meditation") == 24 for start, text in segments if start == "06:00")
+
+def test_one_long_conversation_is_split_within_the_limits():
+    segments = segment_by_topic(transcript([(TOPICS[0], 40)]))
+    starts = [minutes(start) for start, _ in segments] + [40]
+    lengths = np.diff(starts)
+    assert len(segments) > 1
+    assert all(MIN_SEGMENT_MINUTES <= length <= MAX_SEGMENT_MINUTES for length in lengths)
+
+def test_short_detours_stay_in_their_segment():
+    # A one-minute aside is shorter than the minimum segment
+    segments = segment_by_topic(transcript([(TOPICS[0], 5), (TOPICS[2], 1), (TOPICS[0], 5)]))
+    assert len(segments) == 1
+
+def test_gap_similarity_drops_between_topics():
+    blocks = np.array([[1, 0], [1, 0], [0, 1], [0, 1]], dtype=np.float32)
+    assert gap_similarities(blocks, window=1).tolist() == [1.0, 0.0, 1.0]
+
+def test_empty_transcript():
+    assert segment_by_topic([]) == []
@@ -0,0 +1,33 @@
+import pytest
+
+from silence_trimmer import OffsetMap, build_offset_map, keep_intervals, remap_srt
+
+def test_keep_intervals_cut_silences_minus_padding():
+    keep = keep_intervals([(10.0, 20.0), (50.0, 60.0)], duration=60.0, padding=0.5)
+    # The trailing silence runs to the end, so nothing is kept after it
+    assert keep == [(0.0, 10.5), (19.5, 50.5)]
+
+def test_leading_silence_is_cut_from_zero():
+    assert keep_intervals([(0.0, 5.0)], duration=30.0, padding=0.5) == [(4.5, 30.0)]
+
+def test_offset_map_maps_trimmed_time_back():
+    offset_map = build_offset_map([(0.0, 10.0), (20.0, 30.0), (45.0, 50.0)])
+    assert offset_map.spans == [(0.0, 0.0, 10.0), (10.0, 20.0, 10.0), (20.0, 45.0, 5.0)]
+    assert offset_map.to_original(5.0) == 5.0
+    assert offset_map.to_original(10.0) == 20.0
+    assert offset_map.to_original(12.5) == 22.5
+    assert offset_map.to_original(21.0) == 46.0
+    # Past the end of the trimmed audio, times stay at the end of the last span
+    assert offset_map.to_original(100.0) == 50.0
+
+def test_empty_offset_map_is_identity():
+    assert OffsetMap().to_original(42.0) == 42.0
+
+def test_remap_srt_rewrites_every_timestamp():
+    offset_map = build_offset_map([(0.0, 10.0), (70.0, 3670.0)])
+    srt = "1\n00:00:05,000 --> 00:00:12,500\nHello\n"
+    assert remap_srt(srt, offset_map) == "1\n00:00:05,000 --> 00:01:12,500\nHello\n"
+
+def test_offset_map_round_trips_through_its_report():
+    offset_map = build_offset_map([(1.0, 2.0), (3.0, 4.0)])
+    assert OffsetMap([tuple(span) for span in offset_map.to_dict()["spans"]]).to_original(1.5) == pytest.approx(3.5)
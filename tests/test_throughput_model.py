@@ -0,0 +1,86 @@
+import os
+from datetime import datetime
+
+import pytest
+
+import throughput_model
+from budget_governor import BudgetGovernor, StageUsage
+from throughput_model import (
+    DEFAULT_RATES, HISTORY_WINDOW, DurationCache, JobEstimate, ThroughputModel, mean_finish_minutes, schedule
+)
+
+@pytest.fixture
+def model(tmp_path):
+    return ThroughputModel(tmp_path / "throughput_history.json")
+
+def test_rates_are_window_medians(model, tmp_path):
+    assert model.rate("encode") == DEFAULT_RATES["encode"]
+    for value in [1.0, 9.0, 3.0]:
+        model.record("encode", value)
+    assert model.rate("encode") == 3.0
+    for _ in range(HISTORY_WINDOW):
+        model.record("encode", 5.0)
+    assert model.rate("encode") == 5.0
+    # The history is kept across runs
+    assert ThroughputModel(tmp_path / "throughput_history.json").samples["encode"] == [5.0] * HISTORY_WINDOW
+
+def test_recording_estimate_follows_history(model, monkeypatch):
+    monkeypatch.setattr(throughput_model, "media_duration", lambda path: 3600.0)
+    first = model.estimate_recording("meeting.m4a", backend="api")
+    assert first.audio_minutes == 60
+    assert first.stages["encode"] == pytest.approx(60 / DEFAULT_RATES["encode"])
+    assert first.stages["transcribe"] == pytest.approx(60 / DEFAULT_RATES["transcribe:api"])
+
+    # The API turned out twice as fast
+    model.record_audio("transcribe:api", 60, 60)
+    assert model.estimate_recording("meeting.m4a").stages["transcribe"] == pytest.approx(60)
+    assert "encode" not in model.estimate_recording("meeting.m4a", trim=False).stages
+
+def test_unprobeable_recording_has_no_estimate(model, monkeypatch):
+    monkeypatch.setattr(throughput_model, "media_duration", lambda path: None)
+    assert model.estimate_recording("broken.m4a") is None
+
+def test_analysis_samples(model):
+    usage = StageUsage()
+    usage.add("chunk", 40000, 10000, 2000, 6.0, "gpt-3.5-turbo")
+    usage.add("compile", 8000, 2000, 1000, 4.0, "gpt-3.5-turbo")
+    model.record_analysis(usage, wall_seconds=5.0, audio_minutes=60)
+    assert model.rate("model:gpt-3.5-turbo") == 1500      # 15000 tokens in 10s of API time
+    assert model.rate("analysis_overlap") == 2.0           # 10s of calls in 5s
+    assert model.rate("tokens_per_minute") == 250
+    assert model.analysis_seconds({"gpt-3.5-turbo": 15000}) == pytest.approx(5.0)
+
+def test_episode_estimate_from_the_governor(model, tmp_path, transcript):
+    estimate = model.estimate_episode(transcript, "Jane Doe", BudgetGovernor(history_path=tmp_path / "budget.json"))
+    assert estimate.audio_minutes == pytest.approx(20 - 1 / 60)
+    assert estimate.stages["analysis"] > 0
+
+def test_shortest_first_minimizes_the_mean_wait():
+    def jobs():
+        return [JobEstimate(name, {"analysis": seconds}) for name, seconds in [("long", 600), ("short", 60), ("mid", 300)]]
+    start = datetime(2024, 3, 1, 9, 0)
+    ordered = schedule(jobs(), start=start)
+    assert [job.name for job in ordered] == ["short", "mid", "long"]
+    assert [job.finish_offset for job in ordered] == [60, 360, 960]
+    assert ordered[-1].eta == datetime(2024, 3, 1, 9, 16)
+    assert mean_finish_minutes(ordered) < mean_finish_minutes(schedule(jobs(), start=start, shortest=False))
+
+def test_jobs_go_to_the_first_free_worker():
+    jobs = [JobEstimate(name, {"analysis": seconds}) for name, seconds in [("a", 60), ("b", 120), ("c", 300)]]
+    assert [job.start_offset for job in schedule(jobs, workers=2)] == [0, 0, 60]
+
+def test_durations_are_probed_once_per_file_version(tmp_path, monkeypatch):
+    probes = []
+    monkeypatch.setattr(throughput_model, "probe_duration", lambda path: probes.append(path) or 90.0)
+    recording = tmp_path / "meeting.m4a"
+    recording.write_bytes(b"audio")
+    cache = DurationCache(tmp_path / "media_durations.json")
+    assert cache.duration(recording) == 90.0
+    assert DurationCache(tmp_path / "media_durations.json").duration(recording) == 90.0
+    assert len(probes) == 1
+
+    recording.write_bytes(b"longer audio")
+    os.utime(recording, ns=(0, 10 ** 18))
+    cache.duration(recording)
+    assert len(probes) == 2
+    assert cache.duration(tmp_path / "missing.m4a") is None
@@ -0,0 +1,57 @@
+import pytest
+
+from transcription_backends import Segment, TranscriptionResult, Word
+from word_timings import WORD_TIMINGS_FILE, WordTimings, encode_word_timings, load_word_timings
+
+@pytest.fixture
+def segments():
+    return [
+        Segment(0.0, 4.0, "Welcome to the show.", words=[
+            Word(0.0, 0.5, "Welcome"), Word(0.6, 0.8, "to"), Word(0.9, 1.1, "the"), Word(1.2, 1.6, "show.")
+        ]),
+        Segment(5.0, 9.0, "We talk about knowledge graphs.", words=[
+            Word(5.0, 5.2, "We"), Word(5.3, 5.6, "talk"), Word(5.7, 6.0, "about"),
+            Word(6.5, 7.2, "knowledge"), Word(7.3, 7.9, "graphs.")
+        ]),
+        # A cue without word timing gets its words spread over it
+        Segment(10.0, 14.0, "Knowledge graphs again"),
+    ]
+
+@pytest.fixture
+def episode(tmp_path, segments):
+    transcript = "# Transcription with Timestamps\n\n" + TranscriptionResult(segments, "fake", "fake").to_srt()
+    (tmp_path / "transcription.md").write_text(transcript, encoding='utf-8')
+    (tmp_path / WORD_TIMINGS_FILE).write_bytes(encode_word_timings(segments, transcript))
+    return tmp_path
+
+def test_lookup_by_time(episode):
+    timings = load_word_timings(episode)
+    assert len(timings) == 12 and timings.segment_count == 3
+    assert timings.word(timings.word_at(6.6)) == (6.5, 7.2, "knowledge")
+    assert timings.word_at(0.0) == 0
+    assert timings.segment_at(9.5) == 1
+    assert timings.text_between(5.0, 7.0) == "We talk about knowledge"
+
+def test_find_phrase(episode):
+    timings = load_word_timings(episode)
+    # The last cue's three words are spread evenly over its four seconds
+    assert timings.find("Knowledge Graphs") == [(6.5, 7.9), (10.0, 12.667)]
+    assert timings.find("knowledge graphs", start_seconds=8.0) == [(10.0, 12.667)]
+    assert timings.find("knowledge graphs", limit=1) == [(6.5, 7.9)]
+    assert timings.find("not said") == []
+
+def test_edited_transcript_makes_the_sidecar_stale(episode):
+    assert load_word_timings(episode) is not None
+    transcript_path = episode / "transcription.md"
+    transcript_path.write_text(transcript_path.read_text() + "\nedited\n", encoding='utf-8')
+    assert load_word_timings(episode) is None
+
+def test_sidecar_matches_by_sha1(episode):
+    timings = WordTimings(episode / WORD_TIMINGS_FILE)
+    assert load_word_timings(episode, sha1_hex=timings.digest.hex()) is not None
+    assert load_word_timings(episode, sha1_hex="0" * 40) is None
+
+def test_missing_or_corrupt_sidecar(tmp_path):
+    assert load_word_timings(tmp_path, transcript_text="") is None
+    (tmp_path / WORD_TIMINGS_FILE).write_bytes(b"not a sidecar at all, just some bytes")
+    assert load_word_timings(tmp_path, transcript_text="") is None
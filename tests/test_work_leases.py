@@ -0,0 +1,63 @@
+import time
+
+import pytest
+
+from work_leases import FileLeaseStore, LeaseHeartbeat, SQLiteLeaseStore
+
+@pytest.fixture(params=["file", "sqlite"])
+def make_store(request, tmp_path):
+    """Stores for different workers sharing one location"""
+    def make(worker, lease_seconds=60):
+        if request.param == "file":
+            return FileLeaseStore(tmp_path / "leases", lease_seconds, worker, clock_skew=0)
+        return SQLiteLeaseStore(tmp_path / "leases.db", lease_seconds, worker)
+    return make
+
+def test_only_one_worker_holds_a_key(make_store):
+    first, second = make_store("a"), make_store("b")
+    lease = first.claim("episode")
+    assert lease is not None and first.holds(lease)
+    assert second.claim("episode") is None
+    assert second.claim("other episode") is not None
+
+def test_release_lets_another_worker_claim(make_store):
+    first, second = make_store("a"), make_store("b")
+    lease = first.claim("episode")
+    first.release(lease)
+    assert not first.holds(lease)
+    assert second.claim("episode") is not None
+
+def test_completed_keys_are_never_claimed_again(make_store):
+    first, second = make_store("a"), make_store("b")
+    first.complete(first.claim("episode"))
+    assert first.is_done("episode") and second.is_done("episode")
+    assert second.claim("episode") is None
+    assert first.claim("episode") is None
+
+def test_expired_lease_is_taken_over(make_store):
+    first, second = make_store("a", lease_seconds=0.05), make_store("b", lease_seconds=0.05)
+    lease = first.claim("episode")
+    time.sleep(0.1)
+    taken = second.claim("episode")
+    assert taken is not None and taken.generation > lease.generation
+    # The crashed worker finds out it lost the lease on its next heartbeat
+    assert not first.holds(lease)
+    assert not first.renew(lease)
+    assert second.renew(taken)
+
+def test_renewal_keeps_the_lease(make_store):
+    first, second = make_store("a", lease_seconds=0.2), make_store("b", lease_seconds=0.2)
+    lease = first.claim("episode")
+    for _ in range(3):
+        time.sleep(0.1)
+        assert first.renew(lease)
+        assert second.claim("episode") is None
+
+def test_heartbeat_flags_a_lost_lease(make_store):
+    first, second = make_store("a", lease_seconds=0.05), make_store("b", lease_seconds=0.05)
+    lease = first.claim("episode")
+    with LeaseHeartbeat(first, lease, interval=0.2) as heartbeat:
+        time.sleep(0.1)
+        # Taken over before the first renewal, as after a long pause
+        assert second.claim("episode") is not None
+        assert heartbeat.lost.wait(1)